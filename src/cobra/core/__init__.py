@@ -1,5 +1,5 @@
 from cobra.core.configuration import Configuration
-from cobra.core.dictlist import DictList
+from cobra.core.dictlist import DictList, ReactionList
 from cobra.core.gene import Gene
 from cobra.core.metabolite import Metabolite
 from cobra.core.model import Model
@@ -5,6 +5,7 @@ from __future__ import absolute_import
 import re
 from itertools import islice
 
+import numpy as np
 from numpy import bool_
 from six import PY3, iteritems, string_types
 
@@ -462,3 +463,150 @@ class DictList(list):
         attributes.append("_dict")
         attributes.extend(self._dict.keys())
         return attributes
+
+
+class ReactionList(DictList):
+    """A DictList of reactions with array views of their bounds and
+    objective coefficients.
+
+    The bounds of the reactions of a model are cached in one contiguous
+    array which is updated whenever a bound of one of the reactions
+    changes. Reading or writing the bounds of all reactions thus does not
+    loop over the reactions in Python.
+
+    """
+
+    # class level defaults so that unpickled lists start without a cache
+    _bounds = None
+    _bounds_members = None
+
+    def _model(self):
+        """Return the model of the reactions or None."""
+        if len(self) == 0:
+            return None
+        return list.__getitem__(self, 0)._model
+
+    def _owned(self):
+        """Check whether this is the reaction list of a model."""
+        model = self._model()
+        return model is not None and model.reactions is self
+
+    def _get_bounds(self):
+        """Return the lower and upper bounds as an array of shape (2, n)."""
+        # The cache is only valid for the reactions it was built for, which
+        # also catches removed and reordered reactions
+        if self._bounds is not None and list.__eq__(self, self._bounds_members):
+            return self._bounds
+        bounds = np.array(
+            [(r._lower_bound, r._upper_bound) for r in self], dtype=float
+        ).reshape(-1, 2)
+        bounds = np.ascontiguousarray(bounds.T)
+        # Only the list of a model is notified about bound changes
+        if self._owned():
+            self._bounds, self._bounds_members = bounds, list(self)
+        return bounds
+
+    def _update_bounds(self, reactions):
+        """Copy the bounds of changed reactions into the cache."""
+        if self._bounds is None:
+            return
+        members = self._bounds_members
+        indices = [self._dict.get(r.id) for r in reactions]
+        for i, rxn in zip(indices, reactions):
+            if i is None or i >= len(members) or members[i] is not rxn:
+                self._bounds = self._bounds_members = None
+                return
+        self._bounds[0, indices] = [r._lower_bound for r in reactions]
+        self._bounds[1, indices] = [r._upper_bound for r in reactions]
+
+    def _set_bounds(self, lower, upper):
+        """Set the bounds of all reactions."""
+        model = self._model()
+        if model is None:
+            shape = (len(self),)
+            lower = np.broadcast_to(np.asarray(lower, dtype=float), shape)
+            upper = np.broadcast_to(np.asarray(upper, dtype=float), shape)
+            for rxn, bounds in zip(self, zip(lower.tolist(), upper.tolist())):
+                rxn.bounds = bounds
+        elif model.reactions is self:
+            model.set_bounds(np.arange(len(self)), lower, upper)
+        else:
+            model.set_bounds(list(self), lower, upper)
+
+    def append(self, object):
+        """append object to end"""
+        self._bounds = self._bounds_members = None
+        super(ReactionList, self).append(object)
+
+    def extend(self, iterable):
+        """extend list by appending elements from the iterable"""
+        self._bounds = self._bounds_members = None
+        super(ReactionList, self).extend(iterable)
+
+    def insert(self, index, object):
+        """insert object before index"""
+        self._bounds = self._bounds_members = None
+        super(ReactionList, self).insert(index, object)
+
+    def __setitem__(self, i, y):
+        self._bounds = self._bounds_members = None
+        super(ReactionList, self).__setitem__(i, y)
+
+    @property
+    def lower_bounds(self):
+        """Get or set the lower bounds of all reactions.
+
+        Returns a copy of the cached bounds, so changing the returned array
+        has no effect. Assigning an array (or a single value) sets the
+        lower bounds of all reactions with `Model.set_bounds`.
+        """
+        return self._get_bounds()[0].copy()
+
+    @lower_bounds.setter
+    def lower_bounds(self, value):
+        self._set_bounds(value, self._get_bounds()[1])
+
+    @property
+    def upper_bounds(self):
+        """Get or set the upper bounds of all reactions.
+
+        Returns a copy of the cached bounds, so changing the returned array
+        has no effect. Assigning an array (or a single value) sets the
+        upper bounds of all reactions with `Model.set_bounds`.
+        """
+        return self._get_bounds()[1].copy()
+
+    @upper_bounds.setter
+    def upper_bounds(self, value):
+        self._set_bounds(self._get_bounds()[0], value)
+
+    @property
+    def objective_coefficients(self):
+        """Get or set the linear objective coefficients of all reactions.
+
+        The coefficients are read from the solver with a single call, as in
+        `cobra.util.solver.linear_reaction_coefficients` reactions whose
+        forward and reverse variables do not have opposite coefficients get
+        a coefficient of zero. Assigning an array (or a single value) uses
+        `Model.set_objective_coefficients`.
+        """
+        model = self._model()
+        if model is None:
+            return np.zeros(len(self))
+        variables = model.variables
+        forward = [variables[r.id] for r in self]
+        reverse = [variables[r.reverse_id] for r in self]
+        coefficients = model.solver.objective.get_linear_coefficients(forward + reverse)
+        forward = np.array([coefficients[v] for v in forward], dtype=float)
+        reverse = np.array([coefficients[v] for v in reverse], dtype=float)
+        return np.where(forward == -reverse, forward, 0.0)
+
+    @objective_coefficients.setter
+    def objective_coefficients(self, value):
+        model = self._model()
+        if model is None:
+            raise AttributeError("cannot assign objective to a missing model")
+        if model.reactions is self:
+            model.set_objective_coefficients(np.arange(len(self)), value)
+        else:
+            model.set_objective_coefficients(list(self), value)
@@ -6,17 +6,20 @@ from __future__ import absolute_import
 
 import logging
 import types
+from collections import namedtuple
+from contextlib import contextmanager
 from copy import copy, deepcopy
 from functools import partial
 from warnings import warn
 
+import numpy as np
 import optlang
 import six
 from optlang.symbolics import Basic, Zero
 from six import iteritems, string_types
 
 from cobra.core.configuration import Configuration
-from cobra.core.dictlist import DictList
+from cobra.core.dictlist import DictList, ReactionList
 from cobra.core.gene import Gene
 from cobra.core.group import Group
 from cobra.core.metabolite import Metabolite
@@ -40,6 +43,19 @@ from cobra.util.util import AutoVivification, format_long_string
 logger = logging.getLogger(__name__)
 configuration = Configuration()
 
+ModelSnapshot = namedtuple(
+    "ModelSnapshot",
+    [
+        "reactions",
+        "lower_bounds",
+        "upper_bounds",
+        "variables",
+        "constraints",
+        "objective_coefficients",
+        "objective_direction",
+    ],
+)
+
 
 class Model(Object):
     """Class representation for a cobra model
@@ -55,9 +71,11 @@ class Model(Object):
 
     Attributes
     ----------
-    reactions : DictList
+    reactions : ReactionList
         A DictList where the key is the reaction identifier and the value a
-        Reaction
+        Reaction. Its `lower_bounds`, `upper_bounds` and
+        `objective_coefficients` get or set the values of all reactions as
+        arrays.
     metabolites : DictList
         A DictList where the key is the metabolite identifier and the value a
         Metabolite
@@ -75,6 +93,9 @@ class Model(Object):
     def __setstate__(self, state):
         """Make sure all cobra.Objects in the model point to the model."""
         self.__dict__.update(state)
+        # older pickles store the reactions in a plain DictList
+        if not isinstance(self.reactions, ReactionList):
+            self.reactions = ReactionList(self.reactions)
         for y in ["reactions", "genes", "metabolites"]:
             for x in getattr(self, y):
                 x._model = self
@@ -89,6 +110,8 @@ class Model(Object):
         """
         odict = self.__dict__.copy()
         odict["_contexts"] = []
+        # the solver positions cached by `get_solution` are rebuilt on demand
+        odict.pop("_solver_index", None)
         return odict
 
     def __init__(self, id_or_model=None, name=None):
@@ -104,7 +127,7 @@ class Model(Object):
             self._trimmed_genes = []
             self._trimmed_reactions = {}
             self.genes = DictList()
-            self.reactions = DictList()  # A list of cobra.Reactions
+            self.reactions = ReactionList()  # A list of cobra.Reactions
             self.metabolites = DictList()  # A list of cobra.Metabolites
             self.groups = DictList()  # A list of cobra.Groups
             # genes based on their ids {Gene.id: Gene}
@@ -343,6 +366,7 @@ class Model(Object):
             "notes",
             "annotation",
             "groups",
+            "_solver_index",
         }
         for attr in self.__dict__:
             if attr not in do_not_copy_by_ref:
@@ -371,7 +395,7 @@ class Model(Object):
             new_gene._model = new
             new.genes.append(new_gene)
 
-        new.reactions = DictList()
+        new.reactions = ReactionList()
         do_not_copy_by_ref = {"_model", "_metabolites", "_genes"}
         for reaction in self.reactions:
             new_reaction = reaction.__class__()
@@ -1198,6 +1222,299 @@ class Model(Object):
         else:
             raise ValueError("Unknown objective direction '{}'.".format(value))
 
+    def _get_reactions(self, reactions):
+        """Return the reactions given by identifiers, objects or indices."""
+        if isinstance(reactions, np.ndarray):
+            if reactions.dtype == bool:
+                reactions = np.flatnonzero(reactions)
+            if reactions.dtype.kind in "iu":
+                return [self.reactions[i] for i in reactions.tolist()]
+            reactions = reactions.tolist()
+        if isinstance(reactions, (string_types, Reaction)):
+            reactions = [reactions]
+        return self.reactions.get_by_any(
+            [r.item() if isinstance(r, np.integer) else r for r in reactions]
+        )
+
+    def set_bounds(self, reactions, lower_bounds, upper_bounds):
+        """Set the bounds of many reactions at once.
+
+        The bounds of all optlang variables are computed in one go, which
+        avoids the checks and updates `Reaction.bounds` performs for every
+        single reaction. Since optlang offers no call that changes the bounds
+        of many variables at once, they are still passed to the solver one
+        variable at a time. Inside a model context, a single entry restores
+        all previous bounds.
+
+        Parameters
+        ----------
+        reactions : list or numpy.ndarray
+            The reactions to change given as reaction identifiers, `Reaction`
+            objects, an integer index array or a boolean mask over
+            `model.reactions`.
+        lower_bounds : float or array-like
+            The new lower bound of each reaction or a single lower bound for
+            all of them.
+        upper_bounds : float or array-like
+            The new upper bound of each reaction or a single upper bound for
+            all of them.
+
+        Raises
+        ------
+        ValueError
+            If a lower bound is larger than its upper bound or the number of
+            bounds does not match the number of reactions.
+
+        Examples
+        --------
+        >>> import cobra.test
+        >>> model = cobra.test.create_test_model("textbook")
+        >>> model.set_bounds(["EX_glc__D_e", "EX_o2_e"], [-5, -10], 1000)
+        >>> model.reactions.EX_glc__D_e.bounds
+        (-5.0, 1000.0)
+
+        """
+        reactions = self._get_reactions(reactions)
+        shape = (len(reactions),)
+        try:
+            lower = np.broadcast_to(np.asarray(lower_bounds, dtype=float), shape)
+            upper = np.broadcast_to(np.asarray(upper_bounds, dtype=float), shape)
+        except ValueError:
+            raise ValueError("Expected one lower and upper bound per reaction.")
+        invalid = np.flatnonzero(lower > upper)
+        if len(invalid) > 0:
+            i = invalid[0]
+            raise ValueError(
+                "The lower bound must be less than or equal to the upper "
+                "bound ({} <= {}) of reaction '{}'.".format(
+                    lower[i], upper[i], reactions[i].id
+                )
+            )
+
+        context = get_context(self)
+        if context:
+            context.record(
+                {
+                    (rxn, "bounds"): (rxn._lower_bound, rxn._upper_bound)
+                    for rxn in reactions
+                },
+                self._reset_bounds,
+            )
+
+        self._set_bounds(reactions, lower, upper)
+
+    def _reset_bounds(self, values):
+        """Restore the bounds of reactions recorded in a model context."""
+        reactions = [rxn for rxn, _ in values]
+        bounds = np.array(list(values.values()), dtype=float).reshape(-1, 2)
+        self._set_bounds(reactions, bounds[:, 0], bounds[:, 1])
+
+    def _set_bounds(self, reactions, lower, upper):
+        """Set the bounds of reactions and their variables without history."""
+        for rxn, lb, ub in zip(reactions, lower.tolist(), upper.tolist()):
+            rxn._lower_bound = lb
+            rxn._upper_bound = ub
+        self.reactions._update_bounds(reactions)
+
+        # The same cases as in `Reaction.update_variable_bounds` but for all
+        # reactions at once
+        forward = (np.where(lower > 0, lower, 0.0), np.where(upper < 0, 0.0, upper))
+        reverse = (np.where(upper < 0, -upper, 0.0), np.where(lower > 0, 0.0, -lower))
+
+        def optlang_bounds(bounds):
+            return [[None if np.isinf(v) else v for v in b.tolist()] for b in bounds]
+
+        variables = self.variables
+        for rxn, f_lb, f_ub, r_lb, r_ub in zip(
+            reactions, *optlang_bounds(forward), *optlang_bounds(reverse)
+        ):
+            variables[rxn.id].set_bounds(lb=f_lb, ub=f_ub)
+            variables[rxn.reverse_id].set_bounds(lb=r_lb, ub=r_ub)
+        self.solver.update()
+
+    def set_objective_coefficients(self, reactions, coefficients):
+        """Set the linear objective coefficients of many reactions at once.
+
+        All coefficients are sent to the solver in a single call, other
+        terms of the objective remain unchanged. Inside a model context, a
+        single entry restores all previous coefficients.
+
+        Parameters
+        ----------
+        reactions : list or numpy.ndarray
+            The reactions to change given as reaction identifiers, `Reaction`
+            objects, an integer index array or a boolean mask over
+            `model.reactions`.
+        coefficients : float or array-like
+            The new objective coefficient of each reaction or a single
+            coefficient for all of them.
+
+        Raises
+        ------
+        ValueError
+            If the number of coefficients does not match the number of
+            reactions.
+
+        """
+        reactions = self._get_reactions(reactions)
+        try:
+            coefficients = np.broadcast_to(
+                np.asarray(coefficients, dtype=float), (len(reactions),)
+            )
+        except ValueError:
+            raise ValueError("Expected one objective coefficient per reaction.")
+
+        variables = self.variables
+        forward = [variables[rxn.id] for rxn in reactions]
+        reverse = [variables[rxn.reverse_id] for rxn in reactions]
+        objective = self.solver.objective
+
+        context = get_context(self)
+        if context:
+            previous = objective.get_linear_coefficients(forward + reverse)
+            context.record(
+                {(var, "objective"): coef for var, coef in previous.items()},
+                self._reset_objective_coefficients,
+            )
+
+        new = dict(zip(forward, coefficients.tolist()))
+        new.update(zip(reverse, (-coefficients).tolist()))
+        objective.set_linear_coefficients(new)
+
+    def _reset_objective_coefficients(self, values):
+        """Restore objective coefficients recorded in a model context."""
+        self.solver.objective.set_linear_coefficients(
+            {var: coef for (var, _), coef in values.items()}
+        )
+
+    def snapshot(self):
+        """Capture the bounds, objective and problem structure of the model.
+
+        The snapshot only holds arrays and references to the current
+        reactions, variables and constraints, so it is much cheaper than a
+        copy of the model. Pass it to `Model.restore` to return to this
+        state.
+
+        Returns
+        -------
+        ModelSnapshot
+            A named tuple with the reactions, their lower and upper bounds,
+            the solver variables and constraints, the linear objective
+            coefficient of every variable and the objective direction.
+
+        See Also
+        --------
+        restore
+
+        """
+        variables = self.solver.variables.values()
+        coefficients = self.solver.objective.get_linear_coefficients(variables)
+        return ModelSnapshot(
+            reactions=list(self.reactions),
+            lower_bounds=self.reactions.lower_bounds,
+            upper_bounds=self.reactions.upper_bounds,
+            variables=variables,
+            constraints=self.solver.constraints.values(),
+            objective_coefficients=np.array(
+                [coefficients[v] for v in variables], dtype=float
+            ),
+            objective_direction=self.objective_direction,
+        )
+
+    def restore(self, snapshot):
+        """Return to the state captured by `Model.snapshot`.
+
+        Only the differences to the snapshot are applied: reaction bounds
+        and objective coefficients that changed are reset with one batched
+        update each, variables and constraints added since the snapshot are
+        removed and removed ones are added back. Inside a model context,
+        the restore itself is undone on exit.
+
+        Parameters
+        ----------
+        snapshot : ModelSnapshot
+            A snapshot of this model.
+
+        Raises
+        ------
+        ValueError
+            If reactions were added to or removed from the model since the
+            snapshot was taken.
+
+        Examples
+        --------
+        >>> import cobra.test
+        >>> model = cobra.test.create_test_model("textbook")
+        >>> baseline = model.snapshot()
+        >>> model.reactions.EX_glc__D_e.lower_bound = -2
+        >>> model.objective = "ATPM"
+        >>> model.restore(baseline)
+        >>> model.reactions.EX_glc__D_e.lower_bound
+        -10.0
+
+        """
+        lower, upper = snapshot.lower_bounds, snapshot.upper_bounds
+        if not list.__eq__(self.reactions, snapshot.reactions):
+            # The same reactions in a different order are fine
+            if len(self.reactions) != len(snapshot.reactions) or any(
+                rxn._model is not self or rxn not in self.reactions
+                for rxn in snapshot.reactions
+            ):
+                raise ValueError(
+                    "Reactions were added or removed since the snapshot was "
+                    "taken, use a model context or a copy of the model instead."
+                )
+            order = np.argsort([self.reactions.index(r) for r in snapshot.reactions])
+            lower, upper = lower[order], upper[order]
+
+        changed = np.flatnonzero(
+            (self.reactions.lower_bounds != lower)
+            | (self.reactions.upper_bounds != upper)
+        )
+        if len(changed) > 0:
+            self.set_bounds(changed, lower[changed], upper[changed])
+
+        # Variables and constraints that were added or removed
+        solver = self.solver
+        current_variables = solver.variables.values()
+        current_constraints = solver.constraints.values()
+        added, removed = [], []
+        for current, previous in (
+            (current_constraints, snapshot.constraints),
+            (current_variables, snapshot.variables),
+        ):
+            if current != previous:
+                current_set, previous_set = set(current), set(previous)
+                added.extend(x for x in current if x not in previous_set)
+                removed.extend(x for x in previous if x not in current_set)
+        if added:
+            self.remove_cons_vars(added)
+        if removed:
+            # variables need to be present before the constraints using them
+            self.add_cons_vars(removed[::-1])
+
+        # Only change the objective coefficients that differ
+        variables = snapshot.variables
+        current = solver.objective.get_linear_coefficients(variables)
+        changed = np.flatnonzero(
+            np.array([current[v] for v in variables], dtype=float)
+            != snapshot.objective_coefficients
+        )
+        if len(changed) > 0:
+            values = {
+                (variables[i], "objective"): snapshot.objective_coefficients[i]
+                for i in changed.tolist()
+            }
+            context = get_context(self)
+            if context:
+                context.record(
+                    {key: current[key[0]] for key in values},
+                    self._reset_objective_coefficients,
+                )
+            self._reset_objective_coefficients(values)
+
+        self.objective_direction = snapshot.objective_direction
+
     def summary(self, solution=None, fva=None):
         """
         Create a summary of the exchange fluxes of the model.
@@ -1240,6 +1557,43 @@ class Model(Object):
 
         return self
 
+    @contextmanager
+    def context(self, coalesce=False):
+        """Record all changes to the model and undo them on exit.
+
+        `with model.context():` behaves like `with model:`. With coalescing,
+        the context only keeps the original bounds and attribute values of
+        changed objects, no matter how often they are changed, and restores
+        all reaction bounds with a single batched solver update.
+
+        Parameters
+        ----------
+        coalesce : bool, optional
+            Whether to only keep the original values of changed attributes
+            (default False).
+
+        Examples
+        --------
+        >>> import cobra.test
+        >>> model = cobra.test.create_test_model("textbook")
+        >>> with model.context(coalesce=True):
+        ...     for bound in range(1000):
+        ...         model.reactions.PGI.upper_bound = bound
+        ...     model._contexts[-1].size()
+        1
+
+        """
+        history = HistoryManager(coalesce=coalesce)
+        try:
+            self._contexts.append(history)
+        except AttributeError:
+            self._contexts = [history]
+        try:
+            yield self
+        finally:
+            self._contexts.pop()
+            history.reset()
+
     def __exit__(self, type, value, traceback):
         """Pop the top context manager and trigger the undo functions"""
         context = self._contexts.pop()
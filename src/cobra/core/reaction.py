@@ -21,7 +21,7 @@ from cobra.core.gene import Gene, ast2str, eval_gpr, parse_gpr
 from cobra.core.metabolite import Metabolite
 from cobra.core.object import Object
 from cobra.exceptions import OptimizationError
-from cobra.util.context import get_context, resettable
+from cobra.util.context import get_context
 from cobra.util.solver import (
     check_solver_status,
     linear_reaction_coefficients,
@@ -47,6 +47,30 @@ _forward_arrow_finder = re.compile("(-+|=+)>")
 _reverse_arrow_finder = re.compile("<(-+|=+)")
 
 
+def _resettable_bounds(func):
+    """Make a bound setter of a reaction resettable.
+
+    Works like `cobra.util.context.resettable` but records both bounds of
+    the reaction, so that a model context restores the bounds of many
+    reactions with one batched solver update.
+    """
+
+    def wrapper(self, new_value):
+        context = get_context(self)
+        if context:
+            # Don't clutter the context with unchanged bounds
+            if getattr(self, func.__name__) == new_value:
+                return
+            context.record(
+                {(self, "bounds"): (self._lower_bound, self._upper_bound)},
+                self._model._reset_bounds,
+            )
+
+        func(self, new_value)
+
+    return wrapper
+
+
 class Reaction(Object):
     """Reaction is a class for holding information regarding
     a biochemical reaction in a cobra.Model object.
@@ -205,6 +229,7 @@ class Reaction(Object):
     def update_variable_bounds(self):
         if self.model is None:
             return
+        self._model.reactions._update_bounds([self])
         # We know that `lb <= ub`.
         if self._lower_bound > 0:
             self.forward_variable.set_bounds(
@@ -241,7 +266,7 @@ class Reaction(Object):
         return self._lower_bound
 
     @lower_bound.setter
-    @resettable
+    @_resettable_bounds
     def lower_bound(self, value):
         if self._upper_bound < value:
             warn(
@@ -274,7 +299,7 @@ class Reaction(Object):
         return self._upper_bound
 
     @upper_bound.setter
-    @resettable
+    @_resettable_bounds
     def upper_bound(self, value):
         if self._lower_bound > value:
             warn(
@@ -306,7 +331,7 @@ class Reaction(Object):
         return self.lower_bound, self.upper_bound
 
     @bounds.setter
-    @resettable
+    @_resettable_bounds
     def bounds(self, value):
         lower, upper = value
         # Validate bounds before setting them.
@@ -8,9 +8,9 @@ import logging
 from builtins import object, super
 from warnings import warn
 
-from numpy import empty, nan
+from numpy import array, asarray, empty, int64, nan
 from optlang.interface import OPTIMAL
-from pandas import DataFrame, Series, option_context
+from pandas import DataFrame, Index, Series, option_context
 
 from cobra.util.solver import check_solver_status
 
@@ -207,6 +207,83 @@ class LegacySolution(object):
         warn("unnecessary to call this deprecated function", DeprecationWarning)
 
 
+class _SolverIndex(object):
+    """
+    Positions of the reaction variables and metabolite constraints in the
+    solver.
+
+    `get_solution` caches an instance on the model and rebuilds it whenever
+    the solver, its variables or constraints, or the reactions or
+    metabolites of the model change.
+    """
+
+    def __init__(self, model):
+        solver = model.solver
+        self.solver = solver
+        self.variables = solver.variables.values()
+        self.constraints = solver.constraints.values()
+        self.reactions = list(model.reactions)
+        self.metabolites = list(model.metabolites)
+        # renaming an element replaces the id index of its DictList
+        self.reaction_dict = model.reactions._dict
+        self.metabolite_dict = model.metabolites._dict
+        self.variable_names = [v.name for v in self.variables]
+        self.constraint_names = [c.name for c in self.constraints]
+        self.variable_index = {n: i for i, n in enumerate(self.variable_names)}
+        self.constraint_index = {n: i for i, n in enumerate(self.constraint_names)}
+        self.reaction_ids, self.forward, self.reverse = self.reaction_columns(
+            self.reactions
+        )
+        self.metabolite_ids, self.rows = self.metabolite_rows(self.metabolites)
+
+    def is_valid(self, model):
+        """Check whether the positions still match the model."""
+        solver = model.solver
+        # The list comparisons short-circuit on identical elements
+        return (
+            solver is self.solver
+            and model.reactions._dict is self.reaction_dict
+            and model.metabolites._dict is self.metabolite_dict
+            and list.__eq__(model.reactions, self.reactions)
+            and list.__eq__(model.metabolites, self.metabolites)
+            and solver.variables.values() == self.variables
+            and solver.constraints.values() == self.constraints
+        )
+
+    def reaction_columns(self, reactions):
+        """Return the reaction ids and forward and reverse variable positions."""
+        ids = [rxn.id for rxn in reactions]
+        forward = array([self.variable_index[i] for i in ids], dtype=int64)
+        reverse = array(
+            [self.variable_index[rxn.reverse_id] for rxn in reactions], dtype=int64
+        )
+        return Index(ids), forward, reverse
+
+    @staticmethod
+    def values(mapping, names):
+        """Return the values of a solver mapping in the order of `names`."""
+        # The solver's mappings follow the order of its variables and
+        # constraints, so a lookup by name is only needed otherwise
+        if list(mapping) == names:
+            return asarray(list(mapping.values()), dtype=float)
+        return asarray([mapping[n] for n in names], dtype=float)
+
+    def metabolite_rows(self, metabolites):
+        """Return the metabolite ids and constraint positions."""
+        ids = [met.id for met in metabolites]
+        rows = array([self.constraint_index[i] for i in ids], dtype=int64)
+        return Index(ids), rows
+
+
+def _solver_index(model):
+    """Return the valid solver positions of a model."""
+    index = getattr(model, "_solver_index", None)
+    if index is None or not index.is_valid(model):
+        index = _SolverIndex(model)
+        model._solver_index = index
+    return index
+
+
 def get_solution(model, reactions=None, metabolites=None, raise_error=False):
     """
     Generate a solution representation of the current solver state.
@@ -232,38 +309,35 @@ def get_solution(model, reactions=None, metabolites=None, raise_error=False):
     ----
     This is only intended for the `optlang` solver interfaces and not the
     legacy solvers.
+
+    The positions of the reaction variables and metabolite constraints in
+    the solver are cached on the model, so that the values of all variables
+    and constraints are retrieved from the solver's `primal_values`,
+    `reduced_costs` and `shadow_prices` at once and indexed with arrays.
     """
     check_solver_status(model.solver.status, raise_error=raise_error)
+    index = _solver_index(model)
     if reactions is None:
-        reactions = model.reactions
+        rxn_index, forward, reverse = index.reaction_ids, index.forward, index.reverse
+    else:
+        rxn_index, forward, reverse = index.reaction_columns(reactions)
     if metabolites is None:
-        metabolites = model.metabolites
+        met_index, rows = index.metabolite_ids, index.rows
+    else:
+        met_index, rows = index.metabolite_rows(metabolites)
 
-    rxn_index = list()
-    fluxes = empty(len(reactions))
-    reduced = empty(len(reactions))
-    var_primals = model.solver.primal_values
-    shadow = empty(len(metabolites))
+    var_primals = index.values(model.solver.primal_values, index.variable_names)
+    fluxes = var_primals[forward] - var_primals[reverse]
     if model.solver.is_integer:
+        reduced = empty(len(rxn_index))
         reduced.fill(nan)
+        shadow = empty(len(met_index))
         shadow.fill(nan)
-        for (i, rxn) in enumerate(reactions):
-            rxn_index.append(rxn.id)
-            fluxes[i] = var_primals[rxn.id] - var_primals[rxn.reverse_id]
-        met_index = [met.id for met in metabolites]
     else:
-        var_duals = model.solver.reduced_costs
-        for (i, rxn) in enumerate(reactions):
-            forward = rxn.id
-            reverse = rxn.reverse_id
-            rxn_index.append(forward)
-            fluxes[i] = var_primals[forward] - var_primals[reverse]
-            reduced[i] = var_duals[forward] - var_duals[reverse]
-        met_index = list()
-        constr_duals = model.solver.shadow_prices
-        for (i, met) in enumerate(metabolites):
-            met_index.append(met.id)
-            shadow[i] = constr_duals[met.id]
+        var_duals = index.values(model.solver.reduced_costs, index.variable_names)
+        reduced = var_duals[forward] - var_duals[reverse]
+        constr_duals = index.values(model.solver.shadow_prices, index.constraint_names)
+        shadow = constr_duals[rows]
     return Solution(
         model.solver.objective.value,
         model.solver.status,
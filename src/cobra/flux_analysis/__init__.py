@@ -3,6 +3,8 @@
 from cobra.flux_analysis.deletion import (
     double_gene_deletion,
     double_reaction_deletion,
+    multi_gene_deletion,
+    multi_reaction_deletion,
     single_gene_deletion,
     single_reaction_deletion,
 )
@@ -13,10 +15,13 @@ from cobra.flux_analysis.loopless import loopless_solution, add_loopless
 from cobra.flux_analysis.moma import add_moma, moma
 from cobra.flux_analysis.parsimonious import pfba
 from cobra.flux_analysis.variability import (
+    FVASession,
     find_blocked_reactions,
     find_essential_genes,
     find_essential_reactions,
     flux_variability_analysis,
+    flux_variability_analysis_iter,
+    parametric_flux_variability_analysis,
 )
 from cobra.flux_analysis.phenotype_phase_plane import production_envelope
 from cobra.flux_analysis.room import add_room, room
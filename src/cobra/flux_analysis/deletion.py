@@ -3,17 +3,22 @@
 import logging
 import multiprocessing
 from builtins import dict, map
+from collections import OrderedDict, defaultdict
 from functools import partial
-from itertools import product
-from typing import List, Set, Union
+from itertools import chain, combinations, product
+from typing import Dict, FrozenSet, Hashable, List, Set, Union
 
 import pandas as pd
+from numpy import flatnonzero, isnan
 from optlang.exceptions import SolverError
+from optlang.interface import OPTIMAL
 
-from cobra.core import Configuration, Gene, Reaction
+from cobra.core import Configuration, Gene, Reaction, get_solution
+from cobra.exceptions import OptimizationError
 from cobra.flux_analysis.moma import add_moma
+from cobra.flux_analysis.parsimonious import pfba
 from cobra.flux_analysis.room import add_room
-from cobra.manipulation.delete import find_gene_knockout_reactions
+from cobra.manipulation.delete import GPRCircuit
 from cobra.util import solver as sutil
 
 
@@ -47,70 +52,96 @@ def _reaction_deletion(model, ids):
     )
 
 
-def _gene_deletion(model, ids):
-    all_reactions = []
-    for g_id in ids:
-        all_reactions.extend(
-            find_gene_knockout_reactions(model, (model.genes.get_by_id(g_id),))
-        )
-    _, growth, status = _reactions_knockouts_with_restore(model, all_reactions)
-    return (ids, growth, status)
-
-
 def _reaction_deletion_worker(ids):
     global _model
     return _reaction_deletion(_model, ids)
 
 
-def _gene_deletion_worker(ids):
-    global _model
-    return _gene_deletion(_model, ids)
-
-
 def _init_worker(model):
     global _model
     _model = model
 
 
-def _multi_deletion(
-    model, entity, element_lists, method="fba", solution=None, processes=None, **kwargs
-):
+def _wild_type_zero_flux(model, zero_cutoff):
+    """Find reactions without flux in optimal wild-type solutions.
+
+    Knocking out reactions that carry no flux in an optimal solution leaves
+    that solution feasible and thus can not change the optimum. Besides the
+    FBA solution, the parsimonious solution is used as an alternative optimum
+    since it usually contains many more reactions without flux.
+
+    Returns
+    -------
+    tuple
+        The wild-type growth (None if the model could not be optimized) and a
+        list with one set of inactive reaction identifiers per solution.
+
     """
-    Provide a common interface for single or multiple knockouts.
+    growth = model.slim_optimize()
+    if model.solver.status != OPTIMAL:
+        return None, []
+    solutions = [get_solution(model)]
+    try:
+        solutions.append(pfba(model))
+    except OptimizationError:
+        LOGGER.info("Could not find a parsimonious wild-type solution.")
+    zero_sets = [
+        frozenset(sol.fluxes.index[sol.fluxes.abs() < zero_cutoff]) for sol in solutions
+    ]
+    return growth, zero_sets
 
-    Parameters
-    ----------
-    model : cobra.Model
-        The metabolic model to perform deletions in.
-    entity : 'gene' or 'reaction'
-        The entity to knockout (``cobra.Gene`` or ``cobra.Reaction``).
-    element_lists : list
-        List of iterables ``cobra.Reaction``s or ``cobra.Gene``s (or their IDs)
-        to be deleted.
-    method: {"fba", "moma", "linear moma", "room", "linear room"}, optional
-        Method used to predict the growth rate.
-    solution : cobra.Solution, optional
-        A previous solution to use as a reference for (linear) MOMA or ROOM.
-    processes : int, optional
-        The number of parallel processes to run. Can speed up the computations
-        if the number of knockouts to perform is large. If not passed,
-        will be set to the number of CPUs found.
-    kwargs :
-        Passed on to underlying simulation functions.
+
+def _plan_deletions(model, entity, args, chunk_size=10000):
+    """Group knockouts by the set of reactions they disable.
+
+    Many genes and gene combinations disable exactly the same reactions, so
+    only one deletion per distinct set of reactions has to be simulated. The
+    gene-reaction rules are evaluated for chunks of knockouts at once.
 
     Returns
     -------
-    pandas.DataFrame
-        A representation of all combinations of entity deletions. The
-        columns are 'growth' and 'status', where
+    dict
+        Maps each frozenset of disabled reaction identifiers to the list of
+        requested knockouts (frozensets of identifiers) that disable it.
+
+    """
+    plan = defaultdict(list)
+    if entity == "reaction":
+        for ids in args:
+            plan[ids].append(ids)
+        return plan
+    circuit = GPRCircuit(model)
+    args = list(args)
+    for start in range(0, len(args), chunk_size):
+        chunk = args[start : start + chunk_size]
+        for ids, disabled in zip(chunk, circuit.knockout_matrix(chunk)):
+            reactions = frozenset(circuit.reactions[j] for j in flatnonzero(disabled))
+            plan[reactions].append(ids)
+    return plan
+
+
+def _screen_inactive(model, plan, zero_cutoff):
+    """Find all planned deletions that only disable inactive reactions.
+
+    Returns
+    -------
+    list
+        The (reaction ids, growth, status) results of the deletions that do
+        not need to be solved.
 
-        index : tuple(str)
-            The gene or reaction identifiers that were knocked out.
-        growth : float
-            The growth rate of the adjusted model.
-        status : str
-            The solution's status.
     """
+    growth, zero_sets = _wild_type_zero_flux(model, zero_cutoff)
+    if growth is None:
+        return []
+    return [
+        (reactions, growth, OPTIMAL)
+        for reactions in plan
+        if any(reactions <= zeros for zeros in zero_sets)
+    ]
+
+
+def _deletions(model, entity, args, method, solution, processes, **kwargs):
+    """Simulate a collection of knockouts (frozensets of identifiers)."""
     solver = sutil.interface_to_str(model.problem.__name__)
     if method == "moma" and solver not in sutil.qp_solvers:
         raise RuntimeError(
@@ -127,8 +158,12 @@ def _multi_deletion(
         elif "room" in method:
             add_room(model, solution=solution, linear="linear" in method, **kwargs)
 
-        args = set([frozenset(comb) for comb in product(*element_lists)])
-        processes = min(processes, len(args))
+        plan = _plan_deletions(model, entity, args)
+        screened = []
+        if method == "fba":
+            screened = _screen_inactive(model, plan, model.tolerance)
+        tasks = set(plan).difference(reactions for reactions, _, _ in screened)
+        processes = min(processes, len(tasks))
 
         def extract_knockout_results(result_iter):
             result = pd.DataFrame(
@@ -138,31 +173,166 @@ def _multi_deletion(
                         growth,
                         status,
                     )
-                    for (ids, growth, status) in result_iter
+                    for (reactions, growth, status) in chain(screened, result_iter)
+                    for ids in plan[frozenset(reactions)]
                 ],
                 columns=["ids", "growth", "status"],
             )
             return result
 
         if processes > 1:
-            worker = dict(
-                gene=_gene_deletion_worker, reaction=_reaction_deletion_worker
-            )[entity]
-            chunk_size = len(args) // processes
+            chunk_size = len(tasks) // processes
             pool = multiprocessing.Pool(
                 processes, initializer=_init_worker, initargs=(model,)
             )
             results = extract_knockout_results(
-                pool.imap_unordered(worker, args, chunksize=chunk_size)
+                pool.imap_unordered(
+                    _reaction_deletion_worker, tasks, chunksize=chunk_size
+                )
             )
             pool.close()
             pool.join()
         else:
-            worker = dict(gene=_gene_deletion, reaction=_reaction_deletion)[entity]
-            results = extract_knockout_results(map(partial(worker, model), args))
+            results = extract_knockout_results(
+                map(partial(_reaction_deletion, model), tasks)
+            )
+        # build the knockout index once so that lookups are fast right away
+        results.knockout._index()
         return results
 
 
+def _multi_deletion(
+    model, entity, element_lists, method="fba", solution=None, processes=None, **kwargs
+):
+    """
+    Provide a common interface for single or multiple knockouts.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The metabolic model to perform deletions in.
+    entity : 'gene' or 'reaction'
+        The entity to knockout (``cobra.Gene`` or ``cobra.Reaction``).
+    element_lists : list
+        List of iterables ``cobra.Reaction``s or ``cobra.Gene``s (or their IDs)
+        to be deleted.
+    method: {"fba", "moma", "linear moma", "room", "linear room"}, optional
+        Method used to predict the growth rate.
+    solution : cobra.Solution, optional
+        A previous solution to use as a reference for (linear) MOMA or ROOM.
+    processes : int, optional
+        The number of parallel processes to run. Can speed up the computations
+        if the number of knockouts to perform is large. If not passed,
+        will be set to the number of CPUs found.
+    kwargs :
+        Passed on to underlying simulation functions.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A representation of all combinations of entity deletions. The
+        columns are 'growth' and 'status', where
+
+        index : tuple(str)
+            The gene or reaction identifiers that were knocked out.
+        growth : float
+            The growth rate of the adjusted model.
+        status : str
+            The solution's status.
+
+    Notes
+    -----
+    Gene knockouts are first mapped to the reactions they disable, and each
+    distinct set of disabled reactions is only simulated once. With FBA,
+    knockouts that only disable reactions without flux in an optimal
+    wild-type solution are assigned the wild-type growth without solving
+    them.
+    """
+    args = set([frozenset(comb) for comb in product(*element_lists)])
+    return _deletions(model, entity, args, method, solution, processes, **kwargs)
+
+
+def _multi_order_deletion(
+    model,
+    entity,
+    elements,
+    order,
+    method="fba",
+    solution=None,
+    processes=None,
+    growth_threshold=None,
+    **kwargs
+):
+    """
+    Knock out all combinations of up to `order` elements.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The metabolic model to perform deletions in.
+    entity : 'gene' or 'reaction'
+        The entity to knockout (``cobra.Gene`` or ``cobra.Reaction``).
+    elements : list
+        The identifiers of the genes or reactions to combine.
+    order : int
+        The largest number of elements that are knocked out together.
+    method: {"fba", "moma", "linear moma", "room", "linear room"}, optional
+        Method used to predict the growth rate.
+    solution : cobra.Solution, optional
+        A previous solution to use as a reference for (linear) MOMA or ROOM.
+    processes : int, optional
+        The number of parallel processes to run.
+    growth_threshold : float, optional
+        Knockouts with a growth rate below this value, or without a growth
+        rate, are considered lethal. Defaults to 1% of the wild-type growth
+        rate. Only used with FBA.
+    kwargs :
+        Passed on to underlying simulation functions.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The results of all knockouts of 1 to `order` elements with the
+        columns 'ids', 'growth' and 'status'.
+
+    """
+    if order < 1:
+        raise ValueError("The order must be a positive integer.")
+    elements = list(OrderedDict.fromkeys(elements))
+    if method != "fba":
+        args = set(
+            frozenset(comb)
+            for size in range(1, order + 1)
+            for comb in combinations(elements, size)
+        )
+        return _deletions(model, entity, args, method, solution, processes, **kwargs)
+
+    if growth_threshold is None:
+        growth_threshold = model.slim_optimize(error_value=None) * 1e-02
+    # maps every lethal knockout to the (growth, status) of a lethal subset
+    lethal = {}
+    rows = []
+    for size in range(1, order + 1):
+        args = set()
+        for comb in combinations(elements, size):
+            ids = frozenset(comb)
+            for subset in combinations(comb, size - 1):
+                if frozenset(subset) in lethal:
+                    lethal[ids] = lethal[frozenset(subset)]
+                    rows.append((set(ids),) + lethal[ids])
+                    break
+            else:
+                args.add(ids)
+        result = _deletions(model, entity, args, method, solution, processes, **kwargs)
+        for ids, growth, status in result.itertuples(index=False):
+            if isnan(growth) or growth < growth_threshold:
+                lethal[frozenset(ids)] = (growth, status)
+            rows.append((ids, growth, status))
+    results = pd.DataFrame(rows, columns=["ids", "growth", "status"])
+    results.knockout._index()
+    return results
+
+
 def _entities_ids(entities):
     try:
         return [e.id for e in entities]
@@ -411,6 +581,152 @@ def double_gene_deletion(
     )
 
 
+def multi_reaction_deletion(
+    model,
+    reaction_list=None,
+    order=2,
+    method="fba",
+    solution=None,
+    processes=None,
+    growth_threshold=None,
+    **kwargs
+):
+    """
+    Knock out all combinations of up to `order` reactions from a given list.
+
+    The knockouts are simulated by increasing size. With FBA, any
+    combination that contains a lethal knockout can not grow either, so it
+    is not simulated and reported with the growth rate and status of that
+    lethal knockout instead. Each combination is only considered once
+    regardless of the order of its reactions.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The metabolic model to perform deletions in.
+    reaction_list : iterable, optional
+        ``cobra.Reaction``s to be deleted. If not passed,
+        all the reactions from the model are used.
+    order : int, optional
+        The largest number of reactions that are knocked out together
+        (default 2).
+    method: {"fba", "moma", "linear moma", "room", "linear room"}, optional
+        Method used to predict the growth rate. Lethal knockouts are only
+        skipped with FBA.
+    solution : cobra.Solution, optional
+        A previous solution to use as a reference for (linear) MOMA or ROOM.
+    processes : int, optional
+        The number of parallel processes to run. Can speed up the computations
+        if the number of knockouts to perform is large. If not passed,
+        will be set to the number of CPUs found.
+    growth_threshold : float, optional
+        Knockouts with a growth rate below this value, or without a growth
+        rate, are considered lethal. Defaults to 1% of the wild-type growth
+        rate.
+    kwargs :
+        Keyword arguments are passed on to underlying simulation functions
+        such as ``add_room``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A representation of all combinations of 1 to `order` reaction
+        deletions. The columns are 'growth' and 'status', where
+
+        index : tuple(str)
+            The reaction identifiers that were knocked out.
+        growth : float
+            The growth rate of the adjusted model.
+        status : str
+            The solution's status.
+
+    """
+    return _multi_order_deletion(
+        model,
+        "reaction",
+        _element_lists(model.reactions, reaction_list)[0],
+        order,
+        method=method,
+        solution=solution,
+        processes=processes,
+        growth_threshold=growth_threshold,
+        **kwargs
+    )
+
+
+def multi_gene_deletion(
+    model,
+    gene_list=None,
+    order=2,
+    method="fba",
+    solution=None,
+    processes=None,
+    growth_threshold=None,
+    **kwargs
+):
+    """
+    Knock out all combinations of up to `order` genes from a given list.
+
+    The knockouts are simulated by increasing size. With FBA, any
+    combination that contains a lethal knockout can not grow either, so it
+    is not simulated and reported with the growth rate and status of that
+    lethal knockout instead. Each combination is only considered once
+    regardless of the order of its genes.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The metabolic model to perform deletions in.
+    gene_list : iterable, optional
+        ``cobra.Gene``s to be deleted. If not passed,
+        all the genes from the model are used.
+    order : int, optional
+        The largest number of genes that are knocked out together
+        (default 2).
+    method: {"fba", "moma", "linear moma", "room", "linear room"}, optional
+        Method used to predict the growth rate. Lethal knockouts are only
+        skipped with FBA.
+    solution : cobra.Solution, optional
+        A previous solution to use as a reference for (linear) MOMA or ROOM.
+    processes : int, optional
+        The number of parallel processes to run. Can speed up the computations
+        if the number of knockouts to perform is large. If not passed,
+        will be set to the number of CPUs found.
+    growth_threshold : float, optional
+        Knockouts with a growth rate below this value, or without a growth
+        rate, are considered lethal. Defaults to 1% of the wild-type growth
+        rate.
+    kwargs :
+        Keyword arguments are passed on to underlying simulation functions
+        such as ``add_room``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A representation of all combinations of 1 to `order` gene
+        deletions. The columns are 'growth' and 'status', where
+
+        index : tuple(str)
+            The gene identifiers that were knocked out.
+        growth : float
+            The growth rate of the adjusted model.
+        status : str
+            The solution's status.
+
+    """
+    return _multi_order_deletion(
+        model,
+        "gene",
+        _element_lists(model.genes, gene_list)[0],
+        order,
+        method=method,
+        solution=solution,
+        processes=processes,
+        growth_threshold=growth_threshold,
+        **kwargs
+    )
+
+
 @pd.api.extensions.register_dataframe_accessor("knockout")
 class KnockoutAccessor:
     """Access unique combinations of reactions in deletion results.
@@ -429,6 +745,9 @@ class KnockoutAccessor:
     - sets of reactions or genes (for multi-deletions)
     - sets of reactions IDs or gene IDs
     - list of sets of objects or IDs (to get several multi-deletions)
+
+    Lookups use a hash index from knockouts to rows, so a query only takes
+    time proportional to the number of requested deletions.
     """
 
     def __init__(self, pandas_obj: pd.DataFrame) -> None:
@@ -441,6 +760,8 @@ class KnockoutAccessor:
         """
         self._validate(pandas_obj)
         self._result = pandas_obj
+        self._labels = None
+        self._size = None
 
     @staticmethod
     def _validate(obj: pd.DataFrame) -> None:
@@ -448,6 +769,24 @@ class KnockoutAccessor:
         if any(name not in obj.columns for name in ["ids", "growth", "status"]):
             raise AttributeError("Must be DataFrame returned by a deletion method.")
 
+    def _index(self) -> Dict[FrozenSet[str], List[Hashable]]:
+        """Return a map from each knockout to the labels of its rows.
+
+        The index is built on first use and refers to row labels rather than
+        positions, so it stays valid when the data frame is sorted or rows are
+        dropped in place. Labels may repeat, so the selected rows have to be
+        checked against the requested knockouts. The index is rebuilt whenever
+        the number of rows changes but the 'ids' column of existing rows must
+        not be modified.
+        """
+        if self._labels is None or self._size != len(self._result):
+            labels = {}
+            for label, knockout in zip(self._result.index, self._result["ids"]):
+                labels.setdefault(frozenset(knockout), []).append(label)
+            self._labels = labels
+            self._size = len(self._result)
+        return self._labels
+
     def __getitem__(
         self,
         args: Union[
@@ -494,7 +833,7 @@ class KnockoutAccessor:
             except AttributeError:
                 # are already strings
                 args = [{obj} for obj in args]
-        elif isinstance(args[0], set):
+        elif isinstance(args[0], (set, frozenset)):
             try:
                 args = [set(elem.id for elem in obj) for obj in args]
             except AttributeError:
@@ -505,5 +844,13 @@ class KnockoutAccessor:
                 "lists of Reactions of Genes, or lists of sets "
                 "of Reactions or Genes."
             )
-        found = [x in args for x in self._result.ids]
-        return self._result[found]
+        index = self._index()
+        knockouts = {frozenset(knockout) for knockout in args}
+        labels = set()
+        for knockout in knockouts:
+            labels.update(index.get(knockout, ()))
+        rows = self._result.index.get_indexer_for(list(labels))
+        selected = self._result.iloc[sorted(set(rows[rows >= 0]))]
+        # Repeated labels, e.g., in concatenated results, also select the rows
+        # of other knockouts.
+        return selected[[frozenset(ids) in knockouts for ids in selected["ids"]]]
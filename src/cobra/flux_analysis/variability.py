@@ -2,14 +2,19 @@
 
 from __future__ import absolute_import
 
+import hashlib
+import io
+import json
 import logging
 import multiprocessing
 from builtins import map
 from warnings import warn
 
-from numpy import zeros
+from numpy import array, flatnonzero, isinf, ones, zeros
+from optlang.interface import OPTIMAL
 from optlang.symbolics import Zero
-from pandas import DataFrame
+from pandas import DataFrame, concat
+from six import iteritems
 
 from cobra.core import Configuration, get_solution
 from cobra.flux_analysis.deletion import single_gene_deletion, single_reaction_deletion
@@ -22,20 +27,30 @@ from cobra.util import solver as sutil
 LOGGER = logging.getLogger(__name__)
 CONFIGURATION = Configuration()
 
+_SENSES = {"min": "minimum", "max": "maximum"}
 
-def _init_worker(model, loopless, sense):
+
+def _init_worker(model, loopless):
     """Initialize a global model object for multiprocessing."""
     global _model
     global _loopless
     _model = model
-    _model.solver.objective.direction = sense
     _loopless = loopless
 
 
-def _fva_step(reaction_id):
+def _fva_optimize(rxn, sense, scan=None):
+    """Minimize or maximize the flux of a single reaction.
+
+    If a list of reactions is passed as `scan`, their fluxes in the obtained
+    solution are returned as well (None if the solution is not optimal).
+
+    """
     global _model
     global _loopless
-    rxn = _model.reactions.get_by_id(reaction_id)
+    # Only touch the direction if needed since consecutive tasks usually
+    # share the same sense.
+    if _model.solver.objective.direction != sense:
+        _model.solver.objective.direction = sense
     # The previous objective assignment already triggers a reset
     # so directly update coefs here to not trigger redundant resets
     # in the history manager which can take longer than the actual
@@ -45,6 +60,12 @@ def _fva_step(reaction_id):
     )
     _model.slim_optimize()
     sutil.check_solver_status(_model.solver.status)
+    fluxes = None
+    if scan is not None and _model.solver.status == OPTIMAL:
+        # Has to be read before the objective is touched again since some
+        # solvers discard the solution on any problem modification.
+        primals = _model.solver.primal_values
+        fluxes = array([primals[r.id] - primals[r.reverse_id] for r in scan])
     if _loopless:
         value = loopless_fva_iter(_model, rxn)
     else:
@@ -60,7 +81,470 @@ def _fva_step(reaction_id):
     _model.solver.objective.set_linear_coefficients(
         {rxn.forward_variable: 0, rxn.reverse_variable: 0}
     )
-    return reaction_id, value
+    return value, fluxes
+
+
+def _fva_step(args):
+    """Minimize or maximize the flux of a single reaction.
+
+    The objective sense is passed along with every task so that a single
+    pool of workers can serve both the minimization and the maximization.
+
+    """
+    sense, reaction_id = args
+    value, _ = _fva_optimize(_model.reactions.get_by_id(reaction_id), sense)
+    return sense, reaction_id, value
+
+
+def _resolve_at_bounds(fluxes, bounds, pending, reaction_ids, tolerance):
+    """Resolve all pending reactions whose flux sits at a reachable bound.
+
+    A flux at the lower (upper) bound in any feasible solution is necessarily
+    the minimum (maximum) of that reaction. The resolved reactions are
+    removed from `pending` in place.
+
+    Returns
+    -------
+    list
+        The (sense, reaction identifier, value) tuples that were resolved.
+
+    """
+    results = []
+    for sense, bound in zip(("min", "max"), bounds):
+        at_bound = pending[sense] & (abs(fluxes - bound) <= tolerance)
+        pending[sense][at_bound] = False
+        results.extend(
+            (sense, reaction_ids[i], bound[i]) for i in flatnonzero(at_bound)
+        )
+    return results
+
+
+def _fva_pruned_steps(args):
+    """Run FVA for a chunk of reactions, pruning with every solution.
+
+    After each LP, all reactions of the chunk that still need to be
+    minimized or maximized and whose flux already sits at the respective
+    bound are resolved without solving their own LP. Returns the results and
+    the number of solved LPs.
+
+    """
+    global _model
+    reaction_ids, skip, tolerance = args
+    reactions = [_model.reactions.get_by_id(rxn_id) for rxn_id in reaction_ids]
+    bounds = array([r.bounds for r in reactions], dtype=float).T
+    pending = {
+        sense: array(
+            [(sense, rxn_id) not in skip for rxn_id in reaction_ids], dtype=bool
+        )
+        for sense in ("min", "max")
+    }
+    results = []
+    n_solved = 0
+    for sense in ("min", "max"):
+        for i, rxn in enumerate(reactions):
+            if not pending[sense][i]:
+                continue
+            pending[sense][i] = False
+            n_solved += 1
+            value, fluxes = _fva_optimize(rxn, sense, scan=reactions)
+            results.append((sense, rxn.id, value))
+            if fluxes is not None:
+                results.extend(
+                    _resolve_at_bounds(fluxes, bounds, pending, reaction_ids, tolerance)
+                )
+    return results, n_solved
+
+
+def _add_fva_objective(model, fraction_of_optimum, pfba_factor=None):
+    """Constrain the model's objective and replace it with a zero objective.
+
+    Adds the current objective as the variable "fva_old_objective" bounded by
+    the fraction of its optimum and, if `pfba_factor` is given, the total flux
+    as the variable "flux_sum" bounded by the factor times its minimum. The
+    model's objective is set to zero afterwards so that FVA steps only need to
+    set the coefficients of the reaction of interest.
+
+    Returns
+    -------
+    float
+        The optimal value of the original objective.
+
+    """
+    prob = model.problem
+    # Safety check before setting up FVA.
+    model.slim_optimize(
+        error_value=None,
+        message="There is no optimal solution for the " "chosen objective!",
+    )
+    optimum = model.solver.objective.value
+    # Add the previous objective as a variable to the model then set it to
+    # zero. This also uses the fraction to create the lower/upper bound for
+    # the old objective.
+    # TODO: Use utility function here (fix_objective_as_constraint)?
+    if model.solver.objective.direction == "max":
+        fva_old_objective = prob.Variable(
+            "fva_old_objective",
+            lb=fraction_of_optimum * optimum,
+        )
+    else:
+        fva_old_objective = prob.Variable(
+            "fva_old_objective",
+            ub=fraction_of_optimum * optimum,
+        )
+    fva_old_obj_constraint = prob.Constraint(
+        model.solver.objective.expression - fva_old_objective,
+        lb=0,
+        ub=0,
+        name="fva_old_objective_constraint",
+    )
+    model.add_cons_vars([fva_old_objective, fva_old_obj_constraint])
+
+    if pfba_factor is not None:
+        if pfba_factor < 1.0:
+            warn(
+                "The 'pfba_factor' should be larger or equal to 1.",
+                UserWarning,
+            )
+        with model:
+            add_pfba(model, fraction_of_optimum=0)
+            ub = model.slim_optimize(error_value=None)
+            flux_sum = prob.Variable("flux_sum", ub=pfba_factor * ub)
+            flux_sum_constraint = prob.Constraint(
+                model.solver.objective.expression - flux_sum,
+                lb=0,
+                ub=0,
+                name="flux_sum_constraint",
+            )
+        model.add_cons_vars([flux_sum, flux_sum_constraint])
+
+    model.objective = Zero  # This will trigger the reset as well
+    return optimum
+
+
+def _optimize_variable(model, variable, direction):
+    """Return the optimum of a single variable under a zero objective."""
+    model.solver.objective.set_linear_coefficients({variable: 1})
+    model.solver.objective.direction = direction
+    try:
+        return model.slim_optimize(
+            error_value=None,
+            message="There is no optimal solution for the " "chosen objective!",
+        )
+    finally:
+        model.solver.objective.set_linear_coefficients({variable: 0})
+
+
+def _update_fva_objective(
+    model, direction, fraction_of_optimum, pfba_factor=None, optimum=None
+):
+    """Re-tighten the auxiliary variables added by `_add_fva_objective`.
+
+    Only the bounds of "fva_old_objective" and "flux_sum" are changed so the
+    problem does not need to be rebuilt. If `optimum` is None the optimum of
+    the old objective is determined again, e.g., after bounds have changed.
+
+    Returns
+    -------
+    float
+        The optimal value of the original objective.
+
+    """
+    fva_old_objective = model.variables.fva_old_objective
+    if pfba_factor is not None:
+        # The total flux constraint must not restrict the old objective.
+        flux_sum = model.variables.flux_sum
+        flux_sum.set_bounds(lb=None, ub=None)
+    if optimum is None:
+        fva_old_objective.set_bounds(lb=None, ub=None)
+        optimum = _optimize_variable(model, fva_old_objective, direction)
+    if direction == "max":
+        fva_old_objective.set_bounds(lb=fraction_of_optimum * optimum, ub=None)
+    else:
+        fva_old_objective.set_bounds(lb=None, ub=fraction_of_optimum * optimum)
+    if pfba_factor is not None:
+        flux_sum.ub = pfba_factor * _optimize_variable(model, flux_sum, "min")
+    return optimum
+
+
+def _apply_fva_changes(model, changes):
+    """Apply accumulated bound and objective changes to an FVA model."""
+    for rxn_id, bounds in iteritems(changes["bounds"]):
+        model.reactions.get_by_id(rxn_id).bounds = bounds
+    constraint = model.constraints.fva_old_objective_constraint
+    coefficients = {}
+    for rxn_id, coefficient in iteritems(changes["objective"]):
+        rxn = model.reactions.get_by_id(rxn_id)
+        coefficients[rxn.forward_variable] = coefficient
+        coefficients[rxn.reverse_variable] = -coefficient
+    constraint.set_linear_coefficients(coefficients)
+    for name, (lb, ub) in iteritems(changes["variables"]):
+        model.variables[name].set_bounds(lb=lb, ub=ub)
+
+
+def _fva_session_step(args):
+    """Run a chunk of FVA steps after synchronizing the worker's model."""
+    global _state
+    state, changes, sense, reaction_ids = args
+    if _state != state:
+        _apply_fva_changes(_model, changes)
+        _state = state
+    return [_fva_step((sense, rxn_id)) for rxn_id in reaction_ids]
+
+
+def _init_session_worker(model, loopless):
+    """Initialize a global model object for a persistent FVA session."""
+    global _state
+    _init_worker(model, loopless)
+    _state = 0
+
+
+class FVASession(object):
+    """A persistent session for repeated flux variability analyses.
+
+    The model is prepared for FVA and sent to the worker processes only
+    once. Afterwards, bounds, objective coefficients and the FVA parameters
+    can be changed cheaply and every subsequent call to `run` only transmits
+    the accumulated changes along with the reactions to analyze.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model for which to run the analyses. It will *not* be modified
+        since the session works on its own copy.
+    loopless : boolean, optional
+        Whether to return only loopless solutions.
+    fraction_of_optimum : float, optional
+        Must be <= 1.0. Requires that the objective value is at least the
+        fraction times maximum objective value.
+    pfba_factor : float, optional
+        Constrain the total sum of absolute fluxes to be at most this factor
+        times the smallest possible sum of absolute fluxes. Can only be
+        changed later on if it was given at creation.
+    processes : int, optional
+        The number of parallel processes to run. If not explicitly passed,
+        will be set from the global configuration singleton.
+
+    Attributes
+    ----------
+    model : cobra.Model
+        The session's copy of the model prepared for FVA.
+    processes : int
+        The number of worker processes.
+
+    Notes
+    -----
+    Use the session as a context manager or call `close` explicitly in order
+    to shut down the worker processes.
+
+    Examples
+    --------
+    >>> with FVASession(model, processes=4) as session:
+    ...     reference = session.run()
+    ...     session.set_bounds({"EX_o2_e": (0, 0)})
+    ...     anaerobic = session.run()
+
+    See Also
+    --------
+    flux_variability_analysis
+
+    """
+
+    def __init__(
+        self,
+        model,
+        loopless=False,
+        fraction_of_optimum=1.0,
+        pfba_factor=None,
+        processes=None,
+    ):
+        """Prepare the model and start the worker processes."""
+        if processes is None:
+            processes = CONFIGURATION.processes
+        self.processes = max(min(processes, len(model.reactions)), 1)
+        self.model = model.copy()
+        self._loopless = loopless
+        self._fraction_of_optimum = fraction_of_optimum
+        self._pfba_factor = pfba_factor
+        self._direction = self.model.solver.objective.direction
+        self._optimum = _add_fva_objective(self.model, fraction_of_optimum, pfba_factor)
+        self._changes = {"bounds": {}, "objective": {}, "variables": {}}
+        self._state = 0
+        self._stale = False
+        self._pool = None
+        if self.processes > 1:
+            self._pool = multiprocessing.Pool(
+                self.processes,
+                initializer=_init_session_worker,
+                initargs=(self.model, loopless),
+            )
+
+    def __enter__(self):
+        """Use the session as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Shut down the worker processes."""
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    @property
+    def fraction_of_optimum(self):
+        """Get or set the fraction of the optimum to maintain."""
+        return self._fraction_of_optimum
+
+    @fraction_of_optimum.setter
+    def fraction_of_optimum(self, value):
+        if value != self._fraction_of_optimum:
+            self._fraction_of_optimum = value
+            self._stale = True
+
+    @property
+    def pfba_factor(self):
+        """Get or set the factor for the total flux constraint."""
+        return self._pfba_factor
+
+    @pfba_factor.setter
+    def pfba_factor(self, value):
+        if self._pfba_factor is None or value is None:
+            raise ValueError(
+                "The 'pfba_factor' can only be changed in sessions that "
+                "were created with one."
+            )
+        if value != self._pfba_factor:
+            self._pfba_factor = value
+            self._stale = True
+
+    def set_bounds(self, bounds):
+        """Change reaction bounds for all subsequent analyses.
+
+        Parameters
+        ----------
+        bounds : dict
+            A dictionary mapping reactions or their identifiers to
+            (lower bound, upper bound) tuples.
+
+        """
+        for rxn, value in iteritems(bounds):
+            rxn_id = getattr(rxn, "id", rxn)
+            self.model.reactions.get_by_id(rxn_id).bounds = value
+            self._changes["bounds"][rxn_id] = tuple(value)
+        # The optimum of the original objective has to be determined again.
+        self._optimum = None
+        self._stale = True
+
+    def set_objective(self, coefficients):
+        """Change the linear coefficients of the original objective.
+
+        Reactions not mentioned keep their current coefficient.
+
+        Parameters
+        ----------
+        coefficients : dict
+            A dictionary mapping reactions or their identifiers to their new
+            objective coefficient.
+
+        """
+        changes = {}
+        for rxn, coefficient in iteritems(coefficients):
+            changes[getattr(rxn, "id", rxn)] = coefficient
+        _apply_fva_changes(
+            self.model, {"bounds": {}, "objective": changes, "variables": {}}
+        )
+        self._changes["objective"].update(changes)
+        self._optimum = None
+        self._stale = True
+
+    def _update(self):
+        """Re-tighten the FVA constraints after changes if necessary."""
+        if not self._stale:
+            return
+        self._optimum = _update_fva_objective(
+            self.model,
+            self._direction,
+            self._fraction_of_optimum,
+            self._pfba_factor,
+            self._optimum,
+        )
+        variables = self._changes["variables"]
+        for name in ("fva_old_objective", "flux_sum"):
+            if name in self.model.variables:
+                var = self.model.variables[name]
+                variables[name] = (var.lb, var.ub)
+        self._state += 1
+        self._stale = False
+
+    def _iter_results(self, reaction_ids, chunk_size=None):
+        """Yield (sense, reaction identifier, value) tuples as they finish.
+
+        Reactions are processed in blocks of `chunk_size` reactions with the
+        minimization and maximization of a block following each other.
+
+        """
+        self._update()
+        if chunk_size is None:
+            chunk_size = max(len(reaction_ids) // self.processes, 1)
+        tasks = [
+            (sense, reaction_ids[i : i + chunk_size])
+            for i in range(0, len(reaction_ids), chunk_size)
+            for sense in ("min", "max")
+        ]
+        if self._pool is None:
+            _init_worker(self.model, self._loopless)
+            for sense, block in tasks:
+                for rxn_id in block:
+                    yield _fva_step((sense, rxn_id))
+            return
+        for chunk in self._pool.imap_unordered(
+            _fva_session_step,
+            [(self._state, self._changes, sense, block) for sense, block in tasks],
+        ):
+            for result in chunk:
+                yield result
+
+    def run(self, reaction_list=None):
+        """Determine the minimum and maximum flux for each reaction.
+
+        Parameters
+        ----------
+        reaction_list : list of cobra.Reaction or str, optional
+            The reactions for which to obtain min/max fluxes. If None will use
+            all reactions in the model (default).
+
+        Returns
+        -------
+        pandas.DataFrame
+            A data frame with reaction identifiers as the index and the two
+            columns "minimum" and "maximum".
+
+        """
+        if reaction_list is None:
+            reaction_ids = [r.id for r in self.model.reactions]
+        else:
+            if not isinstance(reaction_list, list):
+                reaction_list = [reaction_list]
+            # Reaction objects may stem from the original model.
+            reaction_ids = [
+                r.id
+                for r in self.model.reactions.get_by_any(
+                    [getattr(r, "id", r) for r in reaction_list]
+                )
+            ]
+        fva_result = DataFrame(
+            {
+                "minimum": zeros(len(reaction_ids), dtype=float),
+                "maximum": zeros(len(reaction_ids), dtype=float),
+            },
+            index=reaction_ids,
+        )
+        for sense, rxn_id, value in self._iter_results(reaction_ids):
+            fva_result.at[rxn_id, _SENSES[sense]] = value
+        return fva_result[["minimum", "maximum"]]
 
 
 def flux_variability_analysis(
@@ -70,6 +554,7 @@ def flux_variability_analysis(
     fraction_of_optimum=1.0,
     pfba_factor=None,
     processes=None,
+    prune=False,
 ):
     """
     Determine the minimum and maximum possible flux value for each reaction.
@@ -101,6 +586,11 @@ def flux_variability_analysis(
     processes : int, optional
         The number of parallel processes to run. If not explicitly passed,
         will be set from the global configuration singleton.
+    prune : boolean, optional
+        Whether to inspect the flux distribution of every solved problem and
+        skip the problems of all reactions whose flux already sits at the
+        lower or upper bound they are supposed to reach (default False).
+        Cannot be combined with `loopless`. Please also refer to the notes.
 
     Returns
     -------
@@ -124,6 +614,13 @@ def flux_variability_analysis(
     included constraints that force a loop (for instance by setting all fluxes
     in a loop to be non-zero) this loop will be included in the solution.
 
+    Pruning exploits that any feasible flux distribution in which a reaction
+    carries a flux equal to its lower (upper) bound proves that bound to be
+    the reaction's minimum (maximum). Every solution is scanned for such
+    reactions, starting with the reference solution, which typically saves
+    a large share of the problems on genome-scale models. When running in
+    parallel, each process can only prune the reactions assigned to it.
+
     References
     ----------
     .. [1] Computationally efficient flux variability analysis.
@@ -136,7 +633,14 @@ def flux_variability_analysis(
        Desouki AA, Jarre F, Gelius-Dietrich G, Lercher MJ.
        Bioinformatics. 2015 Jul 1;31(13):2159-65.
        doi: 10.1093/bioinformatics/btv096.
+
+    See Also
+    --------
+    FVASession : Repeated analyses without restarting the worker processes.
+
     """
+    if prune and loopless:
+        raise ValueError("Pruning can not be combined with loopless FVA.")
     if reaction_list is None:
         reaction_ids = [r.id for r in model.reactions]
     else:
@@ -154,77 +658,468 @@ def flux_variability_analysis(
         },
         index=reaction_ids,
     )
-    prob = model.problem
     with model:
-        # Safety check before setting up FVA.
-        model.slim_optimize(
-            error_value=None,
-            message="There is no optimal solution for the " "chosen objective!",
-        )
-        # Add the previous objective as a variable to the model then set it to
-        # zero. This also uses the fraction to create the lower/upper bound for
-        # the old objective.
-        # TODO: Use utility function here (fix_objective_as_constraint)?
-        if model.solver.objective.direction == "max":
-            fva_old_objective = prob.Variable(
-                "fva_old_objective",
-                lb=fraction_of_optimum * model.solver.objective.value,
+        if prune:
+            return _pruned_flux_variability_analysis(
+                model,
+                reaction_ids,
+                fva_result,
+                fraction_of_optimum,
+                pfba_factor,
+                processes,
             )
+        _add_fva_objective(model, fraction_of_optimum, pfba_factor)
+        # Both passes share the same pool of workers since the objective
+        # sense is passed along with every reaction.
+        tasks = [(sense, rxn_id) for sense in ("min", "max") for rxn_id in reaction_ids]
+        if processes > 1:
+            chunk_size = len(tasks) // processes
+            pool = multiprocessing.Pool(
+                processes,
+                initializer=_init_worker,
+                initargs=(model, loopless),
+            )
+            for sense, rxn_id, value in pool.imap_unordered(
+                _fva_step, tasks, chunksize=chunk_size
+            ):
+                fva_result.at[rxn_id, _SENSES[sense]] = value
+            pool.close()
+            pool.join()
         else:
-            fva_old_objective = prob.Variable(
-                "fva_old_objective",
-                ub=fraction_of_optimum * model.solver.objective.value,
+            _init_worker(model, loopless)
+            for sense, rxn_id, value in map(_fva_step, tasks):
+                fva_result.at[rxn_id, _SENSES[sense]] = value
+
+    return fva_result[["minimum", "maximum"]]
+
+
+def _pruned_flux_variability_analysis(
+    model, reaction_ids, fva_result, fraction_of_optimum, pfba_factor, processes
+):
+    """Run FVA that skips all problems already resolved by earlier solutions.
+
+    Needs to be called inside of a model context.
+
+    """
+    tolerance = model.tolerance
+    skip = set()
+    n_problems = 2 * len(reaction_ids)
+    if pfba_factor is None:
+        # The reference solution is feasible for the FVA problem as well
+        # (unlike with a flux sum constraint) so it can be scanned right away.
+        optimum = model.slim_optimize()
+        threshold = fraction_of_optimum * optimum
+        if model.solver.objective.direction == "max":
+            feasible = optimum >= threshold - tolerance
+        else:
+            feasible = optimum <= threshold + tolerance
+        if model.solver.status == OPTIMAL and feasible:
+            reactions = model.reactions.get_by_any(reaction_ids)
+            fluxes = get_solution(model, reactions=reactions).fluxes.values
+            bounds = array([r.bounds for r in reactions], dtype=float).T
+            pending = {
+                sense: ones(len(reaction_ids), dtype=bool) for sense in ("min", "max")
+            }
+            for sense, rxn_id, value in _resolve_at_bounds(
+                fluxes, bounds, pending, reaction_ids, tolerance
+            ):
+                fva_result.at[rxn_id, _SENSES[sense]] = value
+                skip.add((sense, rxn_id))
+    _add_fva_objective(model, fraction_of_optimum, pfba_factor)
+    # Every process handles both senses for its share of reactions which
+    # allows pruning across the minimization and the maximization.
+    chunks = [(reaction_ids[i::processes], skip, tolerance) for i in range(processes)]
+    n_solved = 0
+    if processes > 1:
+        pool = multiprocessing.Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(model, False),
+        )
+        results = pool.imap_unordered(_fva_pruned_steps, chunks)
+    else:
+        _init_worker(model, False)
+        results = map(_fva_pruned_steps, chunks)
+    for chunk, n_chunk_solved in results:
+        for sense, rxn_id, value in chunk:
+            fva_result.at[rxn_id, _SENSES[sense]] = value
+        n_solved += n_chunk_solved
+    if processes > 1:
+        pool.close()
+        pool.join()
+    LOGGER.info(
+        "Pruning resolved %d of %d FVA problems without solving them.",
+        n_problems - n_solved,
+        n_problems,
+    )
+    return fva_result[["minimum", "maximum"]]
+
+
+def parametric_flux_variability_analysis(
+    model,
+    fractions,
+    pfba_factors=None,
+    reaction_list=None,
+    loopless=False,
+    processes=None,
+):
+    """
+    Run flux variability analyses for several parameter values in one pass.
+
+    The reference optimum is determined and the model is sent to the worker
+    processes only once. Between the sweeps only the bounds of the auxiliary
+    objective (and flux sum) variables are re-tightened so that every worker
+    continues from the solver state of the previous sweep.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model for which to run the analysis. It will *not* be modified.
+    fractions : iterable of float
+        The values of `fraction_of_optimum` to analyze. Each must be <= 1.0.
+    pfba_factors : iterable of float, optional
+        The values of `pfba_factor` to analyze. Every combination with
+        `fractions` is analyzed if given.
+    reaction_list : list of cobra.Reaction or str, optional
+        The reactions for which to obtain min/max fluxes. If None will use
+        all reactions in the model (default).
+    loopless : boolean, optional
+        Whether to return only loopless solutions.
+    processes : int, optional
+        The number of parallel processes to run. If not explicitly passed,
+        will be set from the global configuration singleton.
+
+    Returns
+    -------
+    pandas.DataFrame
+        A data frame with the columns "minimum" and "maximum" indexed by the
+        fraction of the optimum, the pFBA factor (only if `pfba_factors` is
+        given) and the reaction identifier.
+
+    See Also
+    --------
+    flux_variability_analysis
+    FVASession
+
+    """
+    fractions = list(fractions)
+    if pfba_factors is None:
+        parameters = [(fraction, None) for fraction in fractions]
+        names = ["fraction_of_optimum", "reaction"]
+    else:
+        pfba_factors = list(pfba_factors)
+        parameters = [
+            (fraction, factor) for fraction in fractions for factor in pfba_factors
+        ]
+        names = ["fraction_of_optimum", "pfba_factor", "reaction"]
+    if not parameters:
+        raise ValueError("At least one set of parameters is required.")
+
+    results = []
+    with FVASession(
+        model,
+        loopless=loopless,
+        fraction_of_optimum=parameters[0][0],
+        pfba_factor=parameters[0][1],
+        processes=processes,
+    ) as session:
+        for fraction, factor in parameters:
+            session.fraction_of_optimum = fraction
+            if factor is not None:
+                session.pfba_factor = factor
+            results.append(session.run(reaction_list))
+    keys = parameters if pfba_factors is not None else fractions
+    return concat(results, keys=keys, names=names)
+
+
+def _fva_fingerprint(model, loopless, fraction_of_optimum, pfba_factor):
+    """Identify a model and FVA parameters for checkpointing."""
+    digest = hashlib.sha256()
+    digest.update(
+        repr(
+            (
+                loopless,
+                fraction_of_optimum,
+                pfba_factor,
+                model.solver.objective.direction,
+                str(model.solver.objective.expression),
             )
-        fva_old_obj_constraint = prob.Constraint(
-            model.solver.objective.expression - fva_old_objective,
-            lb=0,
-            ub=0,
-            name="fva_old_objective_constraint",
+        ).encode("utf-8")
+    )
+    for rxn in model.reactions:
+        stoichiometry = sorted(
+            (met.id, coef) for met, coef in iteritems(rxn.metabolites)
         )
-        model.add_cons_vars([fva_old_objective, fva_old_obj_constraint])
+        digest.update(repr((rxn.id, rxn.bounds, stoichiometry)).encode("utf-8"))
+    for const in model.constraints:
+        digest.update(repr((const.name, const.lb, const.ub)).encode("utf-8"))
+    return digest.hexdigest()
 
-        if pfba_factor is not None:
-            if pfba_factor < 1.0:
-                warn(
-                    "The 'pfba_factor' should be larger or equal to 1.",
-                    UserWarning,
-                )
-            with model:
-                add_pfba(model, fraction_of_optimum=0)
-                ub = model.slim_optimize(error_value=None)
-                flux_sum = prob.Variable("flux_sum", ub=pfba_factor * ub)
-                flux_sum_constraint = prob.Constraint(
-                    model.solver.objective.expression - flux_sum,
-                    lb=0,
-                    ub=0,
-                    name="flux_sum_constraint",
-                )
-            model.add_cons_vars([flux_sum, flux_sum_constraint])
-
-        model.objective = Zero  # This will trigger the reset as well
-        for what in ("minimum", "maximum"):
-            if processes > 1:
-                # We create and destroy a new pool here in order to set the
-                # objective direction for all reactions. This creates a
-                # slight overhead but seems the most clean.
-                chunk_size = len(reaction_ids) // processes
-                pool = multiprocessing.Pool(
-                    processes,
-                    initializer=_init_worker,
-                    initargs=(model, loopless, what[:3]),
+
+def _read_fva_checkpoint(path, fingerprint):
+    """Return the finished reactions from a checkpoint file if it matches."""
+    done = {}
+    try:
+        with io.open(path, encoding="utf-8") as handle:
+            header = json.loads(handle.readline())
+            if header.get("fingerprint") != fingerprint:
+                LOGGER.warning(
+                    "The FVA checkpoint %s belongs to a different model or "
+                    "different parameters and will be overwritten.",
+                    path,
                 )
-                for rxn_id, value in pool.imap_unordered(
-                    _fva_step, reaction_ids, chunksize=chunk_size
-                ):
-                    fva_result.at[rxn_id, what] = value
-                pool.close()
-                pool.join()
-            else:
-                _init_worker(model, loopless, what[:3])
-                for rxn_id, value in map(_fva_step, reaction_ids):
-                    fva_result.at[rxn_id, what] = value
+                return done
+            for line in handle:
+                try:
+                    rxn_id, minimum, maximum = json.loads(line)
+                except ValueError:
+                    # A partially written line from an interrupted run.
+                    break
+                done[rxn_id] = (minimum, maximum)
+    except (IOError, ValueError):
+        pass
+    return done
 
-    return fva_result[["minimum", "maximum"]]
+
+def flux_variability_analysis_iter(
+    model,
+    reaction_list=None,
+    loopless=False,
+    fraction_of_optimum=1.0,
+    pfba_factor=None,
+    processes=None,
+    checkpoint=None,
+    progress=None,
+    chunk_size=None,
+):
+    """
+    Stream the minimum and maximum flux of each reaction as soon as known.
+
+    This is the incremental counterpart to `flux_variability_analysis` for
+    long running analyses. Finished reactions can be written to a checkpoint
+    file so that an interrupted analysis can be resumed.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model for which to run the analysis. It will *not* be modified.
+    reaction_list : list of cobra.Reaction or str, optional
+        The reactions for which to obtain min/max fluxes. If None will use
+        all reactions in the model (default).
+    loopless : boolean, optional
+        Whether to return only loopless solutions.
+    fraction_of_optimum : float, optional
+        Must be <= 1.0. Requires that the objective value is at least the
+        fraction times maximum objective value.
+    pfba_factor : float, optional
+        Constrain the total sum of absolute fluxes to be at most this factor
+        times the smallest possible sum of absolute fluxes.
+    processes : int, optional
+        The number of parallel processes to run. If not explicitly passed,
+        will be set from the global configuration singleton.
+    checkpoint : str or pathlib.Path, optional
+        A file to which every finished reaction is appended. If the file
+        already exists and was created for the same model and parameters,
+        the reactions contained in it are not analyzed again.
+    progress : callable, optional
+        Called with the number of finished reactions and the total number of
+        reactions whenever a reaction is finished.
+    chunk_size : int, optional
+        The number of reactions sent to a process at once. Smaller chunks
+        yield results more continuously (default up to 100).
+
+    Yields
+    ------
+    tuple
+        The reaction identifier, its minimum and its maximum flux. Reactions
+        restored from the checkpoint are yielded first.
+
+    See Also
+    --------
+    flux_variability_analysis
+
+    """
+    if reaction_list is None:
+        reaction_ids = [r.id for r in model.reactions]
+    else:
+        reaction_ids = [r.id for r in model.reactions.get_by_any(reaction_list)]
+    if processes is None:
+        processes = CONFIGURATION.processes
+    processes = max(min(processes, len(reaction_ids)), 1)
+    if chunk_size is None:
+        chunk_size = max(min(len(reaction_ids) // processes, 100), 1)
+
+    done = {}
+    handle = None
+    if checkpoint is not None:
+        fingerprint = _fva_fingerprint(
+            model, loopless, fraction_of_optimum, pfba_factor
+        )
+        done = _read_fva_checkpoint(checkpoint, fingerprint)
+        # Rewriting the valid part also drops a truncated last line.
+        handle = io.open(checkpoint, "w", encoding="utf-8")
+        handle.write(json.dumps({"fingerprint": fingerprint}) + "\n")
+        for rxn_id, (minimum, maximum) in iteritems(done):
+            handle.write(json.dumps([rxn_id, minimum, maximum]) + "\n")
+        handle.flush()
+
+    total = len(reaction_ids)
+    finished = 0
+    try:
+        for rxn_id in reaction_ids:
+            if rxn_id in done:
+                finished += 1
+                if progress is not None:
+                    progress(finished, total)
+                yield (rxn_id,) + tuple(done[rxn_id])
+        remaining = [rxn_id for rxn_id in reaction_ids if rxn_id not in done]
+        if not remaining:
+            return
+        with FVASession(
+            model,
+            loopless=loopless,
+            fraction_of_optimum=fraction_of_optimum,
+            pfba_factor=pfba_factor,
+            processes=processes,
+        ) as session:
+            partial = {}
+            for sense, rxn_id, value in session._iter_results(remaining, chunk_size):
+                partial.setdefault(rxn_id, {})[sense] = value
+                if len(partial[rxn_id]) < 2:
+                    continue
+                values = partial.pop(rxn_id)
+                result = (rxn_id, values["min"], values["max"])
+                if handle is not None:
+                    handle.write(json.dumps(list(result)) + "\n")
+                    handle.flush()
+                finished += 1
+                if progress is not None:
+                    progress(finished, total)
+                yield result
+    finally:
+        if handle is not None:
+            handle.close()
+
+
+def _maximize_flux_sum(model, batch, scan, zero_cutoff):
+    """Maximize the bounded flux through several reactions in one LP.
+
+    Every reaction gets an auxiliary variable bounded above by one and by its
+    net flux in the given direction, similar to the LP in FASTCC. The lower
+    bound of the auxiliary variable is the smallest flux the reaction's
+    bounds allow in that direction, so flux in the opposite direction is
+    penalized but never made infeasible. The sum of auxiliary variables is
+    maximized.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The model to use.
+    batch : list of tuple
+        Pairs of a reaction whose flux should be maximized and the direction
+        of that flux, 1.0 for forward and -1.0 for reverse flux.
+    scan : list of cobra.Reaction
+        The reactions to check for flux in the obtained solution.
+    zero_cutoff : float
+        The cutoff below which flux is considered zero.
+
+    Returns
+    -------
+    list or None
+        The reactions of `scan` that carry flux or None if the problem is
+        not optimal.
+
+    """
+    prob = model.problem
+    with model:
+        obj_vars = []
+        vars_and_cons = []
+        for rxn, direction in batch:
+            lb = min(0.0, direction * rxn.lower_bound, direction * rxn.upper_bound)
+            var = prob.Variable(
+                "auxiliary_{}".format(rxn.id),
+                lb=None if isinf(lb) else lb,
+                ub=1.0,
+            )
+            const = prob.Constraint(
+                direction * rxn.forward_variable
+                - direction * rxn.reverse_variable
+                - var,
+                name="constraint_{}".format(rxn.id),
+                lb=0.0,
+            )
+            vars_and_cons.extend([var, const])
+            obj_vars.append(var)
+        model.add_cons_vars(vars_and_cons)
+        model.objective = prob.Objective(Zero, direction="max", sloppy=True)
+        model.objective.set_linear_coefficients({v: 1.0 for v in obj_vars})
+        model.slim_optimize()
+        if model.solver.status != OPTIMAL:
+            return None
+        primals = model.solver.primal_values
+        return [
+            rxn
+            for rxn in scan
+            if abs(primals[rxn.id] - primals[rxn.reverse_id]) > zero_cutoff
+        ]
+
+
+def _find_blocked_bulk(model, reactions, zero_cutoff, processes):
+    """Find blocked reactions with batched flux maximizations.
+
+    Maximizes the total flux through all remaining irreversible candidates in
+    their respective direction and, separately, the total forward and reverse
+    flux through the remaining reversible candidates. Every reaction carrying
+    flux in one of the solutions is discarded until no further reactions are
+    found. Batches without an optimal solution are split in half. The
+    remainder is verified with a regular FVA.
+
+    """
+    remaining = list(reactions)
+    with model:
+        # Same constraint as FVA with a fraction of zero of the optimum.
+        sutil.fix_objective_as_constraint(model, fraction=0.0)
+        while remaining:
+            irreversible = []
+            reversible = []
+            for rxn in remaining:
+                if rxn.lower_bound < 0 < rxn.upper_bound:
+                    reversible.append(rxn)
+                elif rxn.upper_bound > 0:
+                    irreversible.append((rxn, 1.0))
+                elif rxn.lower_bound < 0:
+                    irreversible.append((rxn, -1.0))
+            batches = [
+                irreversible,
+                [(rxn, 1.0) for rxn in reversible],
+                [(rxn, -1.0) for rxn in reversible],
+            ]
+            found = False
+            while batches:
+                batch = batches.pop()
+                if not batch:
+                    continue
+                active = _maximize_flux_sum(model, batch, remaining, zero_cutoff)
+                if active is None:
+                    if len(batch) > 1:
+                        half = len(batch) // 2
+                        batches.extend([batch[half:], batch[:half]])
+                    continue
+                if active:
+                    found = True
+                    active = set(active)
+                    remaining = [rxn for rxn in remaining if rxn not in active]
+            if not found:
+                break
+    if not remaining:
+        return []
+    flux_span = flux_variability_analysis(
+        model,
+        fraction_of_optimum=0.0,
+        reaction_list=remaining,
+        processes=processes,
+    )
+    return flux_span[flux_span.abs().max(axis=1) < zero_cutoff].index.tolist()
 
 
 def find_blocked_reactions(
@@ -233,6 +1128,7 @@ def find_blocked_reactions(
     zero_cutoff=None,
     open_exchanges=False,
     processes=None,
+    method="fva",
 ):
     """
     Find reactions that cannot carry any flux.
@@ -261,6 +1157,12 @@ def find_blocked_reactions(
         The number of parallel processes to run. Can speed up the computations
         if the number of reactions is large. If not explicitly
         passed, it will be set from the global configuration singleton.
+    method : {"fva", "bulk"}, optional
+        Whether to run a flux variability analysis for all candidate
+        reactions or to first maximize the total flux through all candidates
+        in batched problems, removing every reaction that carries flux, and
+        only analyze a possible remainder individually. The latter needs far
+        fewer problems on large models (default "fva").
 
     Returns
     -------
@@ -268,6 +1170,8 @@ def find_blocked_reactions(
         List with the identifiers of blocked reactions.
 
     """
+    if method not in ("fva", "bulk"):
+        raise ValueError("Unknown method '{}'.".format(method))
     zero_cutoff = normalize_cutoff(model, zero_cutoff)
 
     with model:
@@ -287,6 +1191,13 @@ def find_blocked_reactions(
         reaction_list = solution.fluxes[
             solution.fluxes.abs() < zero_cutoff
         ].index.tolist()
+        if method == "bulk":
+            return _find_blocked_bulk(
+                model,
+                model.reactions.get_by_any(reaction_list),
+                zero_cutoff,
+                processes,
+            )
         # Run FVA to find reactions where both the minimal and maximal flux
         # are zero (below the cut off).
         flux_span = flux_variability_analysis(
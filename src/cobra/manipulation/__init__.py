@@ -4,6 +4,7 @@ from __future__ import absolute_import
 
 from cobra.manipulation.annotate import add_SBO
 from cobra.manipulation.delete import (
+    GPRCircuit,
     delete_model_genes,
     find_gene_knockout_reactions,
     remove_genes,
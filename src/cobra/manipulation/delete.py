@@ -2,8 +2,9 @@
 
 from __future__ import absolute_import
 
-from ast import And, NodeTransformer
+from ast import And, BoolOp, Name, NodeTransformer, Or
 
+import numpy as np
 from six import iteritems, string_types
 
 from cobra.core.gene import ast2str, eval_gpr, parse_gpr
@@ -127,6 +128,162 @@ def find_gene_knockout_reactions(
     ]
 
 
+class GPRCircuit(object):
+    """Evaluate the gene-reaction rules of a model for many knockouts at once.
+
+    All rules are compiled into a single boolean circuit whose inputs are the
+    genes and whose outputs are the reactions. Nested operations of the same
+    kind are flattened and identical sub-expressions are shared between
+    rules. The circuit is evaluated level by level with NumPy where the
+    states of all knockouts are packed into the bits of one array per node.
+
+    Parameters
+    ----------
+    cobra_model : cobra.Model
+        The model whose gene-reaction rules to compile. Later changes to the
+        rules are not reflected in the circuit.
+
+    Attributes
+    ----------
+    genes : list of str
+        The gene identifiers in the column order of gene knockout matrices.
+    reactions : list of str
+        The reaction identifiers in the column order of the results.
+
+    """
+
+    def __init__(self, cobra_model):
+        trees = []
+        genes = [g.id for g in cobra_model.genes]
+        known = set(genes)
+        for reaction in cobra_model.reactions:
+            tree, gene_set = parse_gpr(reaction.gene_reaction_rule)
+            trees.append(tree)
+            genes.extend(sorted(gene_set - known))
+            known.update(gene_set)
+        self.genes = genes
+        self.reactions = [r.id for r in cobra_model.reactions]
+        self._gene_index = {g: i for i, g in enumerate(genes)}
+        self._n_nodes = len(genes)
+        self._depth = [0] * len(genes)
+        self._gates = {}
+        self._outputs = np.array(
+            [-1 if tree is None else self._compile(tree.body) for tree in trees],
+            dtype=int,
+        )
+        self._levels = self._build_levels()
+
+    def _compile(self, expr):
+        """Add the gates of an expression and return its node index."""
+        if isinstance(expr, Name):
+            return self._gene_index[expr.id]
+        if not isinstance(expr, BoolOp) or not isinstance(expr.op, (And, Or)):
+            raise TypeError("unsupported operation  " + repr(expr))
+        kind = type(expr.op)
+        operands = list(expr.values)
+        children = set()
+        while operands:
+            operand = operands.pop()
+            if isinstance(operand, BoolOp) and isinstance(operand.op, kind):
+                operands.extend(operand.values)
+            else:
+                children.add(self._compile(operand))
+        if len(children) == 1:
+            return children.pop()
+        key = (kind, tuple(sorted(children)))
+        if key not in self._gates:
+            self._gates[key] = self._n_nodes
+            self._depth.append(1 + max(self._depth[c] for c in children))
+            self._n_nodes += 1
+        return self._gates[key]
+
+    def _build_levels(self):
+        """Group the gates into NumPy operations that can run together."""
+        groups = {}
+        for (kind, children), node in iteritems(self._gates):
+            ufunc = np.bitwise_and if kind is And else np.bitwise_or
+            groups.setdefault((self._depth[node], ufunc), []).append((node, children))
+        levels = []
+        for depth, ufunc in sorted(groups, key=lambda k: (k[0], k[1].__name__)):
+            gates = groups[depth, ufunc]
+            sizes = [len(children) for _, children in gates]
+            levels.append(
+                (
+                    ufunc,
+                    np.array([node for node, _ in gates], dtype=int),
+                    np.array([c for _, children in gates for c in children], dtype=int),
+                    np.cumsum([0] + sizes[:-1], dtype=int),
+                )
+            )
+        return levels
+
+    def gene_matrix(self, knockouts):
+        """Convert knockouts into a boolean knockout-by-gene matrix.
+
+        Parameters
+        ----------
+        knockouts : iterable
+            Each element is an iterable of genes or gene identifiers that are
+            knocked out together.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean matrix with one row per knockout and one column per
+            entry in ``genes`` that is True for knocked out genes.
+
+        """
+        rows = []
+        columns = []
+        n_knockouts = 0
+        for i, knockout in enumerate(knockouts):
+            n_knockouts += 1
+            for gene in knockout:
+                rows.append(i)
+                columns.append(self._gene_index[str(gene)])
+        matrix = np.zeros((n_knockouts, len(self.genes)), dtype=bool)
+        matrix[rows, columns] = True
+        return matrix
+
+    def knockout_matrix(self, knockouts):
+        """Find the reactions disabled by each knockout.
+
+        Parameters
+        ----------
+        knockouts : iterable or numpy.ndarray
+            Either an iterable whose elements are iterables of genes or gene
+            identifiers that are knocked out together, or a boolean
+            knockout-by-gene matrix as returned by ``gene_matrix``.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean matrix with one row per knockout and one column per
+            entry in ``reactions`` that is True for disabled reactions.
+
+        """
+        if isinstance(knockouts, np.ndarray):
+            knocked = knockouts.astype(bool, copy=False)
+            if knocked.ndim != 2 or knocked.shape[1] != len(self.genes):
+                raise ValueError(
+                    "The knockout matrix must have one column per gene ({}).".format(
+                        len(self.genes)
+                    )
+                )
+        else:
+            knocked = self.gene_matrix(knockouts)
+        n_knockouts = knocked.shape[0]
+        state = np.empty((self._n_nodes, (n_knockouts + 7) // 8), dtype=np.uint8)
+        state[: len(self.genes)] = np.packbits(~knocked.T, axis=1)
+        for ufunc, nodes, children, offsets in self._levels:
+            state[nodes] = ufunc.reduceat(state[children], offsets, axis=0)
+        has_rule = self._outputs >= 0
+        active = np.unpackbits(state[self._outputs[has_rule]], axis=1)
+        disabled = np.zeros((n_knockouts, len(self.reactions)), dtype=bool)
+        disabled[:, has_rule] = active[:, :n_knockouts].T == 0
+        return disabled
+
+
 def delete_model_genes(
     cobra_model, gene_list, cumulative_deletions=True, disable_orphans=False
 ):
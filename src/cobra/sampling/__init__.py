@@ -1,4 +1,7 @@
-from .hr_sampler import HRSampler, shared_np_array, step
+from .hr_sampler import HRSampler, batch_step, shared_np_array, step
 from .achr import ACHRSampler
+from .chrr import CHRRSampler
+from .diagnostics import ConvergenceMonitor, effective_sample_size, split_rhat
 from .optgp import OptGPSampler
 from .sampling import sample
+from .storage import SampleReader
@@ -1,11 +1,12 @@
 """Provide the ACHR sampler class."""
 
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, Union
 
 import numpy as np
 import pandas as pd
 
 from .hr_sampler import HRSampler, step
+from .storage import PathType, SampleReader, create_sample_file
 
 
 if TYPE_CHECKING:
@@ -33,6 +34,8 @@ class ACHRSampler(HRSampler):
     seed : int > 0, optional
         Sets the random number seed. Initialized to the current time stamp
         if None (default None).
+    **kwargs :
+        Further arguments for `HRSampler` such as `sparse` or `cache`.
 
     Attributes
     ----------
@@ -99,27 +102,29 @@ class ACHRSampler(HRSampler):
         super().__init__(model, thinning, nproj=nproj, seed=seed, **kwargs)
         self.generate_fva_warmup()
         self.prev = self.center = self.warmup.mean(axis=0)
-        np.random.seed(self._seed)
+        self._random = self._spawn_generators(1)[0]
 
     def __single_iteration(self) -> None:
         """Run a single iteration of the sampling."""
-        pi = np.random.randint(self.n_warmup)
+        pi = self._random.integers(self.n_warmup)
         # mix in the original warmup points to not get stuck
         delta = self.warmup[pi, :] - self.center
-        self.prev = step(self, self.prev, delta)
+        self.prev = step(self, self.prev, delta, random_state=self._random)
 
         if self.problem.homogeneous and (
             self.n_samples * self.thinning % self.nproj == 0
         ):
-            self.prev = self._reproject(self.prev)
-            self.center = self._reproject(self.center)
+            self.prev = self._reproject(self.prev, self._random)
+            self.center = self._reproject(self.center, self._random)
 
         self.center = (self.n_samples * self.center) / (
             self.n_samples + 1
         ) + self.prev / (self.n_samples + 1)
         self.n_samples += 1
 
-    def sample(self, n: int, fluxes: bool = True) -> pd.DataFrame:
+    def sample(
+        self, n: int, fluxes: bool = True, output: Optional[PathType] = None
+    ) -> Union[pd.DataFrame, SampleReader]:
         """Generate a set of samples.
 
         This is the basic sampling function for all hit-and-run samplers.
@@ -133,12 +138,15 @@ class ACHRSampler(HRSampler):
             set to False, will return a variable for each forward and
             backward flux as well as all additional variables you might
             have defined in the model (default True).
+        output : str or pathlib.Path, optional
+            A .npy file to which the samples are written as they are
+            generated instead of keeping them in memory (default None).
 
         Returns
         -------
-        pandas.DataFrame
+        pandas.DataFrame or cobra.sampling.SampleReader
             Returns a pandas DataFrame with `n` rows, each containing a
-            flux sample.
+            flux sample, or a lazy reader of the samples in `output`.
 
         Notes
         -----
@@ -146,22 +154,36 @@ class ACHRSampler(HRSampler):
         of reactions in your model and the thinning factor.
 
         """
-        samples = np.zeros((n, self.warmup.shape[1]))
+        if fluxes:
+            names = [r.id for r in self.model.reactions]
+        else:
+            names = [v.name for v in self.model.variables]
+
+        if output is None:
+            samples = np.zeros((n, self.warmup.shape[1]))
+        else:
+            samples = create_sample_file(output, n, len(names))
 
         for i in range(1, self.thinning * n + 1):
             self.__single_iteration()
 
             if i % self.thinning == 0:
-                samples[i // self.thinning - 1, :] = self.prev
+                if output is not None and fluxes:
+                    samples[i // self.thinning - 1, :] = (
+                        self.prev[self.fwd_idx] - self.prev[self.rev_idx]
+                    )
+                else:
+                    samples[i // self.thinning - 1, :] = self.prev
+
+        if output is not None:
+            samples.flush()
+            return SampleReader(output, names)
 
         if fluxes:
-            names = [r.id for r in self.model.reactions]
+            samples = samples[:, self.fwd_idx] - samples[:, self.rev_idx]
 
-            return pd.DataFrame(
-                samples[:, self.fwd_idx] - samples[:, self.rev_idx],
-                columns=names,
-            )
-        else:
-            names = [v.name for v in self.model.variables]
+        return pd.DataFrame(samples, columns=names)
 
-            return pd.DataFrame(samples, columns=names)
+    def _sample_chains(self, n: int) -> np.ndarray:
+        """Continue the single chain of the sampler by `n` samples."""
+        return self.sample(n, fluxes=False).values[np.newaxis]
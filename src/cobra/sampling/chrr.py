@@ -0,0 +1,273 @@
+"""Provide the CHRR sampler class."""
+
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from ..util import nullspace
+from .hr_sampler import HRSampler
+from .storage import PathType, SampleReader, create_sample_file
+
+
+if TYPE_CHECKING:
+    from cobra import Model
+
+
+def _dense(matrix) -> np.ndarray:
+    """Return a dense copy of a possibly sparse matrix."""
+    if hasattr(matrix, "toarray"):
+        return matrix.toarray()
+    return np.asarray(matrix)
+
+
+class CHRRSampler(HRSampler):
+    """
+    Coordinate Hit-and-Run with Rounding sampler.
+
+    A sampler that mixes well on the elongated flux polytopes of
+    genome-scale models.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The cobra model from which to generate samples.
+    thinning : int, optional
+        The thinning factor of the generated sampling chain. A thinning of
+        10 means samples are returned every 10 coordinate steps
+        (default 100).
+    nproj : int > 0, optional
+        How often to recompute the distances to all constraints from the
+        current point instead of updating them. Avoids the accumulation of
+        numerical errors (default None).
+    seed : int > 0, optional
+        Sets the random number seed. Initialized to the current time stamp
+        if None (default None).
+    **kwargs :
+        Further arguments for `HRSampler` such as `cache`.
+
+    Attributes
+    ----------
+    n_samples : int
+        The total number of coordinate steps that have been taken by this
+        sampler instance.
+    problem : typing.NamedTuple
+        A NamedTuple whose attributes define the entire sampling problem in
+        matrix form.
+    warmup : numpy.matrix
+        A numpy matrix with as many columns as reactions in the model and
+        more than 3 rows containing a warmup sample in each row.
+    retries : int
+        The overall of sampling retries the sampler has observed. Always 0
+        since coordinate steps can not leave the polytope.
+    fwd_idx : numpy.array
+        A numpy array having one entry for each reaction in the model,
+        containing the index of the respective forward variable.
+    rev_idx : numpy.array
+        A numpy array having one entry for each reaction in the model,
+        containing the index of the respective reverse variable.
+    prev : numpy.array
+        The last sample generated.
+    center : numpy.array
+        The mean of the warmup points which is the origin of the rounded
+        space.
+    dimension : int
+        The dimension of the rounded space in which the chain moves.
+
+    Notes
+    -----
+    CHRR first parameterizes the flux polytope by the nullspace of the
+    equality constraints and the fixed variables, so that the remaining
+    polytope is full-dimensional. This space is then rounded with the
+    covariance of the warmup points, which maps the elongated polytope to
+    a roughly isotropic one, and sampled by coordinate hit-and-run [1]_.
+    Every step moves along a single coordinate of the rounded space, so the
+    distances to all constraints are updated with a single column of the
+    constraint matrix instead of a matrix-vector product.
+
+    The published algorithm rounds with a maximum volume ellipsoid. The
+    covariance of the warmup points gives a similar preconditioning
+    without solving any additional optimization problems.
+
+    Because of the better mixing, much smaller thinning factors than for
+    ACHR or OptGP usually suffice, for instance a small multiple of the
+    number of reactions.
+
+    References
+    ----------
+    .. [1] Haraldsdóttir HS, Cousins B, Thiele I, Fleming RMT, Vempala S
+       (2017) CHRR: coordinate hit-and-run with rounding for uniform
+       sampling of constraint-based models.
+       Bioinformatics 33(11): 1741-1743.
+       https://doi.org/10.1093/bioinformatics/btx052
+
+    """
+
+    def __init__(
+        self,
+        model: "Model",
+        thinning: int = 100,
+        nproj: Optional[int] = None,
+        seed: Optional[int] = None,
+        **kwargs
+    ) -> None:
+        """Initialize a new CHRRSampler."""
+        super().__init__(model, thinning, nproj=nproj, seed=seed, **kwargs)
+        self.generate_fva_warmup()
+        self.center = self.warmup.mean(axis=0)
+        self.__round()
+        self.prev = self._shift + self._transform.dot(self._point)
+        self._random = self._spawn_generators(1)[0]
+
+    @property
+    def dimension(self) -> int:
+        """Return the dimension of the rounded space."""
+        return self._point.shape[0]
+
+    def __round(self) -> None:
+        """Build the rounded, full-dimensional sampling problem."""
+        prob = self.problem
+        n_variables = len(self.model.variables)
+        var_bounds = prob.variable_bounds
+
+        # Fixed variables become equalities so the remaining space is
+        # full-dimensional
+        fixed = np.flatnonzero(prob.variable_fixed)
+        equalities = np.vstack([_dense(prob.equalities), np.eye(n_variables)[fixed]])
+        b = np.hstack([prob.b, var_bounds[1, fixed]])
+
+        # Move the center of the warmup points onto the equalities
+        shift = self.center
+        if equalities.shape[0] > 0:
+            shift = (
+                shift
+                - np.linalg.lstsq(equalities, equalities.dot(shift) - b, rcond=None)[0]
+            )
+            basis = nullspace(equalities)
+        else:
+            basis = np.eye(n_variables)
+
+        # Round with the covariance of the warmup points and drop the
+        # directions in which the polytope is flat
+        transform = np.zeros((n_variables, 0))
+        if basis.shape[1] > 0 and self.n_warmup > 1:
+            points = (self.warmup - shift).dot(basis)
+            cov = np.atleast_2d(np.cov(points, rowvar=False))
+            values, vectors = np.linalg.eigh(cov)
+            scale = np.sqrt(np.clip(values, 0, None))
+            keep = scale > self.bounds_tol
+            transform = basis.dot(vectors[:, keep] * scale[keep])
+
+        # All inequalities as G * y <= h in the rounded space
+        matrix, lower, upper = np.eye(n_variables), var_bounds[0], var_bounds[1]
+        if prob.bounds.shape[0] > 0:
+            matrix = np.vstack([_dense(prob.inequalities), matrix])
+            lower = np.hstack([prob.bounds[0], lower])
+            upper = np.hstack([prob.bounds[1], upper])
+        value = matrix.dot(shift)
+        constraints = np.vstack([matrix.dot(transform), -matrix.dot(transform)])
+        rhs = np.hstack([upper - value, value - lower])
+        active = np.isfinite(rhs) & (np.abs(constraints).max(axis=1, initial=0) > 0)
+        constraints = constraints[active]
+
+        if ((constraints > 0).sum(axis=0) == 0).any() or (
+            (constraints < 0).sum(axis=0) == 0
+        ).any():
+            raise ValueError(
+                "The flux space is unbounded, CHRR requires finite bounds."
+            )
+
+        self._shift = shift
+        self._transform = transform
+        self._constraints = np.asfortranarray(constraints)
+        self._rhs = np.maximum(rhs[active], 0)
+        self._point = np.zeros(transform.shape[1])
+        self._slack = self._rhs.copy()
+
+    def __single_iteration(self) -> None:
+        """Move along a single random coordinate of the rounded space."""
+        if self.dimension > 0:
+            j = self._random.integers(self.dimension)
+            column = self._constraints[:, j]
+            pos = column > 0
+            neg = column < 0
+            upper = (self._slack[pos] / column[pos]).min()
+            lower = (self._slack[neg] / column[neg]).max()
+            alpha = self._random.uniform(lower, upper) if lower < upper else 0.0
+            self._point[j] += alpha
+            self._slack -= alpha * column
+
+        self.n_samples += 1
+        if self.n_samples % self.nproj == 0:
+            self._slack = np.maximum(self._rhs - self._constraints.dot(self._point), 0)
+
+    def sample(
+        self, n: int, fluxes: bool = True, output: Optional[PathType] = None
+    ) -> Union[pd.DataFrame, SampleReader]:
+        """Generate a set of samples.
+
+        This is the basic sampling function for all hit-and-run samplers.
+
+        Parameters
+        ----------
+        n : int
+            The number of samples that are generated at once.
+        fluxes : bool, optional
+            Whether to return fluxes or the internal solver variables. If
+            set to False, will return a variable for each forward and
+            backward flux as well as all additional variables you might
+            have defined in the model (default True).
+        output : str or pathlib.Path, optional
+            A .npy file to which the samples are written as they are
+            generated instead of keeping them in memory (default None).
+
+        Returns
+        -------
+        pandas.DataFrame or cobra.sampling.SampleReader
+            Returns a pandas DataFrame with `n` rows, each containing a
+            flux sample, or a lazy reader of the samples in `output`.
+
+        Notes
+        -----
+        Performance of this function linearly depends on the number
+        of constraints in your model and the thinning factor.
+
+        """
+        if fluxes:
+            names = [r.id for r in self.model.reactions]
+        else:
+            names = [v.name for v in self.model.variables]
+
+        if output is None:
+            points = np.zeros((n, self.dimension))
+        else:
+            samples = create_sample_file(output, n, len(names))
+
+        for i in range(1, self.thinning * n + 1):
+            self.__single_iteration()
+
+            if i % self.thinning == 0:
+                j = i // self.thinning - 1
+                if output is None:
+                    points[j] = self._point
+                else:
+                    sample = self._shift + self._transform.dot(self._point)
+                    if fluxes:
+                        sample = sample[self.fwd_idx] - sample[self.rev_idx]
+                    samples[j, :] = sample
+
+        self.prev = self._shift + self._transform.dot(self._point)
+
+        if output is not None:
+            samples.flush()
+            return SampleReader(output, names)
+
+        samples = self._shift + points.dot(self._transform.T)
+        if fluxes:
+            samples = samples[:, self.fwd_idx] - samples[:, self.rev_idx]
+
+        return pd.DataFrame(samples, columns=names)
+
+    def _sample_chains(self, n: int) -> np.ndarray:
+        """Continue the single chain of the sampler by `n` samples."""
+        return self.sample(n, fluxes=False).values[np.newaxis]
@@ -0,0 +1,331 @@
+"""Provide convergence diagnostics for sampling chains."""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _split_chains(draws: np.ndarray) -> np.ndarray:
+    """Split every chain into its first and its second half.
+
+    Parameters
+    ----------
+    draws : numpy.ndarray
+        The samples with shape (chains, draws, parameters).
+
+    Returns
+    -------
+    numpy.ndarray
+        The half chains with shape (2 * chains, draws // 2, parameters). The
+        middle draw of chains with an odd length is dropped.
+
+    """
+    half = draws.shape[1] // 2
+    return np.concatenate([draws[:, :half], draws[:, draws.shape[1] - half :]], axis=0)
+
+
+def _variances(chains: np.ndarray) -> tuple:
+    """Return the mean within-chain and the pooled variance estimates."""
+    return _pool(chains.mean(axis=1), chains.var(axis=1, ddof=1), chains.shape[1])
+
+
+def _pool(means: np.ndarray, variances: np.ndarray, n: int) -> tuple:
+    """Pool the means and variances of chains with `n` draws each."""
+    within = variances.mean(axis=0)
+    between = n * means.var(axis=0, ddof=1)
+    return within, (n - 1) / n * within + between / n
+
+
+def _rhat(within: np.ndarray, pooled: np.ndarray) -> np.ndarray:
+    """Return the R̂ from the within-chain and the pooled variances."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rhat = np.sqrt(pooled / within)
+    return np.where(pooled > 0, rhat, 1.0)
+
+
+def _moments(draws: np.ndarray) -> tuple:
+    """Return the number of draws, means and squared deviations per chain."""
+    mean = draws.mean(axis=1)
+    return draws.shape[1], mean, ((draws - mean[:, None]) ** 2).sum(axis=1)
+
+
+def _add_moments(total: tuple, part: tuple) -> tuple:
+    """Combine the moments of two sets of draws (Chan et al.)."""
+    n_a, mean_a, m2_a = total
+    n_b, mean_b, m2_b = part
+    n = n_a + n_b
+    if n_a == 0 or n_b == 0:
+        return total if n_b == 0 else part
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta**2 * n_a * n_b / n
+
+
+def _remove_moments(total: tuple, part: tuple) -> tuple:
+    """Remove the moments of a subset of draws from the moments of all."""
+    n_t, mean_t, m2_t = total
+    n_b, mean_b, m2_b = part
+    n = n_t - n_b
+    if n_b == 0:
+        return total
+    if n == 0:
+        return 0, np.zeros_like(mean_t), np.zeros_like(m2_t)
+    mean = (n_t * mean_t - n_b * mean_b) / n
+    delta = mean_b - mean
+    return n, mean, np.maximum(m2_t - m2_b - delta**2 * n * n_b / n_t, 0.0)
+
+
+def split_rhat(draws: np.ndarray) -> np.ndarray:
+    """Compute the split potential scale reduction factor (split-R̂).
+
+    Parameters
+    ----------
+    draws : numpy.ndarray
+        The samples with shape (chains, draws, parameters). A single chain
+        is fine since every chain is split in half.
+
+    Returns
+    -------
+    numpy.ndarray
+        The split-R̂ of each parameter. Values close to 1 indicate that the
+        chains have mixed. Constant parameters have a split-R̂ of 1 and
+        parameters with fewer than two draws per half chain one of infinity.
+
+    References
+    ----------
+    .. [1] Gelman, A., Carlin, J. B., Stern, H. S., Dunson, D. B.,
+       Vehtari, A. and Rubin, D. B. (2013). Bayesian Data Analysis, third
+       edition. Chapman & Hall/CRC.
+
+    """
+    chains = _split_chains(np.asarray(draws, dtype=float))
+    if chains.shape[1] < 2:
+        return np.full(chains.shape[2], np.inf)
+    return _rhat(*_variances(chains))
+
+
+def effective_sample_size(draws: np.ndarray) -> np.ndarray:
+    """Compute the effective sample size of every parameter.
+
+    The autocorrelations of all (split) chains are combined and truncated
+    with Geyer's initial monotone sequence estimator as done by Stan.
+
+    Parameters
+    ----------
+    draws : numpy.ndarray
+        The samples with shape (chains, draws, parameters).
+
+    Returns
+    -------
+    numpy.ndarray
+        The effective number of independent samples of each parameter.
+        Constant parameters count all of their samples.
+
+    References
+    ----------
+    .. [1] Geyer, C. J. (1992). Practical Markov Chain Monte Carlo.
+       Statistical Science, 7(4), 473-483.
+
+    """
+    chains = _split_chains(np.asarray(draws, dtype=float))
+    m, n, p = chains.shape
+    if n < 2:
+        return np.zeros(p)
+
+    # Autocovariances of all chains at once via the FFT
+    centered = chains - chains.mean(axis=1, keepdims=True)
+    size = 2 ** int(np.ceil(np.log2(2 * n)))
+    spectrum = np.fft.rfft(centered, n=size, axis=1)
+    acov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :n] / n
+
+    within, pooled = _variances(chains)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = 1.0 - (within - acov.mean(axis=0)) / pooled
+    rho[0] = 1.0
+
+    # Sum consecutive pairs while they stay positive and make them monotone
+    n_pairs = n // 2
+    pairs = rho[: 2 * n_pairs : 2] + rho[1 : 2 * n_pairs : 2]
+    positive = np.logical_and.accumulate(pairs > 0, axis=0)
+    pairs = np.minimum.accumulate(np.where(positive, pairs, np.inf), axis=0)
+    tau = -1.0 + 2.0 * np.where(positive, pairs, 0.0).sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ess = m * n / np.maximum(tau, 1.0 / np.log10(max(m * n, 10)))
+    return np.where(pooled > 0, ess, m * n)
+
+
+class ConvergenceMonitor:
+    """Track the convergence of several sampling chains.
+
+    Samples are added batch by batch while the chains advance. The split-R̂
+    is kept up to date with running moments of both halves of every chain,
+    so an update only costs time proportional to the number of new samples.
+    The effective sample size is estimated from the most recent `window`
+    samples of each chain and scaled to all samples, which bounds the cost
+    of every check.
+
+    Parameters
+    ----------
+    names : list of str
+        The identifiers of the monitored parameters, usually reaction ids.
+    window : int, optional
+        The number of most recent samples per chain used to estimate the
+        effective sample size. None uses all samples (default 1000).
+
+    Attributes
+    ----------
+    names : list of str
+        The identifiers of the monitored parameters.
+    window : int or None
+        The number of samples per chain used for the effective sample size.
+
+    """
+
+    def __init__(self, names: Sequence[str], window: Optional[int] = 1000) -> None:
+        """Initialize a new monitor without samples."""
+        self.names = list(names)
+        self.window = window
+        self._batches: List[np.ndarray] = []
+        self._offsets = [0]
+        self._first = (0, 0.0, 0.0)
+        self._second = (0, 0.0, 0.0)
+
+    @property
+    def n_draws(self) -> int:
+        """Return the number of samples of every chain."""
+        return self._offsets[-1]
+
+    @property
+    def draws(self) -> np.ndarray:
+        """Return all samples with shape (chains, draws, parameters)."""
+        if len(self._batches) > 1:
+            self._batches = [np.concatenate(self._batches, axis=1)]
+            self._offsets = [0, self.n_draws]
+        if not self._batches:
+            return np.zeros((0, 0, len(self.names)))
+        return self._batches[0]
+
+    def _slice(self, start: int, stop: int) -> np.ndarray:
+        """Return the samples of every chain from `start` to `stop`."""
+        first = bisect_right(self._offsets, start) - 1
+        last = bisect_left(self._offsets, stop)
+        pieces = [
+            batch[:, max(start - offset, 0) : stop - offset]
+            for batch, offset in zip(
+                self._batches[first:last], self._offsets[first:last]
+            )
+        ]
+        return np.concatenate(pieces, axis=1)
+
+    def update(self, draws: np.ndarray) -> None:
+        """Add the next samples of every chain.
+
+        Parameters
+        ----------
+        draws : numpy.ndarray
+            The new samples with shape (chains, draws, parameters). The
+            number of chains must not change between updates.
+
+        """
+        draws = np.asarray(draws, dtype=float)
+        if draws.ndim != 3 or draws.shape[2] != len(self.names):
+            raise ValueError(
+                "Samples must have the shape (chains, draws, {}).".format(
+                    len(self.names)
+                )
+            )
+        if self._batches and draws.shape[0] != self._batches[0].shape[0]:
+            raise ValueError("The number of chains can not change.")
+        if draws.shape[1] == 0:
+            return
+        n = self.n_draws
+        half = n // 2
+        self._batches.append(draws)
+        self._offsets.append(n + draws.shape[1])
+        # The first half grows at its end while the second half grows at its
+        # end and shrinks at its start, so every sample is added and removed
+        # at most once.
+        new_half = self.n_draws // 2
+        self._second = _add_moments(self._second, _moments(draws))
+        if new_half > half:
+            self._first = _add_moments(
+                self._first, _moments(self._slice(half, new_half))
+            )
+        start, new_start = n - half, self.n_draws - new_half
+        if new_start > start:
+            self._second = _remove_moments(
+                self._second, _moments(self._slice(start, new_start))
+            )
+
+    def split_rhat(self) -> np.ndarray:
+        """Return the current split-R̂ of every parameter.
+
+        See Also
+        --------
+        split_rhat
+
+        """
+        n, _, _ = self._first
+        if n < 2:
+            return np.full(len(self.names), np.inf)
+        means = np.concatenate([self._first[1], self._second[1]], axis=0)
+        variances = np.concatenate([self._first[2], self._second[2]], axis=0)
+        return _rhat(*_pool(means, variances / (n - 1), n))
+
+    def effective_sample_size(self) -> np.ndarray:
+        """Return the current effective sample size of every parameter.
+
+        The effective sample size of the last `window` samples of each chain
+        is scaled by the ratio of all samples to the samples in the window.
+
+        See Also
+        --------
+        effective_sample_size
+
+        """
+        n = self.n_draws
+        if n == 0:
+            return np.zeros(len(self.names))
+        size = n if self.window is None else min(self.window, n)
+        return effective_sample_size(self._slice(n - size, n)) * n / size
+
+    def diagnostics(self) -> pd.DataFrame:
+        """Compute the current diagnostics.
+
+        Returns
+        -------
+        pandas.DataFrame
+            The split-R̂ ("rhat") and the effective sample size ("ess") of
+            every parameter.
+
+        """
+        return pd.DataFrame(
+            {"rhat": self.split_rhat(), "ess": self.effective_sample_size()},
+            index=self.names,
+        )
+
+    def converged(self, rhat: float = 1.01, ess: float = 400) -> bool:
+        """Check whether all parameters reach the targets.
+
+        The effective sample size is only computed once the split-R̂ target
+        is reached.
+
+        Parameters
+        ----------
+        rhat : float, optional
+            The largest acceptable split-R̂ (default 1.01).
+        ess : float, optional
+            The smallest acceptable effective sample size (default 400).
+
+        Returns
+        -------
+        bool
+            Whether every parameter has a split-R̂ of at most `rhat` and an
+            effective sample size of at least `ess`.
+
+        """
+        if not (self.split_rhat() <= rhat).all():
+            return False
+        return bool((self.effective_sample_size() >= ess).all())
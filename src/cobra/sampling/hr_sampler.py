@@ -8,19 +8,39 @@ where possible to provide a uniform interface."""
 from __future__ import absolute_import, division
 
 import ctypes
+import hashlib
+import pathlib
 from collections import namedtuple
 from logging import getLogger
-from multiprocessing import Array
+from multiprocessing import Array, Pool
 from time import time
 
+import diskcache
 import numpy as np
+import pandas as pd
 from optlang.interface import OPTIMAL
 from optlang.symbolics import Zero
 
+from cobra.core.configuration import Configuration
+from cobra.sampling.diagnostics import ConvergenceMonitor
+from cobra.sampling.storage import SampleReader
 from cobra.util import constraint_matrices, create_stoichiometric_matrix, nullspace
 
 
+try:
+    from scipy import sparse
+    from scipy.sparse.linalg import lsqr
+except ImportError:
+    sparse = None
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
 LOGGER = getLogger(__name__)
+CONFIGURATION = Configuration()
 
 
 # Maximum number of retries for sampling
@@ -44,11 +64,11 @@ Problem = namedtuple(
 
 Attributes
 ----------
-equalities : numpy.array
+equalities : numpy.array or scipy.sparse.csr_matrix
     All equality constraints in the model.
 b : numpy.array
     The right side of the equality constraints.
-inequalities : numpy.array
+inequalities : numpy.array or scipy.sparse.csr_matrix
     All inequality constraints in the model.
 bounds : numpy.array
     The lower and upper bounds for the inequality constraints.
@@ -59,7 +79,7 @@ homogeneous: boolean
     exist no non-zero fixed variables or constraints.
 nullspace : numpy.matrix
     A matrix containing the nullspace of the equality constraints. Each column
-    is one basis vector.
+    is one basis vector. None for sparse problems.
 
 """
 
@@ -104,6 +124,220 @@ def shared_np_array(shape, data=None, integer=False):
     return np_array
 
 
+def shared_csr_matrix(matrix):
+    """Create a new CSR matrix whose data resides in shared memory.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.spmatrix
+        The matrix to copy to shared memory.
+
+    """
+
+    matrix = sparse.csr_matrix(matrix)
+    return sparse.csr_matrix(
+        (
+            shared_np_array(matrix.data.shape, matrix.data),
+            shared_np_array(matrix.indices.shape, matrix.indices, integer=True),
+            shared_np_array(matrix.indptr.shape, matrix.indptr, integer=True),
+        ),
+        shape=matrix.shape,
+    )
+
+
+SharedHandle = namedtuple("SharedHandle", ["name", "shape", "dtype"])
+"""Reference to an array in a named shared memory segment.
+
+Attributes
+----------
+name : str
+    The name of the shared memory segment.
+shape : tuple of ints
+    The shape of the array.
+dtype : str
+    The data type of the array.
+
+"""
+
+
+# Segments this process attached to, they have to stay open as long as
+# arrays use their memory
+_attached_segments = {}
+
+
+class SharedArrays(object):
+    """A collection of numpy arrays in named shared memory segments.
+
+    Other processes attach to the arrays by the name of their segment, so
+    they neither pickle nor copy the data. Requires Python 3.8 or later.
+
+    """
+
+    def __init__(self):
+        """Initialize an empty collection."""
+        if shared_memory is None:
+            raise RuntimeError("Named shared memory requires Python 3.8 or later.")
+        self._segments = {}
+        self._arrays = {}
+
+    def put(self, key, data):
+        """Copy data into the segment of `key` and return the shared array.
+
+        The segment is reused if the array has the same shape and type.
+
+        """
+        data = np.asarray(data)
+        array = self._arrays.get(key)
+        if (
+            array is not None
+            and array.shape == data.shape
+            and array.dtype == data.dtype
+        ):
+            array[...] = data
+            return array
+
+        self.remove(key)
+        segment = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        array = np.ndarray(data.shape, dtype=data.dtype, buffer=segment.buf)
+        array[...] = data
+        self._segments[key] = segment
+        self._arrays[key] = array
+        return array
+
+    def handle(self, key):
+        """Return the handle of an array for other processes."""
+        array = self._arrays[key]
+        return SharedHandle(self._segments[key].name, array.shape, array.dtype.str)
+
+    def remove(self, key):
+        """Free the segment of `key`."""
+        self._arrays.pop(key, None)
+        segment = self._segments.pop(key, None)
+        if segment is not None:
+            try:
+                segment.close()
+            except BufferError:
+                # Still used by an array, its memory is freed with that array
+                pass
+            segment.unlink()
+
+    def close(self):
+        """Free all segments."""
+        for key in list(self._segments):
+            self.remove(key)
+
+
+def attach_shared(handle):
+    """Return the array of a handle without copying it."""
+    segment = _attached_segments.get(handle.name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=handle.name)
+        _attached_segments[handle.name] = segment
+    return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=segment.buf)
+
+
+def restore_shared_state(state):
+    """Attach the shared arrays of a state from `HRSampler._shared_state`."""
+
+    def attach(value):
+        if isinstance(value, SharedHandle):
+            return attach_shared(value)
+        if isinstance(value, tuple) and len(value) == 3 and value[0] == "csr":
+            return sparse.csr_matrix(
+                tuple(attach_shared(h) for h in value[2]), shape=value[1]
+            )
+        return value
+
+    state = dict(state)
+    state["problem"] = Problem(*(attach(v) for v in state["problem"]))
+    state["warmup"] = attach(state["warmup"])
+    state["center"] = attach(state["center"])
+    return state
+
+
+_warmup_model = None
+
+
+def _init_warmup_worker(model):
+    """Initialize a process that generates warmup points."""
+    global _warmup_model
+    _warmup_model = model
+    _warmup_model.objective = Zero
+
+
+def _release_warmup_worker():
+    """Drop the reference to the warmup model of the current process."""
+    global _warmup_model
+    _warmup_model = None
+
+
+def _warmup_points(args):
+    """Minimize or maximize each of the given reactions on its own."""
+    sense, indices = args
+    model = _warmup_model
+    model.objective_direction = sense
+    points = []
+
+    for i in indices:
+        r = model.reactions[i]
+        variables = (r.forward_variable, r.reverse_variable)
+        model.objective.set_linear_coefficients({variables[0]: 1, variables[1]: -1})
+        model.slim_optimize()
+
+        if model.solver.status == OPTIMAL:
+            primals = model.solver.primal_values
+            points.append([primals[v.name] for v in model.variables])
+        else:
+            LOGGER.info("can not maximize reaction %s, skipping it" % r.id)
+
+        # Reset objective
+        model.objective.set_linear_coefficients({variables[0]: 0, variables[1]: 0})
+
+    return points
+
+
+def _problem_fingerprint(sampler, problem, names):
+    """Hash everything that determines the nullspace and warmup points."""
+    digest = hashlib.sha256()
+    digest.update(
+        repr((sampler.feasibility_tol, sampler.bounds_tol, sampler.sparse)).encode()
+    )
+    digest.update("\0".join(names).encode())
+    for field in problem:
+        if sparse is not None and sparse.issparse(field):
+            field = field.tocsr()
+            arrays = (field.data, field.indices, field.indptr, field.shape)
+        else:
+            arrays = (field,)
+        for array in arrays:
+            array = np.ascontiguousarray(array, dtype=float)
+            digest.update(repr(array.shape).encode())
+            digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _cache_get(key):
+    """Return a cached array or None."""
+    with diskcache.Cache(
+        directory=str(CONFIGURATION.cache_directory),
+        size_limit=CONFIGURATION.max_cache_size,
+    ) as cache:
+        return cache.get("cobra.sampling." + key)
+
+
+def _cache_set(key, value):
+    """Store an array in the cache."""
+    with diskcache.Cache(
+        directory=str(CONFIGURATION.cache_directory),
+        size_limit=CONFIGURATION.max_cache_size,
+    ) as cache:
+        cache.set(
+            "cobra.sampling." + key,
+            np.asarray(value),
+            expire=CONFIGURATION.cache_expiration,
+        )
+
+
 class HRSampler(object):
     """The abstract base class for hit-and-run samplers.
 
@@ -121,6 +355,14 @@ class HRSampler(object):
         lower this number.
     seed : int > 0, optional
         The random number seed that should be used.
+    sparse : boolean, optional
+        Whether to store the equality and inequality constraints as sparse
+        CSR matrices (default False). This avoids the dense nullspace and
+        keeps the memory requirements low for large models. Requires scipy.
+    cache : boolean, optional
+        Whether to store the nullspace and warmup points in the cache
+        directory of the configuration and reuse them for problems with the
+        same bounds and stoichiometry (default False).
 
     Attributes
     ----------
@@ -159,7 +401,9 @@ class HRSampler(object):
 
     """
 
-    def __init__(self, model, thinning, nproj=None, seed=None):
+    def __init__(
+        self, model, thinning, nproj=None, seed=None, sparse=False, cache=False
+    ):
         """Initialize a new sampler object."""
 
         # This currently has to be done to reset the solver basis which is
@@ -172,6 +416,9 @@ class HRSampler(object):
         self.feasibility_tol = model.tolerance
         self.bounds_tol = model.tolerance
         self.thinning = thinning
+        self.sparse = sparse
+        self.cache = cache
+        self._shared = None
 
         if nproj is None:
             self.nproj = int(min(len(self.model.variables) ** 3, 1e6))
@@ -201,17 +448,42 @@ class HRSampler(object):
         # Avoid overflow
         self._seed = self._seed % np.iinfo(np.int32).max
 
+    def _spawn_generators(self, n):
+        """Create independent random number generators for `n` chains.
+
+        The stream of each chain only depends on the seed and the index of
+        the chain, so results do not depend on how chains are scheduled.
+
+        """
+        return [
+            np.random.default_rng(s)
+            for s in np.random.SeedSequence(self._seed).spawn(n)
+        ]
+
     def __build_problem(self):
         """Build the matrix representation of the sampling problem."""
 
+        if self.sparse and sparse is None:
+            raise ImportError("Sparse sampling problems require scipy.")
+
         # Set up the mathematical problem
-        prob = constraint_matrices(self.model, zero_tol=self.feasibility_tol)
+        prob = constraint_matrices(
+            self.model,
+            array_type="lil" if self.sparse else "dense",
+            zero_tol=self.feasibility_tol,
+        )
 
         # check if there any non-zero equality constraints
         equalities = prob.equalities
         b = prob.b
-        bounds = np.atleast_2d(prob.bounds).T
-        var_bounds = np.atleast_2d(prob.variable_bounds).T
+        if self.sparse:
+            bounds = np.atleast_2d(prob.bounds.toarray()).T
+            var_bounds = prob.variable_bounds.toarray()
+            prob = prob._replace(variable_bounds=var_bounds)
+            var_bounds = var_bounds.T
+        else:
+            bounds = np.atleast_2d(prob.bounds).T
+            var_bounds = np.atleast_2d(prob.variable_bounds).T
         homogeneous = all(np.abs(b) < self.feasibility_tol)
         fixed_non_zero = np.abs(prob.variable_bounds[:, 1]) > self.feasibility_tol
         fixed_non_zero &= prob.variable_fixed
@@ -222,13 +494,52 @@ class HRSampler(object):
             n_fixed = fixed_non_zero.sum()
             rows = np.zeros((n_fixed, prob.equalities.shape[1]))
             rows[range(n_fixed), np.where(fixed_non_zero)] = 1.0
-            equalities = np.vstack([equalities, rows])
+            if self.sparse:
+                equalities = sparse.vstack([equalities, rows])
+            else:
+                equalities = np.vstack([equalities, rows])
             var_b = prob.variable_bounds[:, 1]
             b = np.hstack([b, var_b[fixed_non_zero]])
             homogeneous = False
 
+        self._fingerprint = None
+        if self.cache:
+            self._fingerprint = _problem_fingerprint(
+                self,
+                (
+                    equalities,
+                    b,
+                    prob.inequalities,
+                    bounds,
+                    prob.variable_fixed,
+                    var_bounds,
+                ),
+                [v.name for v in self.model.variables]
+                + [r.id for r in self.model.reactions],
+            )
+
+        if self.sparse:
+            # Sparse problems are reprojected with least squares instead of
+            # a dense nullspace
+            return Problem(
+                equalities=shared_csr_matrix(equalities),
+                b=shared_np_array(b.shape, b),
+                inequalities=shared_csr_matrix(prob.inequalities),
+                bounds=shared_np_array(bounds.shape, bounds),
+                variable_fixed=shared_np_array(
+                    prob.variable_fixed.shape, prob.variable_fixed, integer=True
+                ),
+                variable_bounds=shared_np_array(var_bounds.shape, var_bounds),
+                nullspace=None,
+                homogeneous=homogeneous,
+            )
+
         # Set up a projection that can cast point into the nullspace
-        nulls = nullspace(equalities)
+        nulls = _cache_get(self._fingerprint + "-nullspace") if self.cache else None
+        if nulls is None:
+            nulls = nullspace(equalities)
+            if self.cache:
+                _cache_set(self._fingerprint + "-nullspace", nulls)
 
         # convert bounds to a matrix and add variable bounds as well
         return Problem(
@@ -244,7 +555,7 @@ class HRSampler(object):
             homogeneous=homogeneous,
         )
 
-    def generate_fva_warmup(self):
+    def generate_fva_warmup(self, processes=1):
         """Generate the warmup points for the sampler.
 
         Generates warmup points by setting each flux as the sole objective
@@ -252,51 +563,55 @@ class HRSampler(object):
         warmup points into the nullspace for non-homogeneous problems (only
         if necessary).
 
-        """
-
-        self.n_warmup = 0
-        reactions = self.model.reactions
-        self.warmup = np.zeros((2 * len(reactions), len(self.model.variables)))
-        self.model.objective = Zero
-
-        for sense in ("min", "max"):
-            self.model.objective_direction = sense
-
-            for i, r in enumerate(reactions):
-                variables = (
-                    self.model.variables[self.fwd_idx[i]],
-                    self.model.variables[self.rev_idx[i]],
-                )
-
-                # Omit fixed reactions if they are non-homogeneous
-                if r.upper_bound - r.lower_bound < self.bounds_tol:
-                    LOGGER.info("skipping fixed reaction %s" % r.id)
-                    continue
-
-                self.model.objective.set_linear_coefficients(
-                    {variables[0]: 1, variables[1]: -1}
-                )
-
-                self.model.slim_optimize()
-
-                if not self.model.solver.status == OPTIMAL:
-                    LOGGER.info("can not maximize reaction %s, skipping it" % r.id)
-                    continue
+        Parameters
+        ----------
+        processes : int, optional
+            The number of processes used to solve the optimization problems
+            (default 1). Warmup points from several processes may differ
+            between runs for degenerate problems.
 
-                primals = self.model.solver.primal_values
-                sol = [primals[v.name] for v in self.model.variables]
-                self.warmup[
-                    self.n_warmup,
-                ] = sol
-                self.n_warmup += 1
+        """
 
-                # Reset objective
-                self.model.objective.set_linear_coefficients(
-                    {variables[0]: 0, variables[1]: 0}
-                )
+        if self.cache:
+            warmup = _cache_get(self._fingerprint + "-warmup")
+            if warmup is not None:
+                self.n_warmup = warmup.shape[0]
+                self.warmup = shared_np_array(warmup.shape, warmup)
+                return
 
-        # Shrink to measure
-        self.warmup = self.warmup[0 : self.n_warmup, :]
+        reactions = self.model.reactions
+        # Omit fixed reactions if they are non-homogeneous
+        fixed = reactions.upper_bounds - reactions.lower_bounds < self.bounds_tol
+        for i in np.flatnonzero(fixed):
+            LOGGER.info("skipping fixed reaction %s" % reactions[i].id)
+        indices = np.flatnonzero(~fixed).tolist()
+
+        chunk_size = max(1, int(np.ceil(len(indices) / (4 * processes))))
+        tasks = [
+            (sense, indices[i : i + chunk_size])
+            for sense in ("min", "max")
+            for i in range(0, len(indices), chunk_size)
+        ]
+        if processes > 1:
+            pool = Pool(
+                processes, initializer=_init_warmup_worker, initargs=(self.model,)
+            )
+            results = pool.map(_warmup_points, tasks, chunksize=1)
+            pool.close()
+            pool.join()
+        else:
+            _init_warmup_worker(self.model)
+            try:
+                results = [_warmup_points(task) for task in tasks]
+            finally:
+                # Do not keep the model alive in the main process.
+                _release_warmup_worker()
+
+        self.warmup = np.array(
+            [point for points in results for point in points],
+            dtype=float,
+        ).reshape(-1, len(self.model.variables))
+        self.n_warmup = self.warmup.shape[0]
 
         # Remove redundant search directions
         keep = np.logical_not(self._is_redundant(self.warmup))
@@ -317,12 +632,15 @@ class HRSampler(object):
             self.warmup = np.vstack([self.warmup, newdir])
             self.n_warmup += 1
 
+        if self.cache:
+            _cache_set(self._fingerprint + "-warmup", self.warmup)
+
         # Shrink warmup points to measure
         self.warmup = shared_np_array(
             (self.n_warmup, len(self.model.variables)), self.warmup
         )
 
-    def _reproject(self, p):
+    def _reproject(self, p, random_state=None):
         """Reproject a point into the feasibility region.
 
         This function is guaranteed to return a new feasible point. However,
@@ -332,6 +650,9 @@ class HRSampler(object):
         ----------
         p : numpy.array
             The current sample point.
+        random_state : numpy.random.Generator, optional
+            The random number generator used if a random point is required.
+            Uses the global generator by default.
 
         Returns
         -------
@@ -342,18 +663,21 @@ class HRSampler(object):
 
         nulls = self.problem.nullspace
         equalities = self.problem.equalities
+        residual = equalities.dot(p) - self.problem.b
 
         # don't reproject if point is feasible
-        if np.allclose(
-            equalities.dot(p), self.problem.b, rtol=0, atol=self.feasibility_tol
-        ):
+        if np.allclose(residual, 0.0, rtol=0, atol=self.feasibility_tol):
             new = p
         else:
             LOGGER.info(
                 "feasibility violated in sample"
                 " %d, trying to reproject" % self.n_samples
             )
-            new = nulls.dot(nulls.T.dot(p))
+            if nulls is None:
+                # least-squares projection onto the equality constraints
+                new = p - lsqr(equalities, residual, atol=1e-12, btol=1e-12)[0]
+            else:
+                new = nulls.dot(nulls.T.dot(p))
 
         # Projections may violate bounds
         # set to random point in space in that case
@@ -362,15 +686,15 @@ class HRSampler(object):
                 "reprojection failed in sample"
                 " %d, using random point in space" % self.n_samples
             )
-            new = self._random_point()
+            new = self._random_point(random_state)
 
         return new
 
-    def _random_point(self):
+    def _random_point(self, random_state=None):
         """Find an approximately random point in the flux cone."""
 
-        idx = np.random.randint(
-            self.n_warmup, size=min(2, np.ceil(np.sqrt(self.n_warmup)))
+        idx = _random_integers(
+            random_state, self.n_warmup, int(min(2, np.ceil(np.sqrt(self.n_warmup))))
         )
         return self.warmup[idx, :].mean(axis=0)
 
@@ -425,7 +749,25 @@ class HRSampler(object):
 
         return np.array([lb_dist, ub_dist])
 
-    def sample(self, n, fluxes=True):
+    def _batch_bounds_dist(self, p):
+        """Get the lower and upper bound distances for a batch of points.
+
+        Returns an array with one row per point. Negative is bad.
+
+        """
+
+        prob = self.problem
+        lb_dist = (p - prob.variable_bounds[0]).min(axis=1)
+        ub_dist = (prob.variable_bounds[1] - p).min(axis=1)
+
+        if prob.bounds.shape[0] > 0:
+            const = np.atleast_2d(prob.inequalities.dot(p.T).T)
+            lb_dist = np.minimum(lb_dist, (const - prob.bounds[0]).min(axis=1))
+            ub_dist = np.minimum(ub_dist, (prob.bounds[1] - const).min(axis=1))
+
+        return np.column_stack([lb_dist, ub_dist])
+
+    def sample(self, n, fluxes=True, output=None):
         """Abstract sampling function.
 
         Should be overwritten by child classes.
@@ -433,7 +775,7 @@ class HRSampler(object):
         """
         pass
 
-    def batch(self, batch_size, batch_num, fluxes=True):
+    def batch(self, batch_size, batch_num, fluxes=True, output=None):
         """Create a batch generator.
 
         This is useful to generate n batches of m samples each.
@@ -449,30 +791,234 @@ class HRSampler(object):
             to False will return a variable for each forward and backward flux
             as well as all additional variables you might have defined in the
             model.
+        output : str or pathlib.Path, optional
+            A directory in which every batch is written to its own .npy file
+            ("batch_0.npy", "batch_1.npy", ...) instead of being kept in
+            memory.
 
         Yields
         ------
-        pandas.DataFrame
+        pandas.DataFrame or cobra.sampling.SampleReader
             A DataFrame with dimensions (batch_size x n_r) containing
             a valid flux sample for a total of n_r reactions (or variables if
-            fluxes=False) in each row.
+            fluxes=False) in each row, or a lazy reader of the batch file if
+            `output` is given.
 
         """
 
+        if output is not None:
+            output = pathlib.Path(output)
+            output.mkdir(parents=True, exist_ok=True)
+
         for i in range(batch_num):
-            yield self.sample(batch_size, fluxes=fluxes)
+            if output is None:
+                yield self.sample(batch_size, fluxes=fluxes)
+            else:
+                yield self.sample(
+                    batch_size,
+                    fluxes=fluxes,
+                    output=output / "batch_{:d}.npy".format(i),
+                )
+
+    def _share(self):
+        """Move the problem, warmup points and center to shared memory.
+
+        Does nothing if named shared memory is not available.
+
+        """
+        if shared_memory is None or self._shared is not None:
+            return
+        store = self._shared = SharedArrays()
+
+        def share(key, value):
+            if value is None or isinstance(value, (bool, np.bool_)):
+                return value
+            if sparse is not None and sparse.issparse(value):
+                return sparse.csr_matrix(
+                    (
+                        store.put(key + ".data", value.data),
+                        store.put(key + ".indices", value.indices),
+                        store.put(key + ".indptr", value.indptr),
+                    ),
+                    shape=value.shape,
+                )
+            return store.put(key, value)
+
+        self.problem = Problem(
+            **{f: share("problem." + f, v) for f, v in self.problem._asdict().items()}
+        )
+        self.warmup = share("warmup", self.warmup)
+        self.center = share("center", self.center)
+
+    def _shared_state(self):
+        """Return the attributes for worker processes.
+
+        Shared arrays are replaced by their handles and the model is left
+        out, so the state is small. `restore_shared_state` reverts this.
+
+        """
+        store = self._shared
+        excluded = (
+            "model",
+            "_shared",
+            "_pool",
+            "_finalizer",
+            "_chain_states",
+            "_generators",
+        )
+        state = {k: v for k, v in self.__dict__.items() if k not in excluded}
+
+        def handle(key, value):
+            if store is None or value is None or isinstance(value, (bool, np.bool_)):
+                return value
+            if sparse is not None and sparse.issparse(value):
+                return (
+                    "csr",
+                    value.shape,
+                    tuple(
+                        store.handle(key + "." + a)
+                        for a in ("data", "indices", "indptr")
+                    ),
+                )
+            return store.handle(key)
+
+        state["problem"] = Problem(
+            **{f: handle("problem." + f, v) for f, v in self.problem._asdict().items()}
+        )
+        state["warmup"] = handle("warmup", self.warmup)
+        state["center"] = handle("center", self.center)
+        return state
+
+    def close(self):
+        """Release the resources of the sampler.
+
+        Samplers that run several processes shut them down and free their
+        shared memory. The sampler can still be used afterwards.
+
+        """
+        if self._shared is None:
+            return
+
+        def copy(value):
+            if isinstance(value, np.ndarray) or (
+                sparse is not None and sparse.issparse(value)
+            ):
+                return value.copy()
+            return value
+
+        self.problem = Problem(*(copy(v) for v in self.problem))
+        self.warmup = copy(self.warmup)
+        self.center = copy(self.center)
+        store, self._shared = self._shared, None
+        store.close()
 
-    def validate(self, samples):
+    def __enter__(self):
+        """Use the sampler as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the resources of the sampler."""
+        self.close()
+
+    def _sample_chains(self, n):
+        """Advance all chains of the sampler.
+
+        Should be overwritten by child classes. Every call has to continue
+        the chains where the previous call left them.
+
+        Parameters
+        ----------
+        n : int
+            The number of samples generated by each chain.
+
+        Returns
+        -------
+        numpy.array
+            The samples as internal solver variables with the shape
+            (chains, n, variables).
+
+        """
+        raise NotImplementedError
+
+    def sample_until(
+        self, rhat=1.01, ess=400, batch_size=100, max_samples=100000, fluxes=True
+    ):
+        """Sample until the chains have converged.
+
+        The split-R̂ and the effective sample size of every reaction are
+        updated after each batch, and sampling stops as soon as all reactions
+        reach both targets or `max_samples` samples have been generated. The
+        effective sample size is estimated from the last 1000 samples of each
+        chain, see `cobra.sampling.ConvergenceMonitor`.
+
+        Parameters
+        ----------
+        rhat : float, optional
+            The largest acceptable split-R̂ (default 1.01).
+        ess : float, optional
+            The smallest acceptable effective sample size across all chains
+            (default 400).
+        batch_size : int, optional
+            The number of samples each chain generates between two checks
+            (default 100).
+        max_samples : int, optional
+            The maximum number of samples across all chains (default 100000).
+        fluxes : boolean, optional
+            Whether to return fluxes or the internal solver variables
+            (default True). The diagnostics are always computed for fluxes.
+
+        Returns
+        -------
+        tuple of pandas.DataFrame
+            The samples ordered by chain and a data frame with the split-R̂
+            ("rhat") and the effective sample size ("ess") of every reaction
+            after the last batch.
+
+        """
+        reactions = [r.id for r in self.model.reactions]
+        monitor = ConvergenceMonitor(reactions)
+        batches = []
+        n_samples = 0
+
+        while True:
+            draws = self._sample_chains(batch_size)
+            batches.append(draws)
+            n_samples += draws.shape[0] * draws.shape[1]
+            monitor.update(draws[:, :, self.fwd_idx] - draws[:, :, self.rev_idx])
+            if monitor.converged(rhat, ess):
+                LOGGER.info("chains converged after %d samples" % n_samples)
+                break
+            if n_samples >= max_samples:
+                LOGGER.warning("chains did not converge after %d samples" % n_samples)
+                break
+
+        if fluxes:
+            draws = monitor.draws
+            names = reactions
+        else:
+            draws = np.concatenate(batches, axis=1)
+            names = [v.name for v in self.model.variables]
+
+        samples = pd.DataFrame(draws.reshape(-1, draws.shape[2]), columns=names)
+        return samples, monitor.diagnostics()
+
+    def validate(self, samples, chunk_size=None):
         """Validate a set of samples for equality and inequality feasibility.
 
         Can be used to check whether the generated samples and warmup points
-        are feasible.
+        are feasible. The samples are validated in chunks, so large or
+        memory-mapped sample sets never have to fit into memory.
 
         Parameters
         ----------
-        samples : numpy.matrix
-            Must be of dimension (n_samples x n_reactions). Contains the
-            samples to be validated. Samples must be from fluxes.
+        samples : numpy.matrix, pandas.DataFrame or cobra.sampling.SampleReader
+            Must be of dimension (n_samples x n_reactions) or (n_samples x
+            n_variables). Contains the samples to be validated. Memory-mapped
+            arrays and the files of a `SampleReader` are read chunk by chunk.
+        chunk_size : int, optional
+            The number of samples that are validated at once. By default
+            chunks are chosen so that no intermediate array has more than
+            about a million entries.
 
         Returns
         -------
@@ -487,19 +1033,35 @@ class HRSampler(object):
 
         """
 
-        samples = np.atleast_2d(samples)
+        if isinstance(samples, SampleReader):
+            n_columns = len(samples.columns)
+            arrays = samples.arrays
+        else:
+            if isinstance(samples, pd.DataFrame):
+                samples = samples.values
+            samples = np.atleast_2d(samples)
+            n_columns = samples.shape[1]
+            arrays = [samples]
         prob = self.problem
+        inequalities = None
 
-        if samples.shape[1] == len(self.model.reactions):
-            S = create_stoichiometric_matrix(self.model)
+        if n_columns == len(self.model.reactions):
+            S = create_stoichiometric_matrix(
+                self.model, array_type="lil" if self.sparse else "dense"
+            )
+            if self.sparse:
+                S = S.tocsr()
             b = np.array(
                 [self.model.constraints[m.id].lb for m in self.model.metabolites]
             )
-            bounds = np.array([r.bounds for r in self.model.reactions]).T
-        elif samples.shape[1] == len(self.model.variables):
+            reactions = self.model.reactions
+            bounds = np.vstack([reactions.lower_bounds, reactions.upper_bounds])
+        elif n_columns == len(self.model.variables):
             S = prob.equalities
             b = prob.b
             bounds = prob.variable_bounds
+            if prob.inequalities.shape[0]:
+                inequalities = prob.inequalities
         else:
             raise ValueError(
                 "Wrong number of columns. samples must have a "
@@ -507,39 +1069,39 @@ class HRSampler(object):
                 "model!"
             )
 
-        feasibility = np.abs(S.dot(samples.T).T - b).max(axis=1)
-        lb_error = (
-            samples
-            - bounds[
-                0,
-            ]
-        ).min(axis=1)
-        ub_error = (
-            bounds[
-                1,
-            ]
-            - samples
-        ).min(axis=1)
+        if chunk_size is None:
+            width = max(n_columns, S.shape[0])
+            if inequalities is not None:
+                width = max(width, inequalities.shape[0])
+            chunk_size = max(1, 2**20 // width)
+
+        codes = []
+        for array in arrays:
+            for start in range(0, array.shape[0], chunk_size):
+                chunk = np.asarray(array[start : start + chunk_size], dtype=float)
+                codes.append(self._validate_chunk(chunk, S, b, bounds, inequalities))
+
+        if not codes:
+            return np.zeros(0, dtype=np.dtype((str, 3)))
+        return np.concatenate(codes)
+
+    def _validate_chunk(self, samples, S, b, bounds, inequalities):
+        """Return the validation codes of a single chunk of samples."""
+
+        if S.shape[0] > 0:
+            feasibility = np.abs(S.dot(samples.T).T - b).max(axis=1)
+        else:
+            feasibility = np.zeros(samples.shape[0])
+        lb_error = (samples - bounds[0]).min(axis=1)
+        ub_error = (bounds[1] - samples).min(axis=1)
 
-        if samples.shape[1] == len(self.model.variables) and prob.inequalities.shape[0]:
-            consts = prob.inequalities.dot(samples.T)
+        if inequalities is not None:
+            consts = inequalities.dot(samples.T).T
             lb_error = np.minimum(
-                lb_error,
-                (
-                    consts
-                    - prob.bounds[
-                        0,
-                    ]
-                ).min(axis=1),
+                lb_error, (consts - self.problem.bounds[0]).min(axis=1)
             )
             ub_error = np.minimum(
-                ub_error,
-                (
-                    prob.bounds[
-                        1,
-                    ]
-                    - consts
-                ).min(axis=1),
+                ub_error, (self.problem.bounds[1] - consts).min(axis=1)
             )
 
         valid = (
@@ -564,54 +1126,124 @@ class HRSampler(object):
 
 # Required by ACHRSampler and OptGPSampler
 # Has to be declared outside of class to be used for multiprocessing :(
-def step(sampler, x, delta, fraction=None, tries=0):
+def step(sampler, x, delta, fraction=None, tries=0, random_state=None):
     """Sample a new feasible point from the point `x` in direction `delta`."""
 
-    prob = sampler.problem
-    valid = (np.abs(delta) > sampler.feasibility_tol) & np.logical_not(
-        prob.variable_fixed
-    )
+    return batch_step(sampler, x, np.atleast_2d(delta), fraction, tries, random_state)[
+        0
+    ]
+
 
-    # permissible alphas for staying in variable bounds
-    valphas = ((1.0 - sampler.bounds_tol) * prob.variable_bounds - x)[:, valid]
-    valphas = (valphas / delta[valid]).flatten()
+def _alpha_ranges(sampler, x, delta):
+    """Get the permissible step sizes for a batch of points and directions.
+
+    Returns an array with one row per direction holding the smallest and
+    largest step size that keep the point within all bounds.
+
+    """
+
+    prob = sampler.problem
+    tol = sampler.feasibility_tol
+    shrunk_bounds = (1.0 - sampler.bounds_tol) * prob.variable_bounds
+    ratios = [
+        (shrunk_bounds[0] - x) / delta,
+        (shrunk_bounds[1] - x) / delta,
+    ]
+    valid = (np.abs(delta) > tol) & np.logical_not(prob.variable_fixed)
+    masks = [valid, valid]
 
     if prob.bounds.shape[0] > 0:
         # permissible alphas for staying in constraint bounds
-        ineqs = prob.inequalities.dot(delta)
-        valid = np.abs(ineqs) > sampler.feasibility_tol
-        balphas = ((1.0 - sampler.bounds_tol) * prob.bounds - prob.inequalities.dot(x))[
-            :, valid
-        ]
-        balphas = (balphas / ineqs[valid]).flatten()
+        ineqs = np.atleast_2d(prob.inequalities.dot(delta.T).T)
+        consts = np.atleast_2d(prob.inequalities.dot(x.T).T)
+        shrunk_bounds = (1.0 - sampler.bounds_tol) * prob.bounds
+        valid = np.abs(ineqs) > tol
+        ratios.extend(
+            [(shrunk_bounds[0] - consts) / ineqs, (shrunk_bounds[1] - consts) / ineqs]
+        )
+        masks.extend([valid, valid])
 
-        # combined alphas
-        alphas = np.hstack([valphas, balphas])
-    else:
-        alphas = valphas
-    pos_alphas = alphas[alphas > 0.0]
-    neg_alphas = alphas[alphas <= 0.0]
-    alpha_range = np.array(
-        [
-            neg_alphas.max() if len(neg_alphas) > 0 else 0,
-            pos_alphas.min() if len(pos_alphas) > 0 else 0,
-        ]
-    )
+    ratios = np.hstack(ratios)
+    masks = np.hstack(masks)
+    upper = np.where(masks & (ratios > 0.0), ratios, np.inf).min(axis=1)
+    lower = np.where(masks & (ratios <= 0.0), ratios, -np.inf).max(axis=1)
+    upper[np.isinf(upper)] = 0.0
+    lower[np.isinf(lower)] = 0.0
+
+    return np.column_stack([lower, upper])
+
+
+def _random_integers(random_state, high, size):
+    """Draw `size` integers below `high` from one or one generator each."""
+    if isinstance(random_state, (list, tuple)):
+        return np.array([g.integers(high) for g in random_state], dtype=int)
+    if random_state is None:
+        return np.random.randint(high, size=size)
+    if hasattr(random_state, "integers"):
+        return random_state.integers(high, size=size)
+    return random_state.randint(high, size=size)
+
+
+def _random_uniform(random_state, low, high):
+    """Draw one uniform number per entry from one or one generator each."""
+    if isinstance(random_state, (list, tuple)):
+        return np.array([g.uniform(a, b) for g, a, b in zip(random_state, low, high)])
+    if random_state is None:
+        return np.random.uniform(low, high)
+    return random_state.uniform(low, high)
+
+
+def batch_step(sampler, x, delta, fraction=None, tries=0, random_state=None):
+    """Sample new feasible points for a batch of chains.
+
+    All chains are advanced together using matrix operations which avoids
+    most of the interpreter overhead of stepping each chain on its own.
+
+    Parameters
+    ----------
+    sampler : HRSampler
+        The sampler that defines the sampling problem.
+    x : numpy.array
+        The current points with one row per chain. A single point is used as
+        the origin of all directions.
+    delta : numpy.array
+        The directions with one row per chain.
+    fraction : float, optional
+        Move this fraction of the permissible range instead of a random
+        step.
+    tries : int
+        Internal use only.
+    random_state : numpy.random.Generator or list, optional
+        The random number generator for the steps or a list with one
+        generator per chain. Uses the global generator by default. Chains
+        that run concurrently need their own generators.
+
+    Returns
+    -------
+    numpy.array
+        The new points with one row per chain.
+
+    """
+
+    x = np.broadcast_to(x, delta.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        alpha_range = _alpha_ranges(sampler, x, delta)
 
     if fraction:
-        alpha = alpha_range[0] + fraction * (alpha_range[1] - alpha_range[0])
+        alpha = alpha_range[:, 0] + fraction * (alpha_range[:, 1] - alpha_range[:, 0])
     else:
-        alpha = np.random.uniform(alpha_range[0], alpha_range[1])
+        alpha = _random_uniform(random_state, alpha_range[:, 0], alpha_range[:, 1])
 
-    p = x + alpha * delta
+    p = x + alpha[:, np.newaxis] * delta
 
     # Numerical instabilities may cause bounds invalidation
     # reset sampler and sample from one of the original warmup directions
     # if that occurs. Also reset if we got stuck.
-    if (
-        np.any(sampler._bounds_dist(p) < -sampler.bounds_tol)
-        or np.abs(np.abs(alpha_range).max() * delta).max() < sampler.bounds_tol
-    ):
+    stuck = (
+        np.abs(alpha_range).max(axis=1) * np.abs(delta).max(axis=1) < sampler.bounds_tol
+    )
+    reset = stuck | (sampler._batch_bounds_dist(p) < -sampler.bounds_tol).any(axis=1)
+    if reset.any():
         if tries > MAX_TRIES:
             raise RuntimeError(
                 "Can not escape sampling region, model seems"
@@ -621,8 +1253,19 @@ def step(sampler, x, delta, fraction=None, tries=0):
                 "will help us to fix this :)"
             )
         LOGGER.info("found bounds infeasibility in sample, " "resetting to center")
-        newdir = sampler.warmup[np.random.randint(sampler.n_warmup)]
-        sampler.retries += 1
-
-        return step(sampler, sampler.center, newdir - sampler.center, None, tries + 1)
+        n_reset = reset.sum()
+        if isinstance(random_state, (list, tuple)):
+            random_state = [random_state[i] for i in np.flatnonzero(reset)]
+        newdir = sampler.warmup[
+            _random_integers(random_state, sampler.n_warmup, n_reset)
+        ]
+        sampler.retries += n_reset
+        p[reset] = batch_step(
+            sampler,
+            sampler.center,
+            newdir - sampler.center,
+            None,
+            tries + 1,
+            random_state,
+        )
     return p
@@ -4,13 +4,22 @@
 
 from __future__ import absolute_import, division
 
+import copy
+import weakref
 from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
 import numpy as np
 import pandas
 
 from cobra.core.configuration import Configuration
-from cobra.sampling.hr_sampler import HRSampler, shared_np_array, step
+from cobra.sampling.hr_sampler import (
+    HRSampler,
+    batch_step,
+    restore_shared_state,
+    shared_np_array,
+)
+from cobra.sampling.storage import SampleReader, create_sample_file
 
 
 __all__ = ("OptGPSampler",)
@@ -25,44 +34,106 @@ def mp_init(obj):
     sampler = obj
 
 
+def _init_shared_worker(state):
+    """Initialize a worker from the shared state of an OptGPSampler."""
+    obj = OptGPSampler.__new__(OptGPSampler)
+    obj.__dict__.update(restore_shared_state(state))
+    mp_init(obj)
+
+
+def _shutdown(pool, store):
+    """Stop the worker processes and free the shared memory."""
+    pool.terminate()
+    pool.join()
+    if store is not None:
+        store.close()
+
+
 # Unfortunately this has to be outside the class to be usable with
 # multiprocessing :()
 def _sample_chain(args):
-    """Sample a single chain for OptGPSampler.
+    """Sample a batch of chains with the sampler of the worker process."""
+    return _advance_chains(sampler, args)
+
 
-    center and n_samples are updated locally and forgotten afterwards.
+def _sample_chain_in_thread(params):
+    """Sample a batch of chains with a sampler owned by the thread."""
+    obj, args = params
+    return _advance_chains(obj, args)
+
+
+def _advance_chains(sampler, args):
+    """Sample a batch of chains for OptGPSampler.
+
+    All `sampler.chains` chains of the batch are advanced together. center
+    and n_samples are updated locally and forgotten afterwards. If `output`
+    is given, the thinned samples are written to that .npy file instead of
+    being returned, starting at row ``idx * sampler.chains * n``. The chains
+    continue from `start` or from random warmup points if it is None. Every
+    chain draws from its own generator in `generators`, which are returned
+    in their advanced state. `updates` carries the attributes that changed
+    since the worker started.
 
     """
-    n, idx = args  # has to be this way to work in Python 2.7
+    n, idx, output, fluxes, start, generators, updates = args
+    sampler.__dict__.update(updates)
+    retries = sampler.retries
     center = sampler.center
-    np.random.seed((sampler._seed + idx) % np.iinfo(np.int32).max)
-    pi = np.random.randint(sampler.n_warmup)
+    chains = sampler.chains
 
-    prev = sampler.warmup[pi, :]
-    prev = step(sampler, center, prev - center, 0.95)
+    if start is None:
+        pi = [g.integers(sampler.n_warmup) for g in generators]
+        prev = sampler.warmup[pi, :]
+        prev = batch_step(sampler, center, prev - center, 0.95, random_state=generators)
+    else:
+        prev = start
 
     n_samples = max(sampler.n_samples, 1)
-    samples = np.zeros((n, center.shape[0]))
+    total = np.zeros(center.shape[0])
+    if output is None:
+        samples = np.zeros((chains, n, center.shape[0]))
+    else:
+        samples = np.load(output, mmap_mode="r+")
+        rows = (idx * chains + np.arange(chains)) * n
 
     for i in range(1, sampler.thinning * n + 1):
-        pi = np.random.randint(sampler.n_warmup)
+        pi = [g.integers(sampler.n_warmup) for g in generators]
         delta = sampler.warmup[pi, :] - center
 
-        prev = step(sampler, prev, delta)
+        prev = batch_step(sampler, prev, delta, random_state=generators)
 
         if sampler.problem.homogeneous and (
-            n_samples * sampler.thinning % sampler.nproj == 0
+            (n_samples + chains) * sampler.thinning // sampler.nproj
+            > n_samples * sampler.thinning // sampler.nproj
         ):
-            prev = sampler._reproject(prev)
-            center = sampler._reproject(center)
+            prev = np.array(
+                [sampler._reproject(p, g) for p, g in zip(prev, generators)]
+            )
+            center = sampler._reproject(center, generators[0])
 
         if i % sampler.thinning == 0:
-            samples[i // sampler.thinning - 1, :] = prev
-
-        center = (n_samples * center) / (n_samples + 1) + prev / (n_samples + 1)
-        n_samples += 1
-
-    return (sampler.retries, samples)
+            j = i // sampler.thinning - 1
+            total += prev.sum(axis=0)
+            if output is None:
+                samples[:, j, :] = prev
+            elif fluxes:
+                samples[rows + j] = prev[:, sampler.fwd_idx] - prev[:, sampler.rev_idx]
+            else:
+                samples[rows + j] = prev
+
+        center = (n_samples * center + prev.sum(axis=0)) / (n_samples + chains)
+        n_samples += chains
+
+    if output is None:
+        return (
+            sampler.retries - retries,
+            samples.reshape(chains * n, -1),
+            total,
+            prev,
+            generators,
+        )
+    samples.flush()
+    return (sampler.retries - retries, None, total, prev, generators)
 
 
 class OptGPSampler(HRSampler):
@@ -76,7 +147,8 @@ class OptGPSampler(HRSampler):
     model : cobra.Model
         The cobra model from which to generate samples.
     processes: int, optional (default Configuration.processes)
-        The number of processes used during sampling.
+        The number of processes used to generate the warmup points and
+        during sampling.
     thinning : int, optional
         The thinning factor of the generated sampling chain. A thinning of 10
         means samples are returned every 10 steps.
@@ -88,6 +160,30 @@ class OptGPSampler(HRSampler):
     seed : int > 0, optional
         Sets the random number seed. Initialized to the current time stamp if
         None.
+    chains : int, optional
+        The number of chains that each process advances together with
+        vectorized steps (default 1). Many chains per process reduce the
+        interpreter overhead of long sampling runs.
+    sparse : boolean, optional
+        Whether to store the constraints as sparse matrices which lowers the
+        memory requirements for large models (default False).
+    cache : boolean, optional
+        Whether to reuse the nullspace and warmup points of an identical
+        problem from the cache directory (default False).
+    backend : {"processes", "threads"}, optional
+        Whether to run the chains in worker processes or in threads of the
+        current process (default "processes"). Threads need no copies or
+        serialization and work where forking is unsafe, such as in some
+        notebook servers. They scale with the number of cores because the
+        batched steps of many `chains` spend most of their time in NumPy
+        routines that release the GIL. By default, the warmup points are
+        generated in the current process with this backend, see
+        `warmup_processes`.
+    warmup_processes : int, optional
+        The number of processes used to generate the warmup points. Defaults
+        to `processes` for the "processes" backend and to 1 for the
+        "threads" backend, which solves the warmup problems one after the
+        other in the current process without starting any processes.
 
     Attributes
     ----------
@@ -124,6 +220,8 @@ class OptGPSampler(HRSampler):
     center : numpy.array
         The center of the sampling space as estimated by the mean of all
         previously generated samples.
+    chains : int
+        The number of chains advanced together in each process.
 
     Notes
     -----
@@ -135,13 +233,27 @@ class OptGPSampler(HRSampler):
     If the number of processes used is larger than the one requested,
     number of samples is adjusted to the smallest multiple of the number of
     processes larger than the requested sample number. For instance, if you
-    have 3 processes and request 8 samples you will receive 9.
+    have 3 processes and request 8 samples you will receive 9. The same
+    holds for the total number of chains (processes times `chains`).
 
     Memory usage is roughly in the order of (2 * number reactions)^2
     due to the required nullspace matrices and warmup points. So large
-    models easily take up a few GB of RAM. However, most of the large matrices
-    are kept in shared memory. So the RAM usage is independent of the number
-    of processes.
+    models easily take up a few GB of RAM. However, the large matrices, the
+    warmup points and the center are kept in named shared memory that the
+    worker processes attach to (Python 3.8 or later). So the RAM usage is
+    independent of the number of processes.
+
+    Every chain draws from its own random number generator derived from
+    `seed` with `numpy.random.SeedSequence`. For a given seed, number of
+    processes and `chains` the samples thus only depend on the warmup points
+    and are the same whatever order the workers run in. Warmup points from
+    several processes may differ between runs for degenerate problems, so
+    both backends only give the same samples with the same serial warmup
+    (`warmup_processes=1`) or with warmup points taken from the cache.
+
+    The worker processes are started with the first call to `sample` and
+    reused by later calls. Call `close` or use the sampler as a context
+    manager to stop them and free the shared memory.
 
     References
     ----------
@@ -153,23 +265,48 @@ class OptGPSampler(HRSampler):
 
     """
 
-    def __init__(self, model, processes=None, thinning=100, nproj=None, seed=None):
+    def __init__(
+        self,
+        model,
+        processes=None,
+        thinning=100,
+        nproj=None,
+        seed=None,
+        chains=1,
+        sparse=False,
+        cache=False,
+        backend="processes",
+        warmup_processes=None,
+    ):
         """Initialize a new OptGPSampler."""
-        super(OptGPSampler, self).__init__(model, thinning, seed=seed)
-        self.generate_fva_warmup()
+        super(OptGPSampler, self).__init__(
+            model, thinning, nproj=nproj, seed=seed, sparse=sparse, cache=cache
+        )
+        if backend not in ("processes", "threads"):
+            raise ValueError("backend must be 'processes' or 'threads'!")
+        self.backend = backend
+        self.chains = chains
+        self._chain_states = None
+        self._generators = None
+        self._pool = None
+        self._finalizer = None
 
         if processes is None:
             self.processes = CONFIGURATION.processes
         else:
             self.processes = processes
 
+        if warmup_processes is None:
+            warmup_processes = self.processes if backend == "processes" else 1
+        self.generate_fva_warmup(processes=warmup_processes)
+
         # This maps our saved center into shared memory,
         # meaning they are synchronized across processes
         self.center = shared_np_array(
             (len(self.model.variables),), self.warmup.mean(axis=0)
         )
 
-    def sample(self, n, fluxes=True):
+    def sample(self, n, fluxes=True, output=None):
         """Generate a set of samples.
 
         This is the basic sampling function for all hit-and-run samplers.
@@ -184,11 +321,16 @@ class OptGPSampler(HRSampler):
             to False will return a variable for each forward and backward flux
             as well as all additional variables you might have defined in the
             model.
+        output : str or pathlib.Path, optional
+            A .npy file to which the samples are written as they are
+            generated instead of keeping them in memory. Every chain writes
+            its samples directly into the memory-mapped file.
 
         Returns
         -------
-        numpy.matrix
-            Returns a matrix with `n` rows, each containing a flux sample.
+        pandas.DataFrame or cobra.sampling.SampleReader
+            Returns a data frame with `n` rows, each containing a flux sample,
+            or a lazy reader of the samples in `output`.
 
         Notes
         -----
@@ -202,49 +344,153 @@ class OptGPSampler(HRSampler):
         (`n` > 1000).
 
         """
-        if self.processes > 1:
-            n_process = np.ceil(n / self.processes).astype(int)
-            n = n_process * self.processes
-
-            # The cast to list is weird but not doing it gives recursion
-            # limit errors, something weird going on with multiprocessing
-            args = list(zip([n_process] * self.processes, range(self.processes)))
-
-            # No with statement or starmap here since Python 2.x
-            # does not support it :(
-            mp = Pool(self.processes, initializer=mp_init, initargs=(self,))
-            results = mp.map(_sample_chain, args, chunksize=1)
-            mp.close()
-            mp.join()
-
-            chains = np.vstack([r[1] for r in results])
-            self.retries += sum(r[0] for r in results)
+        n_chain = np.ceil(n / (self.processes * self.chains)).astype(int)
+        n = n_chain * self.processes * self.chains
+
+        if fluxes:
+            names = [r.id for r in self.model.reactions]
         else:
-            mp_init(self)
-            results = _sample_chain((n, 0))
-            chains = results[1]
+            names = [v.name for v in self.model.variables]
+
+        if output is not None:
+            output = str(output)
+            create_sample_file(output, n, len(names)).flush()
 
-        # Update the global center
-        self.center = (self.n_samples * self.center + np.atleast_2d(chains).sum(0)) / (
-            self.n_samples + n
+        generators = self._task_generators()
+        results = self._run_chains(
+            [
+                (n_chain, i, output, fluxes, None, generators[i])
+                for i in range(self.processes)
+            ]
         )
-        self.n_samples += n
 
+        if output is not None:
+            return SampleReader(output, names)
+
+        chains = np.vstack([r[1] for r in results])
         if fluxes:
-            names = [r.id for r in self.model.reactions]
+            chains = chains[:, self.fwd_idx] - chains[:, self.rev_idx]
+
+        return pandas.DataFrame(chains, columns=names)
+
+    def _sample_chains(self, n):
+        """Continue all chains of all processes by `n` samples."""
+        states = self._chain_states
+        if states is None:
+            states = [None] * self.processes
+        generators = self._task_generators()
+        results = self._run_chains(
+            [
+                (
+                    n,
+                    i,
+                    None,
+                    False,
+                    states[i],
+                    generators[i],
+                )
+                for i in range(self.processes)
+            ]
+        )
+        self._chain_states = [r[3] for r in results]
+        return np.vstack([r[1] for r in results]).reshape(
+            self.processes * self.chains, n, -1
+        )
+
+    def _task_generators(self):
+        """Return the random number generators of all chains by process."""
+        n = self.processes * self.chains
+        if self._generators is None or len(self._generators) != n:
+            self._generators = self._spawn_generators(n)
+        return [
+            self._generators[i * self.chains : (i + 1) * self.chains]
+            for i in range(self.processes)
+        ]
+
+    def _updates(self):
+        """Return the attributes workers need to refresh before sampling."""
+        updates = {
+            "n_samples": self.n_samples,
+            "thinning": self.thinning,
+            "nproj": self.nproj,
+            "chains": self.chains,
+        }
+        if self._shared is None:
+            updates["center"] = self.center
+        return updates
+
+    def _get_pool(self):
+        """Return the worker pool and start it if necessary.
+
+        For worker processes, the problem, warmup points and center are moved
+        to named shared memory first, so the workers attach to them instead
+        of receiving copies. Worker threads use the arrays of the sampler
+        directly. The pool is kept until `close` is called.
 
-            return pandas.DataFrame(
-                chains[:, self.fwd_idx] - chains[:, self.rev_idx],
-                columns=names,
+        """
+        if self._pool is None and self.backend == "threads":
+            self._pool = ThreadPool(self.processes)
+            self._finalizer = weakref.finalize(self, _shutdown, self._pool, None)
+        elif self._pool is None:
+            self._share()
+            if self._shared is None:
+                self._pool = Pool(self.processes, initializer=mp_init, initargs=(self,))
+            else:
+                self._pool = Pool(
+                    self.processes,
+                    initializer=_init_shared_worker,
+                    initargs=(self._shared_state(),),
+                )
+            self._finalizer = weakref.finalize(
+                self, _shutdown, self._pool, self._shared
             )
+        return self._pool
+
+    def _run_chains(self, args):
+        """Run `_sample_chain` once per process and update the center."""
+        # The pool has to be started first since that may move the center
+        pool = self._get_pool() if self.processes > 1 else None
+        updates = self._updates()
+        args = [a + (updates,) for a in args]
+
+        if pool is not None and self.backend == "threads":
+            # Shallow copies share all arrays but count their own retries
+            params = [(copy.copy(self), a) for a in args]
+            results = pool.map(_sample_chain_in_thread, params, chunksize=1)
+            self.retries += sum(r[0] for r in results)
+        elif pool is not None:
+            results = pool.map(_sample_chain, args, chunksize=1)
+            self.retries += sum(r[0] for r in results)
         else:
-            names = [v.name for v in self.model.variables]
+            mp_init(self)
+            results = [_sample_chain(args[0])]
+
+        # Continue every chain's stream with its advanced generator
+        self._generators = [g for r in results for g in r[4]]
+
+        # Update the global center in place, so workers attached to it see
+        # the new value
+        n = sum(a[0] for a in args) * self.chains
+        total = sum(r[2] for r in results)
+        self.center[...] = (self.n_samples * self.center + total) / (self.n_samples + n)
+        self.n_samples += n
+
+        return results
 
-            return pandas.DataFrame(chains, columns=names)
+    def close(self):
+        """Shut down the worker processes and free the shared memory."""
+        if self._pool is not None:
+            self._finalizer.detach()
+            self._pool.close()
+            self._pool.join()
+            self._pool = self._finalizer = None
+        super(OptGPSampler, self).close()
 
     # Models can be large so don't pass them around during multiprocessing
     def __getstate__(self):
         """Return the object for serialization."""
         d = dict(self.__dict__)
         del d["model"]
+        for key in ("_pool", "_finalizer", "_shared"):
+            d[key] = None
         return d
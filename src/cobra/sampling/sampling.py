@@ -7,14 +7,15 @@ from __future__ import absolute_import, division
 import pandas
 
 from cobra.sampling.achr import ACHRSampler
+from cobra.sampling.chrr import CHRRSampler
 from cobra.sampling.optgp import OptGPSampler
 
 
-def sample(model, n, method="optgp", thinning=100, processes=1, seed=None):
+def sample(model, n, method="optgp", thinning=100, processes=1, seed=None, output=None):
     """Sample valid flux distributions from a cobra model.
 
     The function samples valid flux distributions from a cobra model.
-    Currently we support two methods:
+    Currently we support three methods:
 
     1. 'optgp' (default) which uses the OptGPSampler that supports parallel
         sampling [1]_. Requires large numbers of samples to be performant
@@ -25,6 +26,12 @@ def sample(model, n, method="optgp", thinning=100, processes=1, seed=None):
     2. 'achr' which uses artificial centering hit-and-run. This is a single
        process method with good convergence [2]_.
 
+    or
+
+    3. 'chrr' which uses coordinate hit-and-run with rounding. This is a
+       single process method that mixes much faster on badly conditioned
+       flux spaces and usually needs a far smaller `thinning` [3]_.
+
     Parameters
     ----------
     model : cobra.Model
@@ -46,12 +53,16 @@ def sample(model, n, method="optgp", thinning=100, processes=1, seed=None):
     seed : int > 0, optional
         The random number seed to be used. Initialized to current time stamp
         if None.
+    output : str or pathlib.Path, optional
+        A .npy file to which the samples are written while they are
+        generated. Use this for sample sets that do not fit into memory.
 
     Returns
     -------
-    pandas.DataFrame
+    pandas.DataFrame or cobra.sampling.SampleReader
         The generated flux samples. Each row corresponds to a sample of the
-        fluxes and the columns are the reactions.
+        fluxes and the columns are the reactions. If `output` is given, a
+        lazy reader of the samples on disk is returned instead.
 
     Notes
     -----
@@ -69,6 +80,10 @@ def sample(model, n, method="optgp", thinning=100, processes=1, seed=None):
     .. [2] Direction Choice for Accelerated Convergence in Hit-and-Run Sampling
        David E. Kaufman Robert L. Smith
        Operations Research 199846:1 , 84-95
+    .. [3] Haraldsdóttir HS, Cousins B, Thiele I, Fleming RMT, Vempala S (2017)
+       CHRR: coordinate hit-and-run with rounding for uniform sampling of
+       constraint-based models.
+       Bioinformatics 33(11): 1741-1743.
 
     """
 
@@ -76,9 +91,15 @@ def sample(model, n, method="optgp", thinning=100, processes=1, seed=None):
         sampler = OptGPSampler(model, processes, thinning=thinning, seed=seed)
     elif method == "achr":
         sampler = ACHRSampler(model, thinning=thinning, seed=seed)
+    elif method == "chrr":
+        sampler = CHRRSampler(model, thinning=thinning, seed=seed)
     else:
-        raise ValueError("method must be 'optgp' or 'achr'!")
+        raise ValueError("method must be 'optgp', 'achr' or 'chrr'!")
+
+    with sampler:
+        if output is not None:
+            return sampler.sample(n, output=output)
 
-    return pandas.DataFrame(
-        columns=[rxn.id for rxn in model.reactions], data=sampler.sample(n)
-    )
+        return pandas.DataFrame(
+            columns=[rxn.id for rxn in model.reactions], data=sampler.sample(n)
+        )
@@ -0,0 +1,142 @@
+"""Provide out-of-core storage for flux samples."""
+
+import pathlib
+from typing import Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+PathType = Union[str, pathlib.PurePath]
+
+
+def create_sample_file(path: PathType, n_rows: int, n_columns: int) -> np.memmap:
+    """Create a new .npy file for samples and map it into memory.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Where to create the file. An existing file is overwritten.
+    n_rows : int
+        The number of samples.
+    n_columns : int
+        The number of reactions or variables per sample.
+
+    Returns
+    -------
+    numpy.memmap
+        The writable memory map of the new file.
+
+    """
+    return np.lib.format.open_memmap(
+        str(path), mode="w+", dtype=np.float64, shape=(n_rows, n_columns)
+    )
+
+
+class SampleReader:
+    """Lazily read samples from one or several .npy files.
+
+    The files are memory-mapped, so only the rows that are requested are
+    loaded into memory.
+
+    Parameters
+    ----------
+    paths : str or pathlib.Path or list
+        The .npy file(s) containing the samples. The rows of several files are
+        read as if they were concatenated.
+    columns : list of str
+        The reaction or variable identifiers of the columns.
+
+    Attributes
+    ----------
+    paths : list of pathlib.Path
+        The files containing the samples.
+    columns : list of str
+        The reaction or variable identifiers of the columns.
+
+    """
+
+    def __init__(
+        self, paths: Union[PathType, Sequence[PathType]], columns: Sequence[str]
+    ) -> None:
+        """Initialize a new reader."""
+        if isinstance(paths, (str, pathlib.PurePath)):
+            paths = [paths]
+        self.paths = [pathlib.Path(p) for p in paths]
+        self.columns = list(columns)
+        self._arrays = [np.load(str(p), mmap_mode="r") for p in self.paths]
+        for path, array in zip(self.paths, self._arrays):
+            if array.ndim != 2 or array.shape[1] != len(self.columns):
+                raise ValueError(
+                    "The samples in '{}' do not have one column per "
+                    "identifier.".format(path)
+                )
+        self._offsets = np.cumsum([0] + [len(a) for a in self._arrays])
+
+    def __len__(self) -> int:
+        """Return the number of samples."""
+        return int(self._offsets[-1])
+
+    def __repr__(self) -> str:
+        """Return a short description of the reader."""
+        return "<SampleReader of {} samples x {} columns in {} file(s)>".format(
+            len(self), len(self.columns), len(self.paths)
+        )
+
+    @property
+    def shape(self) -> tuple:
+        """Return the number of samples and columns."""
+        return len(self), len(self.columns)
+
+    @property
+    def arrays(self) -> List[np.memmap]:
+        """Return the read-only memory maps of all files."""
+        return list(self._arrays)
+
+    def read(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """Load a range of samples into memory.
+
+        Parameters
+        ----------
+        start : int, optional
+            The first sample to load (default 0).
+        stop : int, optional
+            One past the last sample to load (default all remaining samples).
+
+        Returns
+        -------
+        pandas.DataFrame
+            The samples with one row per sample.
+
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        parts = []
+        for array, offset in zip(self._arrays, self._offsets):
+            lower = max(start - offset, 0)
+            upper = min(stop - offset, len(array))
+            if lower < upper:
+                parts.append(np.asarray(array[lower:upper]))
+        data = np.vstack(parts) if parts else np.zeros((0, len(self.columns)))
+        return pd.DataFrame(data, columns=self.columns, index=range(start, stop))
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Iterate over the samples in chunks.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The number of samples per chunk.
+
+        Yields
+        ------
+        pandas.DataFrame
+            Consecutive chunks of at most `chunk_size` samples.
+
+        """
+        for start in range(0, len(self), chunk_size):
+            yield self.read(start, start + chunk_size)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Load all samples into memory."""
+        return self.read()
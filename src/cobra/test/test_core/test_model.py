@@ -723,6 +723,130 @@ def test_context_manager(model):
     assert model.reactions[0].bounds == bounds0
 
 
+def test_set_bounds(model):
+    ids = ["EX_glc__D_e", "PGI", "ATPM"]
+    reactions = model.reactions.get_by_any(ids)
+    expected = [(rxn.forward_variable.lb, rxn.forward_variable.ub) for rxn in reactions]
+    bounds = [rxn.bounds for rxn in reactions]
+    with model:
+        model.set_bounds(ids, [-5, 1, -10], [5, 2, -1])
+        assert model.reactions.EX_glc__D_e.bounds == (-5, 5)
+        assert model.reactions.PGI.bounds == (1, 2)
+        atpm = model.reactions.ATPM
+        assert (atpm.forward_variable.lb, atpm.forward_variable.ub) == (0, 0)
+        assert (atpm.reverse_variable.lb, atpm.reverse_variable.ub) == (1, 10)
+        model.set_bounds(np.arange(2), -np.inf, np.inf)
+        assert model.reactions[0].forward_variable.ub is None
+        assert model._contexts[-1].size() == 2
+        # The variables match the ones set reaction by reaction
+        variable_bounds = [(v.lb, v.ub) for v in model.variables]
+        for rxn in model.reactions:
+            rxn.update_variable_bounds()
+        assert variable_bounds == [(v.lb, v.ub) for v in model.variables]
+    assert [rxn.bounds for rxn in reactions] == bounds
+    assert [
+        (rxn.forward_variable.lb, rxn.forward_variable.ub) for rxn in reactions
+    ] == expected
+    with pytest.raises(ValueError):
+        model.set_bounds(ids, [1, 2, 3], 0)
+    with pytest.raises(ValueError):
+        model.set_bounds(ids, [1, 2], 10)
+
+
+def test_set_objective_coefficients(model):
+    biomass = model.reactions.Biomass_Ecoli_core
+    with model:
+        model.set_objective_coefficients(["PGI", "ATPM"], [2, 3])
+        assert model.reactions.PGI.objective_coefficient == 2
+        assert model.reactions.ATPM.objective_coefficient == 3
+        assert biomass.objective_coefficient == 1
+        model.set_objective_coefficients([biomass], 0)
+        assert su.linear_reaction_coefficients(model) == {
+            model.reactions.PGI: 2,
+            model.reactions.ATPM: 3,
+        }
+        assert model._contexts[-1].size() == 2
+    assert su.linear_reaction_coefficients(model) == {biomass: 1}
+
+
+def test_reaction_bound_arrays(model):
+    reactions = model.reactions
+    pgi = reactions.index("PGI")
+    assert np.array_equal(reactions.lower_bounds, [r.lower_bound for r in reactions])
+    assert np.array_equal(reactions.upper_bounds, [r.upper_bound for r in reactions])
+    # The arrays follow changes of single reactions
+    reactions.PGI.bounds = (-3, 4)
+    assert reactions.lower_bounds[pgi] == -3
+    assert reactions.upper_bounds[pgi] == 4
+    with model:
+        reactions.upper_bounds = np.full(len(reactions), 50.0)
+        reactions.lower_bounds = -20
+        assert all(r.bounds == (-20, 50) for r in reactions)
+        assert reactions.PGI.reverse_variable.ub == 20
+    assert reactions.PGI.bounds == (-3, 4)
+    assert reactions.lower_bounds[pgi] == -3
+    # and structural changes of the model
+    rxn = reactions.PGI
+    model.remove_reactions([rxn])
+    rxn.lower_bound = -99
+    model.add_reactions([rxn])
+    assert len(reactions.lower_bounds) == len(reactions)
+    assert reactions.lower_bounds[-1] == -99
+    subset = reactions[:3]
+    subset.lower_bounds = -1
+    assert [r.lower_bound for r in reactions[:3]] == [-1] * 3
+
+
+def test_objective_coefficient_array(model):
+    biomass = model.reactions.index("Biomass_Ecoli_core")
+    coefficients = model.reactions.objective_coefficients
+    assert coefficients[biomass] == 1
+    assert coefficients.sum() == 1
+    with model:
+        model.reactions.objective_coefficients = np.arange(len(model.reactions))
+        assert model.reactions.PGI.objective_coefficient == model.reactions.index("PGI")
+    assert np.array_equal(model.reactions.objective_coefficients, coefficients)
+
+
+def test_snapshot_restore(model):
+    bounds = {rxn.id: rxn.bounds for rxn in model.reactions}
+    variables = {v.name: (v.lb, v.ub) for v in model.variables}
+    constraints = set(model.constraints.keys())
+    baseline = model.snapshot()
+    for value in range(10):
+        model.reactions.PGI.bounds = (-value, value)
+    model.set_bounds(["PFK", "ATPM"], 0, 5)
+    model.objective = "ATPM"
+    model.objective_direction = "min"
+    extra = model.problem.Variable("extra", lb=0, ub=3)
+    model.add_cons_vars(
+        [
+            extra,
+            model.problem.Constraint(
+                extra + model.reactions.PGI.flux_expression, ub=2, name="extra"
+            ),
+        ]
+    )
+    model.remove_cons_vars([model.constraints.atp_c])
+    model.restore(baseline)
+    assert {rxn.id: rxn.bounds for rxn in model.reactions} == bounds
+    assert {v.name: (v.lb, v.ub) for v in model.variables} == variables
+    assert set(model.constraints.keys()) == constraints
+    assert su.linear_reaction_coefficients(model) == {
+        model.reactions.Biomass_Ecoli_core: 1
+    }
+    assert model.objective_direction == "max"
+    # A restore inside a context is undone on exit
+    with model:
+        model.reactions.PGI.bounds = (1, 2)
+        model.restore(baseline)
+        assert model.reactions.PGI.bounds == bounds["PGI"]
+    assert model.reactions.PGI.bounds == bounds["PGI"]
+    model.add_reactions([Reaction("new")])
+    with pytest.raises(ValueError):
+        model.restore(baseline)
+
+
 def test_objective_coefficient_reflects_changed_objective(model):
     biomass_r = model.reactions.get_by_id("Biomass_Ecoli_core")
     assert biomass_r.objective_coefficient == 1
@@ -4,7 +4,12 @@
 
 from __future__ import absolute_import
 
-from cobra.core import Solution
+from collections import OrderedDict
+
+import pytest
+
+from cobra.core import Solution, get_solution
+from cobra.core.solution import _solver_index
 
 
 def test_solution_contains_only_reaction_specific_values(solved_model):
@@ -15,3 +20,48 @@ def test_solution_contains_only_reaction_specific_values(solved_model):
         # assert set(solution.reduced_costs.index) == reaction_ids
     else:
         raise TypeError("solutions of type {0:r} are untested".format(type(solution)))
+
+
+def test_get_solution_matches_solver(model):
+    model.slim_optimize()
+    solution = get_solution(model)
+    primals = model.solver.primal_values
+    reduced_costs = model.solver.reduced_costs
+    shadow_prices = model.solver.shadow_prices
+    for rxn in model.reactions:
+        assert solution.fluxes[rxn.id] == pytest.approx(
+            primals[rxn.id] - primals[rxn.reverse_id]
+        )
+        assert solution.reduced_costs[rxn.id] == pytest.approx(
+            reduced_costs[rxn.id] - reduced_costs[rxn.reverse_id]
+        )
+    for met in model.metabolites:
+        assert solution.shadow_prices[met.id] == pytest.approx(shadow_prices[met.id])
+    subset = get_solution(model, reactions=model.reactions[:3])
+    assert list(subset.fluxes.index) == [rxn.id for rxn in model.reactions[:3]]
+
+
+def test_get_solution_index_cache(model):
+    model.slim_optimize()
+    get_solution(model)
+    index = model._solver_index
+    get_solution(model)
+    assert model._solver_index is index
+    # Renaming, removing and adding reactions invalidates the cache
+    model.reactions.PGI.id = "PGI_renamed"
+    assert "PGI_renamed" in get_solution(model).fluxes.index
+    assert model._solver_index is not index
+    model.remove_reactions([model.reactions.PGI_renamed])
+    model.slim_optimize()
+    solution = get_solution(model)
+    assert len(solution.fluxes) == len(model.reactions)
+    assert "PGI_renamed" not in solution.fluxes.index
+    assert "_solver_index" not in model.copy().__dict__
+
+
+def test_get_solution_mapping_order(model):
+    model.slim_optimize()
+    index = _solver_index(model)
+    primals = model.solver.primal_values
+    shuffled = OrderedDict(reversed(list(primals.items())))
+    assert list(index.values(shuffled, index.variable_names)) == list(primals.values())
@@ -7,13 +7,17 @@ from __future__ import absolute_import
 import math
 
 import numpy as np
+import pandas as pd
 import pytest
 from pandas import Series
 from six import iteritems
 
+from cobra.flux_analysis import deletion
 from cobra.flux_analysis.deletion import (
     double_gene_deletion,
     double_reaction_deletion,
+    multi_gene_deletion,
+    multi_reaction_deletion,
     single_gene_deletion,
     single_reaction_deletion,
 )
@@ -188,6 +192,23 @@ def test_single_reaction_deletion(model, all_solvers):
         assert np.isclose(result.knockout[reaction].growth, value, atol=1e-05)
 
 
+def test_single_reaction_deletion_inactive(model, mocker):
+    """Test that knockouts of inactive reactions are not solved."""
+    spy = mocker.spy(deletion, "_get_growth")
+    result = single_reaction_deletion(model=model, processes=1)
+    assert spy.call_count < len(model.reactions)
+    for rxn in model.reactions:
+        with model:
+            rxn.knock_out()
+            expected = model.slim_optimize()
+        assert np.isclose(
+            result.knockout[rxn].growth.iloc[0],
+            expected,
+            atol=model.tolerance,
+            equal_nan=True,
+        )
+
+
 # Single reaction deletion ROOM
 def test_single_reaction_deletion_room(room_model, room_solution, all_solvers):
     """Test single reaction deletion using ROOM."""
@@ -329,6 +350,30 @@ def test_double_gene_deletion(model):
 
 
 # Double reaction deletion
+def test_double_gene_deletion_grouped(model, mocker):
+    """Test that gene pairs disabling the same reactions are solved once."""
+    spy = mocker.spy(deletion, "_reactions_knockouts_with_restore")
+    # b2935 and b2465 are isozymes of TKT1 and TKT2
+    genes = ["b2935", "b2465", "b0726", "b0727"]
+    result = double_gene_deletion(model, gene_list1=genes, processes=1)
+    assert len(result) == 10
+    disabled = {frozenset(r.id for r in call[0][1]) for call in spy.call_args_list}
+    assert spy.call_count == len(disabled)
+    assert frozenset(["TKT1", "TKT2"]) in disabled
+    with model:
+        model.reactions.TKT1.knock_out()
+        model.reactions.TKT2.knock_out()
+        expected = model.slim_optimize()
+    assert np.isclose(
+        result.knockout[{"b2935", "b2465"}].growth.iloc[0], expected, atol=1e-6
+    )
+    # both genes are required for AKGDH
+    assert np.isclose(
+        result.knockout[{"b0726"}].growth.iloc[0],
+        result.knockout[{"b0726", "b0727"}].growth.iloc[0],
+    )
+
+
 def test_double_reaction_deletion_benchmark(large_model, benchmark):
     """Benchmark double reaction deletion."""
     reactions = large_model.reactions[1::100]
@@ -360,6 +405,40 @@ def test_double_reaction_deletion(model):
                 assert np.isclose(sol_one.growth, growth, atol=1e-3)
 
 
+def test_multi_gene_deletion(model, mocker):
+    """Test n-order gene deletion with lethality pruning."""
+    genes = ["b0726", "b4025", "b0724", "b0720", "b2935", "b2935", "b1276", "b1241"]
+    threshold = 0.01 * model.slim_optimize()
+    double = double_gene_deletion(model, gene_list1=genes, processes=1)
+    multi = multi_gene_deletion(model, gene_list=genes, order=2, processes=1)
+    assert len(multi) == len(double) == 7 + 21
+    for ids, growth, _ in multi.itertuples(index=False):
+        expected = double.knockout[ids].growth.iloc[0]
+        if np.isnan(expected) or expected < threshold:
+            assert np.isnan(growth) or growth < threshold
+        else:
+            assert np.isclose(growth, expected, atol=1e-6)
+
+    spy = mocker.spy(deletion, "_deletions")
+    triple = multi_gene_deletion(model, gene_list=genes, order=3, processes=1)
+    assert len(triple) == 7 + 21 + 35
+    # combinations containing the lethal gene b0720 are never simulated
+    assert spy.call_count == 3
+    for call in spy.call_args_list[1:]:
+        assert all("b0720" not in ids for ids in call[0][2])
+    with pytest.raises(ValueError):
+        multi_gene_deletion(model, gene_list=genes, order=0)
+
+
+def test_multi_reaction_deletion(model):
+    """Test n-order reaction deletion with other methods."""
+    reactions = ["FBA", "FBP", "CS", "FUM"]
+    multi = multi_reaction_deletion(
+        model, reaction_list=reactions, method="linear moma", processes=1
+    )
+    assert len(multi) == 4 + 6
+
+
 def test_deletion_accessor(small_model):
     """Test the DataFrame accessor."""
     single = single_reaction_deletion(small_model, small_model.reactions[0:10])
@@ -381,3 +460,45 @@ def test_deletion_accessor(small_model):
     assert double.knockout[rxn1, rxn2].shape == (2, 3)
     assert double.knockout[{rxn1, rxn2}].shape == (1, 3)
     assert double.knockout[{rxn1}, {rxn2}].shape == (2, 3)
+
+
+def test_deletion_accessor_index(small_model):
+    """Test that the accessor index agrees with a scan of the results."""
+    double = double_reaction_deletion(small_model, small_model.reactions[0:10])
+    assert double.knockout._labels is not None
+    queries = [frozenset(ids) for ids in double.ids.iloc[::3]]
+    queries.append(frozenset(["not_there"]))
+    found = double.knockout[queries]
+    expected = double[[ids in queries for ids in double.ids]]
+    assert found.index.equals(expected.index)
+    subset = double.iloc[::2]
+    assert subset.knockout[queries].index.equals(
+        subset[[ids in queries for ids in subset.ids]].index
+    )
+
+
+def test_deletion_accessor_reordered(small_model):
+    """Test that lookups stay correct after in-place changes of the results."""
+    single = single_reaction_deletion(small_model, small_model.reactions[0:10])
+    rxn = small_model.reactions[3]
+    single.knockout[rxn]
+    single.sort_values("growth", inplace=True)
+    assert single.knockout[rxn].ids.iloc[0] == {rxn.id}
+    single.drop(single.knockout[small_model.reactions[0]].index, inplace=True)
+    assert single.knockout[rxn].ids.iloc[0] == {rxn.id}
+    single.drop(single.knockout[rxn].index, inplace=True)
+    assert single.knockout[rxn].empty
+
+
+def test_deletion_accessor_concatenated(small_model):
+    """Test lookups in concatenated results with repeated row labels."""
+    reactions = small_model.reactions
+    results = pd.concat(
+        [
+            single_reaction_deletion(small_model, reactions[:3]),
+            single_reaction_deletion(small_model, reactions[3:6]),
+        ]
+    )
+    found = results.knockout[reactions[0]]
+    assert list(found.ids) == [{reactions[0].id}]
+    assert len(results.knockout[reactions[0], reactions[3]]) == 2
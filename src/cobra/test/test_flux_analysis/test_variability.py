@@ -6,14 +6,20 @@ from __future__ import absolute_import
 
 import numpy as np
 import pytest
+from pandas import DataFrame
 from six import iteritems
 
+from cobra.core import Metabolite, Reaction
 from cobra.exceptions import Infeasible
+from cobra.flux_analysis import variability
 from cobra.flux_analysis.variability import (
+    FVASession,
     find_blocked_reactions,
     find_essential_genes,
     find_essential_reactions,
     flux_variability_analysis,
+    flux_variability_analysis_iter,
+    parametric_flux_variability_analysis,
 )
 
 
@@ -76,6 +82,115 @@ def test_parallel_flux_variability(model, fva_results, all_solvers):
     assert np.allclose(fva_out, fva_results)
 
 
+def test_pruned_flux_variability(model, fva_results, all_solvers):
+    """Test FVA pruning reactions at their bounds."""
+    model.solver = all_solvers
+    fva_out = flux_variability_analysis(model, processes=1, prune=True)
+    fva_out.sort_index(inplace=True)
+    assert np.allclose(fva_out, fva_results)
+    fva_out = flux_variability_analysis(model, processes=2, prune=True)
+    fva_out.sort_index(inplace=True)
+    assert np.allclose(fva_out, fva_results)
+    with pytest.raises(ValueError):
+        flux_variability_analysis(model, loopless=True, prune=True)
+
+
+def test_fva_session(model, fva_results):
+    """Test repeated FVA in a persistent session."""
+    with FVASession(model, processes=2) as session:
+        fva_out = session.run()
+        fva_out.sort_index(inplace=True)
+        assert np.allclose(fva_out, fva_results)
+
+        session.set_bounds({"EX_o2_e": (0, 0)})
+        session.fraction_of_optimum = 0.95
+        with model:
+            model.reactions.EX_o2_e.bounds = (0, 0)
+            expected = flux_variability_analysis(
+                model, fraction_of_optimum=0.95, processes=1
+            )
+        assert np.allclose(session.run(), expected)
+    assert model.reactions.EX_o2_e.bounds != (0, 0)
+
+    model.reactions.EX_glc__D_e.lower_bound = -5
+    with FVASession(
+        model, fraction_of_optimum=0.9, pfba_factor=1.1, processes=1
+    ) as session:
+        session.run()
+        session.set_bounds({"EX_glc__D_e": (-10, 1000)})
+        with model:
+            model.reactions.EX_glc__D_e.bounds = (-10, 1000)
+            expected = flux_variability_analysis(
+                model, fraction_of_optimum=0.9, pfba_factor=1.1, processes=1
+            )
+        assert np.allclose(session.run(), expected, atol=1e-6)
+
+
+def test_flux_variability_iter_checkpoint(model, fva_results, tmp_path, monkeypatch):
+    """Test streaming FVA resuming from a checkpoint."""
+    checkpoint = tmp_path / "fva.jsonl"
+    progress = []
+    results = list(
+        flux_variability_analysis_iter(
+            model,
+            processes=2,
+            checkpoint=checkpoint,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+    )
+    n = len(model.reactions)
+    assert len(results) == n
+    assert progress[-1] == (n, n)
+    fva_out = DataFrame.from_records(
+        results, columns=["id", "minimum", "maximum"], index="id"
+    ).sort_index()
+    assert np.allclose(fva_out, fva_results)
+
+    # Simulate an interrupted run with a truncated last line.
+    lines = checkpoint.read_text().splitlines()
+    checkpoint.write_text("\n".join(lines[:11]) + "\n" + lines[11][:5])
+    resumed = DataFrame.from_records(
+        list(flux_variability_analysis_iter(model, processes=1, checkpoint=checkpoint)),
+        columns=["id", "minimum", "maximum"],
+        index="id",
+    ).sort_index()
+    assert np.allclose(resumed, fva_results)
+
+    # Everything is finished now so no analysis must be started.
+    monkeypatch.setattr(variability, "FVASession", None)
+    assert len(list(flux_variability_analysis_iter(model, checkpoint=checkpoint))) == n
+
+
+def test_parametric_flux_variability(model, fva_results):
+    """Test FVA over several fractions of the optimum."""
+    fva_out = parametric_flux_variability_analysis(model, [1.0, 0.9], processes=2)
+    assert fva_out.index.names == ["fraction_of_optimum", "reaction"]
+    assert np.allclose(fva_out.loc[1.0].sort_index(), fva_results)
+    assert np.allclose(
+        fva_out.loc[0.9],
+        flux_variability_analysis(model, fraction_of_optimum=0.9, processes=1),
+    )
+
+    fva_out = parametric_flux_variability_analysis(
+        model,
+        [1.0, 0.9],
+        pfba_factors=[1.1, 1.5],
+        reaction_list=model.reactions[1::3],
+        processes=1,
+    )
+    assert fva_out.shape == (4 * len(model.reactions[1::3]), 2)
+    assert np.allclose(
+        fva_out.loc[(0.9, 1.5)],
+        flux_variability_analysis(
+            model,
+            fraction_of_optimum=0.9,
+            pfba_factor=1.5,
+            reaction_list=model.reactions[1::3],
+            processes=1,
+        ),
+    )
+
+
 # Loopless FVA
 def test_flux_variability_loopless_benchmark(model, benchmark, all_solvers):
     """Benchmark loopless FVA."""
@@ -165,14 +280,54 @@ def test_essential_reactions(model):
     assert observed_essential_reactions == essential_reactions
 
 
-def test_find_blocked_reactions(model, all_solvers):
+@pytest.mark.parametrize("method", ["fva", "bulk"])
+def test_find_blocked_reactions(model, all_solvers, method):
     """Test find_blocked_reactions()."""
     model.solver = all_solvers
-    result = find_blocked_reactions(model, model.reactions[40:46])
+    result = find_blocked_reactions(model, model.reactions[40:46], method=method)
     assert result == ["FRUpts2"]
 
-    result = find_blocked_reactions(model, model.reactions[42:48])
+    result = find_blocked_reactions(model, model.reactions[42:48], method=method)
     assert set(result) == {"FUMt2_2", "FRUpts2"}
 
-    result = find_blocked_reactions(model, model.reactions[30:50], open_exchanges=True)
+    result = find_blocked_reactions(
+        model, model.reactions[30:50], open_exchanges=True, method=method
+    )
     assert result == []
+
+
+def test_find_blocked_reactions_bulk_all(model):
+    """Test that the bulk engine agrees with FVA on all reactions."""
+    assert set(find_blocked_reactions(model, method="bulk")) == set(
+        find_blocked_reactions(model, processes=1)
+    )
+    with pytest.raises(ValueError):
+        find_blocked_reactions(model, method="fastest")
+
+
+def test_find_blocked_reactions_bulk_forced(model, monkeypatch):
+    """Test that forced fluxes do not make the bulk batches useless."""
+    # Acetate secretion forces PTAr forward and ACKr and ACt2r in reverse.
+    model.reactions.EX_ac_e.lower_bound = 1
+    # A fully reversible pathway only carries flux if it is maximized.
+    a = Metabolite("a_c", compartment="c")
+    b = Metabolite("b_c", compartment="c")
+    model.add_reactions([Reaction("EX_a"), Reaction("A_to_B"), Reaction("EX_b")])
+    model.reactions.EX_a.add_metabolites({a: -1})
+    model.reactions.A_to_B.add_metabolites({a: -1, b: 1})
+    model.reactions.EX_b.add_metabolites({b: -1})
+    candidates = ["PTAr", "ACKr", "ACt2r", "EX_a", "A_to_B", "EX_b"]
+    for rxn_id in candidates[3:]:
+        model.reactions.get_by_id(rxn_id).bounds = (-10, 10)
+
+    checked = []
+    fva = variability.flux_variability_analysis
+
+    def record(model, **kwargs):
+        checked.extend(kwargs["reaction_list"])
+        return fva(model, **kwargs)
+
+    monkeypatch.setattr(variability, "flux_variability_analysis", record)
+    candidates = model.reactions.get_by_any(candidates)
+    assert find_blocked_reactions(model, candidates, method="bulk") == []
+    assert checked == []
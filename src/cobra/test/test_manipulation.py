@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 
-from itertools import chain
+from itertools import chain, combinations
 
 import pytest
 
@@ -125,6 +125,24 @@ class TestManipulation:
         test_computation(test_model, ["try:'"], set())
         test_computation(test_model, ["try:'", "'except:1"], {"test1"})
 
+    def test_gpr_circuit(self, salmonella):
+        circuit = GPRCircuit(salmonella)
+        assert circuit.reactions == [r.id for r in salmonella.reactions]
+        genes = salmonella.genes[:40]
+        knockouts = [[]] + [[g] for g in genes] + list(combinations(genes, 2))
+        knockouts.append(["STM1067", "STM0227"])
+        disabled = circuit.knockout_matrix(knockouts)
+        assert disabled.shape == (len(knockouts), len(salmonella.reactions))
+        for knockout, row in zip(knockouts, disabled):
+            expected = {
+                r.id for r in find_gene_knockout_reactions(salmonella, knockout)
+            }
+            assert {circuit.reactions[j] for j in row.nonzero()[0]} == expected
+        matrix = circuit.gene_matrix(knockouts)
+        assert (circuit.knockout_matrix(matrix) == disabled).all()
+        with pytest.raises(ValueError):
+            circuit.knockout_matrix(matrix[:, 1:])
+
     def test_remove_genes(self):
         m = Model("test")
         m.add_reactions([Reaction("r" + str(i + 1)) for i in range(8)])
@@ -0,0 +1,54 @@
+"""Test functionalities of CHRRSampler."""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+
+from cobra.sampling import CHRRSampler
+
+
+if TYPE_CHECKING:
+    from cobra import Model
+
+
+@pytest.fixture(scope="function")
+def chrr(model: "Model") -> CHRRSampler:
+    """Return CHRRSampler instance for tests."""
+    sampler = CHRRSampler(model, thinning=10)
+    assert 0 < sampler.dimension < len(model.variables)
+    return sampler
+
+
+def test_chrr_sample_benchmark(chrr: CHRRSampler, benchmark) -> None:
+    """Benchmark CHRR sampling."""
+    benchmark(chrr.sample, 1)
+
+
+def test_sampling(chrr: CHRRSampler) -> None:
+    """Test sampling."""
+    s = chrr.sample(100)
+    assert all(chrr.validate(s) == "v")
+
+
+def test_batch_sampling(chrr: CHRRSampler) -> None:
+    """Test batch sampling."""
+    for b in chrr.batch(5, 4):
+        assert all(chrr.validate(b) == "v")
+
+
+def test_variables_samples(chrr: CHRRSampler) -> None:
+    """Test variable samples."""
+    vnames = np.array([v.name for v in chrr.model.variables])
+    s = chrr.sample(10, fluxes=False)
+    assert s.shape == (10, chrr.warmup.shape[1])
+    assert (s.columns == vnames).all()
+    assert (chrr.validate(s) == "v").all()
+    assert np.allclose(s.values[-1], chrr.prev)
+
+
+def test_fixed_seed(model: "Model") -> None:
+    """Test that a fixed seed gives the same chain."""
+    s1 = CHRRSampler(model, thinning=10, seed=42).sample(5)
+    s2 = CHRRSampler(model, thinning=10, seed=42).sample(5)
+    assert np.allclose(s1, s2)
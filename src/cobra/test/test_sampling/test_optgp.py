@@ -7,7 +7,7 @@ from __future__ import absolute_import
 import numpy as np
 import pytest
 
-from cobra.sampling import OptGPSampler
+from cobra.sampling import OptGPSampler, hr_sampler
 
 
 @pytest.fixture(scope="function")
@@ -67,3 +67,86 @@ def test_reproject(optgp):
     s = np.random.rand(10, optgp.warmup.shape[1])
     proj = np.apply_along_axis(optgp._reproject, 1, s)
     assert all(optgp.validate(proj) == "v")
+
+
+def test_multiple_chains(model):
+    """Test sampling several chains per process together."""
+
+    sampler = OptGPSampler(model, processes=1, thinning=1, chains=4)
+    s = sampler.sample(10)
+    assert s.shape == (12, len(model.reactions))
+    assert all(sampler.validate(s) == "v")
+
+
+def test_persistent_pool(model):
+    """Test that the worker processes are reused across sample calls."""
+
+    with OptGPSampler(model, processes=2, thinning=1) as optgp:
+        s = optgp.sample(10)
+        pool = optgp._pool
+        assert pool is not None
+        s = optgp.sample(10)
+        assert optgp._pool is pool
+        assert all(optgp.validate(s) == "v")
+    assert optgp._pool is None
+    s = optgp.sample(4)
+    assert all(optgp.validate(s) == "v")
+    optgp.close()
+
+
+def test_thread_backend(model, monkeypatch):
+    """Test sampling with chains in threads."""
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the warmup must not start any processes")
+
+    monkeypatch.setattr(hr_sampler, "Pool", fail)
+    with OptGPSampler(
+        model, processes=2, thinning=1, chains=2, backend="threads"
+    ) as optgp:
+        s = optgp.sample(12)
+        assert s.shape == (12, len(model.reactions))
+        assert all(optgp.validate(s) == "v")
+        s, _ = optgp.sample_until(rhat=1.0, ess=1e9, batch_size=2, max_samples=16)
+        assert all(optgp.validate(s) == "v")
+
+    monkeypatch.undo()
+    with OptGPSampler(
+        model, processes=1, backend="threads", warmup_processes=2
+    ) as optgp:
+        assert all(optgp.validate(optgp.warmup) == "v")
+
+    with pytest.raises(ValueError):
+        OptGPSampler(model, processes=1, backend="fibers")
+
+
+def test_reproducible_chains(model):
+    """Test that every chain has its own reproducible random stream."""
+
+    samples = []
+    for _ in range(2):
+        with OptGPSampler(
+            model, processes=2, thinning=1, chains=2, seed=42, backend="threads"
+        ) as optgp:
+            samples.append((optgp.sample(8), optgp.sample(8)))
+    assert np.allclose(samples[0][0], samples[1][0])
+    assert np.allclose(samples[0][1], samples[1][1])
+    assert not np.allclose(samples[0][0], samples[0][1])
+
+
+def test_backends_agree(model):
+    """Test that both backends give the same samples for a fixed seed."""
+
+    samples = []
+    for backend in ("processes", "threads"):
+        with OptGPSampler(
+            model,
+            processes=2,
+            thinning=1,
+            chains=2,
+            seed=42,
+            backend=backend,
+            warmup_processes=1,
+        ) as optgp:
+            samples.append(optgp.sample(8))
+    assert np.allclose(samples[0], samples[1])
@@ -7,9 +7,18 @@ from __future__ import absolute_import
 import numpy as np
 import pytest
 
-from cobra.core import Metabolite, Model, Reaction
+from cobra.core import Configuration, Metabolite, Model, Reaction
 from cobra.flux_analysis.parsimonious import pfba
-from cobra.sampling import ACHRSampler, OptGPSampler, sample
+from cobra.sampling import (
+    ACHRSampler,
+    ConvergenceMonitor,
+    OptGPSampler,
+    SampleReader,
+    effective_sample_size,
+    hr_sampler,
+    sample,
+    split_rhat,
+)
 
 
 def test_single_achr(model):
@@ -33,6 +42,134 @@ def test_multi_optgp(model):
     assert s.shape == (10, len(model.reactions))
 
 
+def test_sparse_problem(model):
+    """Test sampling with sparse constraint matrices."""
+
+    pytest.importorskip("scipy")
+    optgp = OptGPSampler(model, processes=1, thinning=1, sparse=True)
+    achr = ACHRSampler(model, thinning=1, sparse=True)
+    assert optgp.problem.nullspace is None
+    assert all(optgp.validate(optgp.warmup) == "v")
+    for sampler in (optgp, achr):
+        s = sampler.sample(10)
+        assert all(sampler.validate(s) == "v")
+        s = sampler.sample(10, fluxes=False)
+        assert all(sampler.validate(s) == "v")
+        proj = np.apply_along_axis(sampler._reproject, 1, s.values)
+        assert all(sampler.validate(proj) == "v")
+
+
+def test_output_file(model, tmp_path):
+    """Test writing samples to disk."""
+
+    reader = sample(model, 10, processes=2, output=tmp_path / "optgp.npy")
+    assert isinstance(reader, SampleReader)
+    assert reader.shape == (10, len(model.reactions))
+    assert reader.columns == [r.id for r in model.reactions]
+
+    achr = ACHRSampler(model, thinning=1)
+    reader = achr.sample(10, output=tmp_path / "achr.npy")
+    assert len(reader) == 10
+    assert all(achr.validate(reader.to_frame()) == "v")
+    chunks = list(reader.iter_chunks(4))
+    assert [len(c) for c in chunks] == [4, 4, 2]
+    assert np.allclose(np.vstack(chunks), reader.arrays[0])
+
+    batches = list(achr.batch(5, 3, fluxes=False, output=tmp_path / "batches"))
+    assert len(batches) == 3
+    assert (tmp_path / "batches" / "batch_2.npy").exists()
+    combined = SampleReader([b.paths[0] for b in batches], batches[0].columns)
+    assert combined.shape == (15, len(model.variables))
+    assert all(achr.validate(combined.read(3, 12)) == "v")
+
+
+def test_validate_chunks(model, tmp_path):
+    """Test chunked validation of in-memory and memory-mapped samples."""
+
+    achr = ACHRSampler(model, thinning=1)
+    s = achr.sample(20, fluxes=False)
+    s.iloc[3, 0] = 1e6
+    codes = achr.validate(s)
+    assert codes[3] != "v"
+    assert (achr.validate(s, chunk_size=3) == codes).all()
+
+    reader = achr.sample(20, output=tmp_path / "samples.npy")
+    assert (achr.validate(reader, chunk_size=7) == "v").all()
+    assert len(achr.validate(reader.arrays[0], chunk_size=7)) == 20
+
+
+def test_warmup_cache(model, monkeypatch, tmp_path):
+    """Test parallel warmup generation and reuse of cached warmup points."""
+
+    monkeypatch.setattr(Configuration(), "cache_directory", tmp_path)
+    optgp = OptGPSampler(model, processes=2, thinning=1, cache=True)
+    assert all(optgp.validate(optgp.warmup) == "v")
+    serial = ACHRSampler(model, thinning=1)
+    assert all(serial.validate(serial.warmup) == "v")
+    # The serial warmup must not keep a reference to the model.
+    assert hr_sampler._warmup_model is None
+
+    def fail(args):
+        raise AssertionError("warmup points were not taken from the cache")
+
+    monkeypatch.setattr(hr_sampler, "_warmup_points", fail)
+    cached = OptGPSampler(model, processes=1, thinning=1, cache=True)
+    assert np.allclose(cached.warmup, optgp.warmup)
+    assert np.allclose(cached.problem.nullspace, optgp.problem.nullspace)
+
+
+def test_convergence_diagnostics():
+    """Test split-R-hat and effective sample size of synthetic chains."""
+
+    rng = np.random.RandomState(42)
+    draws = rng.normal(size=(4, 1000, 2))
+    draws[:, :, 1] = 3.0
+    assert np.allclose(split_rhat(draws), 1.0, atol=0.01)
+    assert effective_sample_size(draws)[0] > 2000
+    assert effective_sample_size(draws)[1] == 4000
+    draws[0] += 5.0
+    assert split_rhat(draws)[0] > 1.5
+
+
+def test_convergence_monitor():
+    """Test that the running diagnostics agree with a full computation."""
+
+    rng = np.random.RandomState(42)
+    draws = rng.normal(size=(3, 301, 2)) + np.linspace(0, 1, 301)[:, None]
+    monitor = ConvergenceMonitor(["a", "b"], window=None)
+    windowed = ConvergenceMonitor(["a", "b"], window=50)
+    for start, stop in [(0, 1), (1, 2), (2, 40), (40, 41), (41, 200), (200, 301)]:
+        monitor.update(draws[:, start:stop])
+        windowed.update(draws[:, start:stop])
+        assert np.allclose(monitor.split_rhat(), split_rhat(draws[:, :stop]))
+        assert np.allclose(
+            monitor.effective_sample_size(), effective_sample_size(draws[:, :stop])
+        )
+    assert np.allclose(
+        windowed.effective_sample_size(),
+        effective_sample_size(draws[:, -50:]) * 301 / 50,
+    )
+    assert np.array_equal(monitor.draws, draws)
+
+
+def test_sample_until(model):
+    """Test sampling until the chains converged."""
+
+    optgp = OptGPSampler(model, processes=1, thinning=10, chains=4)
+    achr = ACHRSampler(model, thinning=10)
+    for sampler in (optgp, achr):
+        s, diagnostics = sampler.sample_until(
+            rhat=1.1, ess=10, batch_size=20, max_samples=2000
+        )
+        assert len(s) <= 2000 + 80
+        assert list(diagnostics.columns) == ["rhat", "ess"]
+        assert list(diagnostics.index) == [r.id for r in model.reactions]
+        assert all(sampler.validate(s) == "v")
+
+    s, _ = optgp.sample_until(rhat=1.0, ess=1e9, batch_size=5, max_samples=40)
+    assert s.shape == (40, len(model.reactions))
+
+
 def test_wrong_method(model):
     """Test method intake sanity."""
 
@@ -59,6 +196,9 @@ def test_equality_constraint(model):
     s = sample(model, 10, method="achr")
     assert np.allclose(s.ACALD, -1.5, atol=1e-6, rtol=0)
 
+    s = sample(model, 10, method="chrr")
+    assert np.allclose(s.ACALD, -1.5, atol=1e-6, rtol=0)
+
 
 def test_inequality_constraint(model):
     """Test inequality constraint."""
@@ -72,6 +212,9 @@ def test_inequality_constraint(model):
     s = sample(model, 10, method="achr")
     assert all(s.ACALD > -0.5 - 1e-6)
 
+    s = sample(model, 10, method="chrr")
+    assert all(s.ACALD > -0.5 - 1e-6)
+
 
 def test_inhomogeneous_sanity(model):
     """Test whether inhomogeneous sampling gives approximately the same
@@ -48,3 +48,61 @@ def test_resettable() -> None:
 
     # call the dummy function
     change_my_name("hmm", "hmmm")
+
+
+def test_coalescing_history_manager() -> None:
+    """Test that a coalescing HistoryManager keeps only original values."""
+    state = {"a": 0, "b": 0}
+    calls = []
+
+    def restore(values):
+        calls.append(dict(values))
+        for (_, key), value in values.items():
+            state[key] = value
+
+    history_manager = HistoryManager(coalesce=True)
+    for value in range(1, 10):
+        history_manager.record({("state", "a"): state["a"]}, restore)
+        history_manager.record({("state", "b"): state["b"]}, restore)
+        state["a"] = state["b"] = value
+    # only the original values are kept in a single entry
+    assert history_manager.size() == 1
+    history_manager.reset()
+    assert state == {"a": 0, "b": 0}
+    assert len(calls) == 1
+    # without coalescing every record is an entry of its own
+    history_manager = HistoryManager()
+    history_manager.record({("state", "a"): 0}, restore)
+    history_manager.record({("state", "a"): 1}, restore)
+    assert history_manager.size() == 2
+
+
+def test_coalescing_context(model: "Model") -> None:
+    """Test that a coalescing model context restores the original state."""
+    bounds = {rxn.id: rxn.bounds for rxn in model.reactions}
+    pgi = model.reactions.PGI
+    with model.context(coalesce=True):
+        for value in range(100):
+            pgi.upper_bound = value
+            pgi.lower_bound = -value
+            model.reactions.PFK.bounds = (-value, value)
+        model.set_bounds(["PGI", "ATPM"], -5, 5)
+        for value in range(100):
+            model.objective_direction = "min" if value % 2 else "max"
+        # one entry for all bounds and one for the objective direction
+        assert get_context(model).size() == 2
+        with model:
+            model.reactions.ACALD.upper_bound = 0
+        model.reactions.upper_bounds = 100
+    assert {rxn.id: rxn.bounds for rxn in model.reactions} == bounds
+    assert (pgi.forward_variable.ub, pgi.reverse_variable.ub) == (1000, 1000)
+    assert model.objective_direction == "max"
+
+
+def test_coalescing_resettable(model: "Model") -> None:
+    """Test that consecutive resettable changes share one history entry."""
+    with model.context(coalesce=True):
+        for gene in model.genes:
+            gene.functional = False
+        assert get_context(model).size() == 1
+    assert all(gene.functional for gene in model.genes)
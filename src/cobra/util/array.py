@@ -1,6 +1,6 @@
 """Helper functions for array operations and sampling."""
 
-from typing import TYPE_CHECKING, NamedTuple, Optional, Union
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Union
 
 import numpy as np
 import pandas as pd
@@ -135,6 +135,17 @@ def nullspace(A: np.ndarray, atol: float = 1e-13, rtol: float = 0.0) -> np.ndarr
     return ns
 
 
+def _sparse_rows(
+    array_builder: type, rows: List[Dict[int, float]], n_columns: int
+) -> Union[dok_matrix, lil_matrix]:
+    """Build a sparse matrix from rows of non-zero column coefficients."""
+    matrix = dok_matrix((len(rows), n_columns))
+    for i, row in enumerate(rows):
+        for j, coef in row.items():
+            matrix[i, j] = coef
+    return array_builder(matrix)
+
+
 def constraint_matrices(
     model: "Model",
     array_type: str = "dense",
@@ -218,13 +229,20 @@ def constraint_matrices(
     inequality_rows = []
     inequality_bounds = []
     b = []
+    sparse = array_type in ("dok", "lil")
+    var_index = {v: i for i, v in enumerate(model.variables)}
 
     for const in model.constraints:
         lb = -np.inf if const.lb is None else const.lb
         ub = np.inf if const.ub is None else const.ub
         equality = (ub - lb) < zero_tol
-        coefs = const.get_linear_coefficients(model.variables)
-        coefs = [coefs[v] for v in model.variables]
+        if sparse:
+            # only collect the non-zero coefficients
+            coefs = const.get_linear_coefficients(const.variables)
+            coefs = {var_index[v]: c for v, c in coefs.items() if c != 0}
+        else:
+            coefs = const.get_linear_coefficients(model.variables)
+            coefs = [coefs[v] for v in model.variables]
         if equality:
             b.append(lb if abs(lb) > zero_tol else 0.0)
             equality_rows.append(coefs)
@@ -235,6 +253,10 @@ def constraint_matrices(
     var_bounds = np.array([[v.lb, v.ub] for v in model.variables])
     fixed = var_bounds[:, 1] - var_bounds[:, 0] < zero_tol
 
+    if sparse:
+        equality_rows = _sparse_rows(array_builder, equality_rows, len(var_index))
+        inequality_rows = _sparse_rows(array_builder, inequality_rows, len(var_index))
+
     results = Problem(
         equalities=array_builder(equality_rows),
         b=np.array(b),
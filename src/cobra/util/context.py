@@ -1,7 +1,7 @@
 """Context manager for the package."""
 
 from functools import partial
-from typing import TYPE_CHECKING, Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional
 
 
 if TYPE_CHECKING:
@@ -16,13 +16,23 @@ class HistoryManager:
     This is used to implement context managers that allow temporary
     changes to a `cobra.core.Model`.
 
+    Parameters
+    ----------
+    coalesce : bool, optional
+        Whether changes recorded with `record` only keep the original value
+        of each changed attribute (default False). This bounds the size of
+        the history by the number of changed attributes when the same
+        attributes are changed many times.
+
     """
 
-    def __init__(self, **kwargs) -> None:
+    def __init__(self, coalesce: bool = False, **kwargs) -> None:
         """Initialize the class."""
         super().__init__(**kwargs)
         # this acts like a stack
         self._history = []
+        self.coalesce = coalesce
+        self._recorded = set()
 
     def __call__(self, operation: Callable[[Any], Any]) -> None:
         """Add the corresponding operation to the history stack.
@@ -35,17 +45,68 @@ class HistoryManager:
         """
         self._history.append(operation)
 
+    def record(
+        self, values: Dict[Hashable, Any], restore: Callable[[Dict], Any]
+    ) -> None:
+        """Record the previous values of changed attributes.
+
+        Parameters
+        ----------
+        values : dict
+            The previous values keyed by the changed (object, attribute)
+            pairs.
+        restore : callable
+            A function that takes a dictionary like `values` and restores
+            all of its values at once.
+
+        Notes
+        -----
+        Without coalescing this adds a single operation to the stack. With
+        coalescing, values of keys that were recorded before are dropped, so
+        only the original values remain, and consecutive records with the
+        same `restore` function are merged and restored with a single call.
+
+        """
+        if not self.coalesce:
+            self(partial(restore, values))
+            return
+        recorded = self._recorded
+        values = {k: v for k, v in values.items() if k not in recorded}
+        if not values:
+            return
+        recorded.update(values)
+        if self._history and isinstance(self._history[-1], _Restore):
+            previous = self._history[-1]
+            if previous.restore == restore:
+                previous.values.update(values)
+                return
+        self._history.append(_Restore(restore, values))
+
     def reset(self) -> None:
         """Trigger executions for all items in the stack in reverse order."""
         while self._history:
             entry = self._history.pop()
             entry()
+        self._recorded.clear()
 
     def size(self) -> int:
         """Calculate number of operations on the stack."""
         return len(self._history)
 
 
+class _Restore:
+    """A coalesced history entry restoring several values at once."""
+
+    def __init__(self, restore: Callable[[Dict], Any], values: Dict) -> None:
+        """Initialize the entry."""
+        self.restore = restore
+        self.values = values
+
+    def __call__(self) -> None:
+        """Restore all values."""
+        self.restore(self.values)
+
+
 def get_context(obj: "Object") -> Optional[HistoryManager]:
     """Search for a context manager.
 
@@ -98,6 +159,9 @@ def resettable(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
         The decorated function.
 
     """
+    # A single restore function per attribute lets coalescing contexts merge
+    # consecutive changes of that attribute into one history entry.
+    restore = partial(_restore_attributes, func)
 
     def wrapper(self, new_value):
         context = get_context(self)
@@ -106,8 +170,17 @@ def resettable(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
             # Don't clutter the context with unchanged variables
             if old_value == new_value:
                 return
-            context(partial(func, self, old_value))
+            if context.coalesce:
+                context.record({(self, func.__name__): old_value}, restore)
+            else:
+                context(partial(func, self, old_value))
 
         func(self, new_value)
 
     return wrapper
+
+
+def _restore_attributes(func: Callable[[Any], Any], values: Dict) -> None:
+    """Restore attributes recorded by `resettable`."""
+    for (obj, _), value in values.items():
+        func(obj, value)